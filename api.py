@@ -0,0 +1,125 @@
+# api.py
+
+import json
+from datetime import date
+from flask import Response, jsonify, request, stream_with_context
+from flask_login import login_required
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from models import db, Project, Task, User
+
+Owner = aliased(User)
+Assignee = aliased(User)
+
+# Public field name -> column loaded for it
+PROJECT_FIELDS = {
+    'id': Project.id,
+    'title': Project.title,
+    'description': Project.description,
+    'status': Project.status,
+    'priority': Project.priority,
+    'due_date': Project.due_date,
+    'owner': Owner.username,
+    'github_url': Project.github_url,
+    'document_url': Project.document_url,
+    'project_url': Project.project_url,
+    'features': Project.features,
+    'created_at': Project.created_at,
+    'updated_at': Project.updated_at,
+}
+
+TASK_FIELDS = {
+    'id': Task.id,
+    'title': Task.title,
+    'description': Task.description,
+    'status': Task.status,
+    'priority': Task.priority,
+    'is_completed': Task.is_completed,
+    'due_date': Task.due_date,
+    'parent_id': Task.parent_id,
+    'assigned_to': Assignee.username,
+    'notes': Task.notes,
+    'created_at': Task.created_at,
+    'updated_at': Task.updated_at,
+}
+
+TASK_STREAM_BATCH = 1000
+
+
+def parse_fields(available):
+    """Pick the requested columns from ?fields=a,b,c. Raises ValueError on unknown or no names."""
+    requested = request.args.get('fields')
+    if not requested:
+        return dict(available)
+
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    if not names:
+        raise ValueError(f'No fields given. Must be among: {", ".join(available)}')
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}. Must be among: {", ".join(available)}')
+    return {name: available[name] for name in names}
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+def _select(fields, base):
+    stmt = select(*fields.values()).select_from(base)
+    # Only join users when a username was asked for
+    if 'owner' in fields:
+        stmt = stmt.join(Owner, Owner.id == Project.owner_id)
+    if 'assigned_to' in fields:
+        stmt = stmt.outerjoin(Assignee, Assignee.id == Task.assigned_to_id)
+    return stmt
+
+
+def init_api(app):
+    @app.route('/api/projects/<int:project_id>')
+    @login_required
+    def api_project(project_id):
+        try:
+            fields = parse_fields(PROJECT_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        row = db.session.execute(
+            _select(fields, Project).where(Project.id == project_id)
+        ).first()
+        if row is None:
+            return jsonify({'error': 'Project not found'}), 404
+
+        return app.response_class(json.dumps(dict(zip(fields, row)), default=_json_default),
+                                  mimetype='application/json')
+
+    @app.route('/api/projects/<int:project_id>/tasks')
+    @login_required
+    def api_project_tasks(project_id):
+        try:
+            fields = parse_fields(TASK_FIELDS)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        if db.session.scalar(select(Project.id).where(Project.id == project_id)) is None:
+            return jsonify({'error': 'Project not found'}), 404
+
+        stmt = _select(fields, Task)\
+            .where(Task.project_id == project_id)\
+            .order_by(Task.id)\
+            .execution_options(yield_per=TASK_STREAM_BATCH)
+        names = list(fields)
+
+        def generate():
+            # Rows are fetched TASK_STREAM_BATCH at a time and written out as they
+            # arrive, so memory stays flat however many tasks the project has
+            yield '['
+            separator = ''
+            for row in db.session.execute(stmt):
+                yield separator + json.dumps(dict(zip(names, row)), default=_json_default)
+                separator = ','
+            yield ']'
+
+        return Response(stream_with_context(generate()), mimetype='application/json')
@@ -1,45 +1,79 @@
 # app.py
 
+import os
 from flask import Flask
-from models import db, User
 from flask_login import LoginManager
-from forms import LoginForm
-from routes import init_routes
+from models import db
+from identity import load_user as load_cached_user
 from config import DevelopmentConfig, ProductionConfig
-from dotenv import load_dotenv
-import os
-
-app = Flask(__name__)
 
-# Load configuration based on the environment
-if os.environ.get('FLASK_ENV') == 'production':
-    app.config.from_object(ProductionConfig)
-else:
-    app.config.from_object(DevelopmentConfig)
-
-# Initialize extensions
-db.init_app(app)
 login_manager = LoginManager()
-login_manager.init_app(app)
 login_manager.login_view = 'login'  # Redirect to 'login' view if unauthorized
 login_manager.login_message_category = 'info'
 
-# Create the database tables
-with app.app_context():
-    db.create_all()
 
-# User loader callback for Flask-Login
+# User loader callback for Flask-Login, served from the identity cache when possible
 @login_manager.user_loader
 def load_user(user_id):
-    return db.session.get(User, int(user_id))
+    return load_cached_user(int(user_id))
+
+
+def create_app(config=None):
+    """Build the application with `config` (a config class or import path).
+
+    Defaults to ProductionConfig when FLASK_ENV=production and DevelopmentConfig
+    otherwise. Nothing here talks to the database: Flask-SQLAlchemy connects on
+    first use and the schema is managed by `flask db upgrade`.
+    """
+    if config is None:
+        config = ProductionConfig if os.environ.get('FLASK_ENV') == 'production' else DevelopmentConfig
+
+    app = Flask(__name__)
+    app.config.from_object(config)
+
+    # Imported here so importing this module stays cheap for tools that only need the factory
+    from routes import init_routes
+    from commands import init_commands
+    from api import init_api
+    from permissions import init_permissions
+    from identity import init_identity_cache
+    from user_index import init_user_index
+    from passwords import password_hasher
+    from render_cache import init_render_cache
+    from sqlite_tuning import init_sqlite
+    from query_stats import init_query_stats
+    from metrics import init_metrics
+    from profiling import init_profiling
+    from traffic_capture import init_traffic_capture
+    from outbox import init_outbox
+    from jobs import init_jobs
+
+    # Initialize extensions
+    db.init_app(app)
+    init_sqlite(app)
+    init_query_stats(app)
+    init_metrics(app)
+    init_traffic_capture(app)
+    login_manager.init_app(app)
+    password_hasher.init_app(app)
+    init_render_cache(app)
+    init_identity_cache(app)
+    init_user_index(app)
+    init_outbox(app)
+    init_jobs(app)
+
+    # Initialize routes
+    init_permissions(app)
+    init_routes(app)
+    init_api(app)
+    init_commands(app)
+    # Wraps the sampled view functions, so it has to come after the routes
+    init_profiling(app)
 
-# Initialize routes
-init_routes(app)
+    return app
 
-# Load environment variables from .env file
-load_dotenv()
 
 if __name__ == '__main__':
     # Use production-ready server configuration
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port)
\ No newline at end of file
+    create_app().run(host='0.0.0.0', port=port)
@@ -0,0 +1,99 @@
+# benchmarks/bench_cold_start.py
+"""Measure how long a fresh worker takes from start to its first response.
+
+A gunicorn worker without --preload forks from a master that has imported
+nothing, then imports the WSGI module, builds the app and serves. Each run
+here starts a new interpreter and times the same three phases inside it:
+importing app.py, create_app(), and the first request through the test client.
+
+Usage:
+    python -m benchmarks.bench_cold_start
+    python -m benchmarks.bench_cold_start --runs 20 --path /login --importtime
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+PHASES = ('import', 'create_app', 'first_request', 'total')
+
+
+def child(path, config):
+    """Run inside the fresh interpreter: time each phase and print them as JSON."""
+    start = time.perf_counter()
+    from app import create_app
+    imported = time.perf_counter()
+    app = create_app(config)
+    created = time.perf_counter()
+    status = app.test_client().get(path).status_code
+    served = time.perf_counter()
+
+    print(json.dumps({
+        'import': imported - start,
+        'create_app': created - imported,
+        'first_request': served - created,
+        'total': served - start,
+        'status': status,
+    }))
+
+
+def run_once(path, config, importtime=False):
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-m', 'benchmarks.bench_cold_start', '--child', '--path', path, '--config', config]
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def slowest_imports(stderr, count):
+    """Parse -X importtime output into the `count` imports with the largest cumulative time."""
+    rows = []
+    for line in stderr.splitlines():
+        # Lines look like "import time:       412 |       1870 |   flask"
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/login', help='URL requested as the first response')
+    parser.add_argument('--config', default='config.TestingConfig', help='config import path for create_app')
+    parser.add_argument('--importtime', action='store_true', help='also list the slowest imports')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.path, args.config)
+        return
+
+    runs = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        timings, _ = run_once(args.path, args.config)
+        timings['process'] = time.perf_counter() - started
+        runs.append(timings)
+
+    print(f'{args.runs} cold starts, first request GET {args.path} -> {runs[0]["status"]}')
+    print(f'{"phase":<16}{"median ms":>12}{"max ms":>10}')
+    for phase in PHASES + ('process',):
+        values = [run[phase] * 1000 for run in runs]
+        print(f'{phase:<16}{statistics.median(values):>12.1f}{max(values):>10.1f}')
+    print('(process includes interpreter startup, which a forked worker does not pay)')
+
+    if args.importtime:
+        _, stderr = run_once(args.path, args.config, importtime=True)
+        print(f'\n{"cumulative ms":>14}{"self ms":>10}  module')
+        for cumulative, own, name in slowest_imports(stderr, 15):
+            print(f'{cumulative / 1000:>14.1f}{own / 1000:>10.1f}  {name}')
+
+
+if __name__ == '__main__':
+    main()
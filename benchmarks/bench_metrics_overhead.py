@@ -0,0 +1,60 @@
+# benchmarks/bench_metrics_overhead.py
+"""Time the per-request work /metrics adds.
+
+Calls a trivial WSGI app directly and through MetricsMiddleware and reports
+the difference, so the figure excludes Flask routing and the view itself.
+
+Usage:
+    python -m benchmarks.bench_metrics_overhead
+    PROMETHEUS_MULTIPROC_DIR=/tmp/metrics python -m benchmarks.bench_metrics_overhead
+"""
+
+import argparse
+import time
+
+
+class FakeRule:
+    endpoint = 'view_project'
+
+
+class FakeRequest:
+    url_rule = FakeRule()
+
+
+def inner_app(environ, start_response):
+    environ['metrics.request'] = FakeRequest.instance
+    start_response('200 OK', [])
+    return [b'ok']
+
+
+FakeRequest.instance = FakeRequest()
+
+
+def per_call(wsgi_app, calls):
+    environ = {'REQUEST_METHOD': 'GET'}
+
+    def start_response(status, headers, exc_info=None):
+        pass
+
+    for _ in range(1000):
+        wsgi_app(environ, start_response)
+    started = time.perf_counter()
+    for _ in range(calls):
+        wsgi_app(environ, start_response)
+    return (time.perf_counter() - started) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200000)
+    args = parser.parse_args()
+
+    from metrics import MetricsMiddleware
+
+    bare = per_call(inner_app, args.requests)
+    wrapped = per_call(MetricsMiddleware(inner_app), args.requests)
+    print(f'{(wrapped - bare) * 1e6:.2f} µs per request over {args.requests} requests')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_password_hashing.py
+"""Report password hashes per second per core for each hashing policy.
+
+Usage:
+    python -m benchmarks.bench_password_hashing
+    python -m benchmarks.bench_password_hashing --method scrypt --method pbkdf2:sha256:600000
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from werkzeug.security import generate_password_hash
+
+DEFAULT_METHODS = [
+    'scrypt',
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:1000000',
+    'pbkdf2:sha256:600000',
+]
+
+
+def hash_for(method, seconds):
+    """Hash repeatedly on one core for about `seconds`; return the count and elapsed time."""
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        generate_password_hash('correct horse battery staple', method=method)
+        count += 1
+    return count, time.perf_counter() - start
+
+
+def bench(method, seconds, processes):
+    single_count, single_elapsed = hash_for(method, seconds)
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        results = list(pool.map(hash_for, [method] * processes, [seconds] * processes))
+    total = sum(count for count, _ in results)
+    elapsed = max(elapsed for _, elapsed in results)
+
+    return {
+        'method': method,
+        'per_core': single_count / single_elapsed,
+        'all_cores': total / elapsed,
+        'processes': processes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--method', action='append', help='werkzeug hash method (repeatable)')
+    parser.add_argument('--seconds', type=float, default=3.0, help='time spent per measurement')
+    parser.add_argument('--processes', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    print(f'{"method":<28}{"hashes/s/core":>16}{"hashes/s total":>18}  (cores={args.processes})')
+    for method in args.method or DEFAULT_METHODS:
+        result = bench(method, args.seconds, args.processes)
+        print(f'{result["method"]:<28}{result["per_core"]:>16.1f}{result["all_cores"]:>18.1f}')
+
+
+if __name__ == '__main__':
+    main()
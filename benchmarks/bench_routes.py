@@ -0,0 +1,360 @@
+# benchmarks/bench_routes.py
+"""Latency and query count of every route against a large synthetic dataset.
+
+The dataset comes from seed.Seeder (as `flask seed` does) with a fixed random
+seed, so two runs at the same scale see the same rows. --scale 1 is 10k users,
+5k projects and 1M tasks in trees up to four levels deep, with feedback and
+submissions; the default 0.01 keeps a run under a minute. Requests go through the Flask
+test client as an administrator (who sees every project), so the figures are
+server time without the network.
+
+Results can be written as JSON and compared with an earlier run: the run
+fails when a route's median latency grows by more than --max-regression
+percent (and by at least --min-delta-ms) or when it issues more queries.
+Routes that answer 202 only queue a background job; the job is then run
+and timed on its own, and its median is held to the same limit.
+
+Usage:
+    python -m benchmarks.bench_routes
+    python -m benchmarks.bench_routes --scale 1 --db /tmp/bench.db --output baseline.json
+    python -m benchmarks.bench_routes --scale 1 --db /tmp/bench.db --baseline baseline.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+FULL_SCALE = {'users': 10000, 'projects': 5000, 'tasks': 1000000}
+SEED = 1234
+PASSWORD = 'bench-password'
+ADMIN = 'bench-admin'
+
+# Routes that cannot be exercised meaningfully with synthetic data
+SKIPPED = {
+    'static': 'served by the web server in production',
+    'metrics': 'scraped by Prometheus, not a page',
+    'download_profile': 'needs a stored profile report',
+}
+
+
+def make_config(path):
+    from config import TestingConfig
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        # Measure N+1 routes instead of failing them
+        SQL_RAISE_ON_REPEAT = False
+        SQL_SLOW_QUERY_MS = 0
+
+    return BenchConfig
+
+
+def prepare_database(path, scale):
+    """Create and seed the database at `path` unless it already holds a dataset."""
+    import migrate
+    from sqlalchemy import create_engine, func, insert, select, update
+    from werkzeug.security import generate_password_hash
+    from models import Project, Task, User
+    from search import rebuild_search_index_on
+    from seed import Seeder
+
+    engine = create_engine(f'sqlite:///{path}')
+    try:
+        migrate.upgrade(engine)
+        with engine.begin() as connection:
+            if connection.scalar(select(func.count()).select_from(User.__table__)):
+                return None
+            started = time.perf_counter()
+            password_hash = generate_password_hash(PASSWORD)
+            admin_id = connection.execute(insert(User).values(
+                username=ADMIN, email=f'{ADMIN}@example.com', password_hash=password_hash,
+                is_admin=True, role='admin')).inserted_primary_key[0]
+            sizes = {name: max(1, int(size * scale)) for name, size in FULL_SCALE.items()}
+            report = Seeder(seed=SEED, **sizes).run(connection, password_hash)
+            # The admin owns the largest project, so its edit routes can be measured
+            largest = connection.scalar(select(Task.project_id).group_by(Task.project_id)
+                                        .order_by(func.count().desc(), Task.project_id).limit(1))
+            connection.execute(update(Project).where(Project.id == largest).values(owner_id=admin_id))
+            # Core inserts skip the ORM events that keep the search index current
+            rebuild_search_index_on(connection)
+        print(f'Seeded {report.rows} in {time.perf_counter() - started:.1f}s', file=sys.stderr)
+        return report.rows
+    finally:
+        engine.dispose()
+
+
+class Targets:
+    """Ids the cases point at, picked from the seeded data."""
+
+    def __init__(self, connection):
+        from sqlalchemy import func, select
+        from models import Feedback, Project, Task, User
+
+        admin_id = connection.scalar(select(User.id).where(User.username == ADMIN))
+        self.project_id = connection.scalar(select(Project.id).where(Project.owner_id == admin_id).limit(1))
+        self.user = connection.scalar(select(User.username).where(User.id != admin_id).order_by(User.id).limit(1))
+        # The task with the most feedback in that project, for the task detail page
+        self.task_id = connection.scalar(
+            select(Task.id).join(Feedback, Feedback.task_id == Task.id).where(Task.project_id == self.project_id)
+            .group_by(Task.id).order_by(func.count().desc(), Task.id).limit(1))
+        self.parent_task_id = connection.scalar(
+            select(Task.parent_id).where(Task.project_id == self.project_id, Task.parent_id.is_not(None)).limit(1))
+
+
+def cases(targets):
+    """(endpoint, method, client, build) where build(client, i) returns the request and may do untimed setup."""
+    from models import Task, User, db
+
+    def fresh_task(client, i):
+        task = Task(title=f'Disposable {i}', project_id=targets.project_id, created_by_id=1)
+        db.session.add(task)
+        db.session.commit()
+        return task.id
+
+    def fresh_user(client, i):
+        user = User(username=f'disposable{i}-{time.monotonic_ns()}', email=f'disposable{i}-{time.monotonic_ns()}@example.com',
+                    password_hash='x')
+        db.session.add(user)
+        db.session.commit()
+        return user.username
+
+    def login_first(client, i):
+        client.post('/login', data={'username': ADMIN, 'password': PASSWORD})
+
+    def some_job(client, i):
+        from jobs import job_runner
+        from models import Job
+        job_id = db.session.scalar(db.select(db.func.max(Job.id)))
+        if job_id is None:
+            # Deleting a user that does not exist is a no-op job
+            job_id = job_runner.enqueue('delete_user', {'user_id': 0, 'reassign_to': 0}).id
+            db.session.commit()
+        return job_id
+
+    csv = 'email,username,first_name,last_name\n' + ''.join(
+        f'import{n}@example.com,import{n},Import,User{n}\n' for n in range(20))
+
+    p, t, u = targets.project_id, targets.task_id, targets.user
+    return [
+        ('index', 'GET', 'admin', lambda c, i: {'path': '/'}),
+        ('search_page', 'GET', 'admin', lambda c, i: {'path': '/search?q=task'}),
+        ('api_search', 'GET', 'admin', lambda c, i: {'path': '/api/search?q=feedback'}),
+        ('login', 'GET', 'anonymous', lambda c, i: {'path': '/login'}),
+        ('login', 'POST', 'anonymous',
+         lambda c, i: {'path': '/login', 'data': {'username': ADMIN, 'password': PASSWORD}}),
+        ('logout', 'GET', 'session', lambda c, i: login_first(c, i) or {'path': '/logout'}),
+        ('projects', 'GET', 'admin', lambda c, i: {'path': '/projects'}),
+        ('projects_page', 'GET', 'admin', lambda c, i: {'path': '/projects/page?status=active'}),
+        ('create_project', 'GET', 'admin', lambda c, i: {'path': '/projects/create'}),
+        ('create_project', 'POST', 'admin',
+         lambda c, i: {'path': '/projects/create', 'data': {'title': f'Bench {i}', 'description': 'New'}}),
+        ('view_project', 'GET', 'admin', lambda c, i: {'path': f'/projects/{p}'}),
+        ('edit_project', 'GET', 'admin', lambda c, i: {'path': f'/projects/{p}/edit'}),
+        ('edit_project', 'POST', 'admin',
+         lambda c, i: {'path': f'/projects/{p}/edit',
+                       'data': {'title': 'Project 1', 'description': 'Edited', 'status': 'active'}}),
+        ('add_task', 'POST', 'admin',
+         lambda c, i: {'path': f'/project/{p}/add_task',
+                       'data': {'title': f'Added {i}', 'parent_id': targets.parent_task_id}}),
+        ('toggle_task', 'POST', 'admin', lambda c, i: {'path': f'/api/tasks/{t}/toggle'}),
+        ('lookup_user', 'GET', 'admin', lambda c, i: {'path': f'/api/users/lookup/{u}'}),
+        ('search_users', 'GET', 'admin', lambda c, i: {'path': '/api/users/search?q=user1'}),
+        ('assign_task', 'POST', 'admin', lambda c, i: {'path': f'/api/tasks/{t}/assign', 'json': {'username': u}}),
+        ('user_profile', 'GET', 'admin', lambda c, i: {'path': f'/profile/{u}'}),
+        ('admin_users', 'GET', 'admin', lambda c, i: {'path': '/admin/users'}),
+        ('quick_add_user', 'POST', 'admin',
+         lambda c, i: {'path': '/admin/users/quick-add',
+                       'data': {'email': f'quick{i}-{time.monotonic_ns()}@example.com', 'password': 'secret1'}}),
+        ('import_users', 'POST', 'admin',
+         lambda c, i: {'path': '/admin/users/import',
+                       'data': {'file': (io.BytesIO(csv.replace('import', f'import{i}-{time.monotonic_ns()}-').encode()),
+                                         'users.csv')}}),
+        ('delete_user', 'DELETE', 'admin', lambda c, i: {'path': f'/admin/users/{fresh_user(c, i)}/delete'}),
+        ('admin_db_pool', 'GET', 'admin', lambda c, i: {'path': '/admin/db/pool'}),
+        ('admin_profiles', 'GET', 'admin', lambda c, i: {'path': '/admin/profiles'}),
+        ('admin_jobs', 'GET', 'admin', lambda c, i: {'path': '/admin/jobs'}),
+        ('admin_job', 'GET', 'admin', lambda c, i: {'path': f'/admin/jobs/{some_job(c, i)}'}),
+        ('get_user_info', 'GET', 'admin', lambda c, i: {'path': f'/admin/users/{u}/info'}),
+        ('edit_user', 'POST', 'admin',
+         lambda c, i: {'path': f'/admin/users/{u}/edit',
+                       'json': {'username': u, 'email': f'{u}@example.com', 'role': 'user',
+                                'is_admin': False, 'is_active': True}}),
+        ('change_password', 'POST', 'admin',
+         lambda c, i: {'path': f'/profile/{ADMIN}/change-password',
+                       'data': {'current_password': PASSWORD, 'new_password': PASSWORD,
+                                'confirm_password': PASSWORD}}),
+        ('delete_task', 'DELETE', 'admin', lambda c, i: {'path': f'/api/tasks/{fresh_task(c, i)}/delete'}),
+        ('edit_task', 'POST', 'admin',
+         lambda c, i: {'path': f'/api/tasks/{t}/edit', 'data': {'title': f'Task {t}', 'description': 'Edited'}}),
+        ('edit_profile', 'POST', 'admin',
+         lambda c, i: {'path': f'/profile/{ADMIN}/edit', 'json': {'email': f'{ADMIN}@example.com'}}),
+        ('admin_change_password', 'POST', 'admin',
+         lambda c, i: {'path': f'/admin/users/{u}/change-password', 'json': {'new_password': PASSWORD}}),
+        ('task_detail', 'GET', 'admin', lambda c, i: {'path': f'/tasks/{t}'}),
+        ('task_detail', 'POST', 'admin',
+         lambda c, i: {'path': f'/tasks/{t}', 'data': {'action': 'notes', 'notes': f'Note {i}'}}),
+        ('api_project', 'GET', 'admin', lambda c, i: {'path': f'/api/projects/{p}'}),
+        ('api_project_tasks', 'GET', 'admin', lambda c, i: {'path': f'/api/projects/{p}/tasks'}),
+    ]
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run(app, repeat, warmup, only=None):
+    from sqlalchemy import event
+    from jobs import job_runner
+    from models import db
+
+    queries = [0]
+
+    def _count(*args):
+        queries[0] += 1
+
+    # Requests run outside any app context of ours: g belongs to the app
+    # context, and one shared across requests would keep the logged-in user
+    with app.app_context():
+        engine = db.engine
+        with engine.connect() as connection:
+            targets = Targets(connection)
+    event.listen(engine, 'before_cursor_execute', _count)
+
+    admin = app.test_client()
+    admin.post('/login', data={'username': ADMIN, 'password': PASSWORD})
+    results = {}
+    for endpoint, method, kind, build in cases(targets):
+        if only and endpoint not in only:
+            continue
+        name = f'{endpoint} {method}'
+        client = admin if kind == 'admin' else app.test_client()
+        latencies, counts, statuses, job_latencies = [], [], set(), []
+        for i in range(warmup + repeat):
+            with app.app_context():
+                request = build(client, i)
+            path = request.pop('path')
+            queries[0] = 0
+            started = time.perf_counter()
+            response = client.open(path, method=method, **request)
+            response.get_data()  # Drain streamed bodies
+            elapsed = time.perf_counter() - started
+            response.close()
+            job_elapsed = None
+            if response.status_code == 202:
+                # The route only queued a job; run it here so the real work is measured too
+                with app.app_context():
+                    started = time.perf_counter()
+                    job_runner.run_pending()
+                    job_elapsed = time.perf_counter() - started
+            if i >= warmup:
+                latencies.append(elapsed * 1000)
+                counts.append(queries[0])
+                statuses.add(response.status_code)
+                if job_elapsed is not None:
+                    job_latencies.append(job_elapsed * 1000)
+        results[name] = {
+            'path': path,
+            'status': sorted(statuses),
+            'p50_ms': statistics.median(latencies),
+            'p95_ms': percentile(latencies, 0.95),
+            'mean_ms': statistics.fmean(latencies),
+            'queries': statistics.median(counts),
+        }
+        print(f'{name:<32}{results[name]["p50_ms"]:>10.2f}{results[name]["p95_ms"]:>10.2f}'
+              f'{results[name]["queries"]:>9.0f}  {results[name]["status"]}', file=sys.stderr)
+        if job_latencies:
+            results[name]['job_p50_ms'] = statistics.median(job_latencies)
+            results[name]['job_p95_ms'] = percentile(job_latencies, 0.95)
+            print(f'{"  (its job)":<32}{results[name]["job_p50_ms"]:>10.2f}{results[name]["job_p95_ms"]:>10.2f}',
+                  file=sys.stderr)
+    event.remove(engine, 'before_cursor_execute', _count)
+
+    measured = {endpoint for endpoint, *_ in cases(targets)}
+    missing = sorted(set(app.view_functions) - measured - set(SKIPPED))
+    return results, missing
+
+
+def compare(results, baseline, max_regression, min_delta_ms):
+    """Regressions of `results` against `baseline`, as messages."""
+    regressions = []
+    for name, before in baseline['routes'].items():
+        after = results['routes'].get(name)
+        if after is None:
+            continue
+        limit = before['p50_ms'] * (1 + max_regression / 100)
+        if after['p50_ms'] > limit and after['p50_ms'] - before['p50_ms'] >= min_delta_ms:
+            regressions.append(f'{name}: median {before["p50_ms"]:.2f} -> {after["p50_ms"]:.2f} ms '
+                               f'(+{(after["p50_ms"] / before["p50_ms"] - 1) * 100:.0f}%)')
+        if 'job_p50_ms' in before and 'job_p50_ms' in after:
+            limit = before['job_p50_ms'] * (1 + max_regression / 100)
+            if after['job_p50_ms'] > limit and after['job_p50_ms'] - before['job_p50_ms'] >= min_delta_ms:
+                regressions.append(f'{name}: job median {before["job_p50_ms"]:.2f} -> {after["job_p50_ms"]:.2f} ms')
+        if after['queries'] > before['queries']:
+            regressions.append(f'{name}: {before["queries"]:.0f} -> {after["queries"]:.0f} queries')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=0.01, help='fraction of the full dataset (1 = 1M tasks)')
+    parser.add_argument('--db', help='SQLite file to seed, or reuse when it already holds data')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--route', action='append', help='only measure this endpoint (repeatable)')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare with')
+    parser.add_argument('--max-regression', type=float, default=20.0, help='allowed median slowdown in percent')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignore slowdowns smaller than this, which are mostly noise')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = args.db or os.path.join(directory, 'bench.db')
+        counts = prepare_database(path, args.scale)
+
+        from app import create_app
+        app = create_app(make_config(path))
+        print(f'{"route":<32}{"p50 ms":>10}{"p95 ms":>10}{"queries":>9}  status', file=sys.stderr)
+        routes, missing = run(app, args.repeat, args.warmup, args.route)
+        with app.app_context():
+            from models import db
+            db.engine.dispose()
+
+    if missing:
+        print(f'Not measured: {", ".join(missing)}', file=sys.stderr)
+
+    results = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'scale': args.scale,
+            'seeded': counts,
+            'repeat': args.repeat,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+        },
+        'routes': routes,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_regression, args.min_delta_ms)
+        for message in regressions:
+            print(f'REGRESSION {message}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print('No regressions against the baseline.', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/bench_sqlite_writes.py
+"""Sustained task writes per second from several processes sharing one SQLite file.
+
+Each worker builds its own app, as a gunicorn worker would, and loops on what
+the task routes do: read a project's open tasks, then either toggle a task
+(toggle_task) or add one (add_task) and commit. The same workload runs twice,
+once with SQLite's stock settings and no retries (how the app ran before) and
+once with the tuned settings from config.py.
+
+Usage:
+    python -m benchmarks.bench_sqlite_writes
+    python -m benchmarks.bench_sqlite_writes --workers 8 --seconds 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+MODES = {
+    'stock': {
+        'SQLITE_JOURNAL_MODE': 'delete',
+        'SQLITE_SYNCHRONOUS': 'full',
+        'SQLITE_BUSY_TIMEOUT_MS': 5000,  # pysqlite's default timeout
+        'SQLITE_MMAP_SIZE': 0,
+        'SQLITE_CACHE_SIZE_KB': 2000,
+        'SQLITE_WRITE_RETRIES': 0,
+    },
+    'tuned': {},
+}
+
+TASKS = 200
+
+
+def make_config(path, overrides):
+    from config import TestingConfig
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+
+    for key, value in overrides.items():
+        setattr(BenchConfig, key, value)
+    return BenchConfig
+
+
+def setup(path, overrides):
+    from app import create_app
+    from models import db, Project, Task, User
+
+    app = create_app(make_config(path, overrides))
+    with app.app_context():
+        db.create_all()
+        owner = User(username='bench', email='bench@example.com', password_hash='x')
+        project = Project(title='Bench', owner=owner)
+        db.session.add_all([owner, project])
+        db.session.add_all(Task(title=f'Task {i}', project=project, created_by=owner) for i in range(TASKS))
+        db.session.commit()
+
+
+def worker(path, overrides, seconds, results):
+    from sqlalchemy import func, select
+    from sqlalchemy.exc import OperationalError
+    from app import create_app
+    from models import db, Task
+
+    app = create_app(make_config(path, overrides))
+    writes = reads = errors = 0
+    with app.app_context():
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            try:
+                db.session.scalar(select(func.count(Task.id)).where(Task.project_id == 1, Task.is_completed.is_(False)))
+                reads += 1
+                if random.random() < 0.8:
+                    task = db.session.get(Task, random.randint(1, TASKS))
+                    task.is_completed = not task.is_completed
+                else:
+                    db.session.add(Task(title='Added', project_id=1, created_by_id=1))
+                db.session.commit()
+                writes += 1
+            except OperationalError:
+                db.session.rollback()
+                errors += 1
+    results.put((writes, reads, errors))
+
+
+def bench(mode, workers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.db')
+        setup(path, MODES[mode])
+
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        processes = [context.Process(target=worker, args=(path, MODES[mode], seconds, results))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+    writes, reads, errors = (sum(column) for column in zip(*totals))
+    return {'mode': mode, 'writes': writes / seconds, 'reads': reads / seconds, 'errors': errors}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--mode', action='append', choices=list(MODES), help='mode to run (repeatable)')
+    args = parser.parse_args()
+
+    print(f'{"mode":<8}{"writes/s":>12}{"reads/s":>12}{"lock errors":>14}  (workers={args.workers})')
+    for mode in args.mode or list(MODES):
+        result = bench(mode, args.workers, args.seconds)
+        print(f'{result["mode"]:<8}{result["writes"]:>12.1f}{result["reads"]:>12.1f}{result["errors"]:>14}')
+
+
+if __name__ == '__main__':
+    main()
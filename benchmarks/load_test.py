@@ -0,0 +1,323 @@
+# benchmarks/load_test.py
+"""Drive a realistic request mix from many logged-in users against a running server.
+
+Each simulated user has its own aiohttp session (cookie jar and keep-alive
+connection), logs in through the login form and then loops over a weighted
+mix: browsing /projects, opening one of their projects, toggling and
+assigning its tasks, reading a task and posting a submission on it. Users
+are the owners of seeded projects, read from the database, so every action
+is one they are allowed to take.
+
+Without --url a gunicorn server is started on a seeded SQLite file (see
+bench_routes for the dataset) and stopped afterwards. The report gives
+throughput and p50/p95/p99 latency and error rate per action; --output saves
+it as JSON and --compare prints the change against an earlier saved run.
+
+Usage:
+    python -m benchmarks.load_test --users 50 --duration 60
+    python -m benchmarks.load_test --scale 1 --db /tmp/bench.db --workers 4 --output run.json
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --db /tmp/bench.db --compare run.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+import aiohttp
+from benchmarks.bench_routes import PASSWORD, percentile, prepare_database
+
+# Relative weights of the actions in a user's loop
+MIX = {
+    'projects': 25,
+    'view_project': 30,
+    'toggle_task': 12,
+    'assign_task': 8,
+    'task_detail': 15,
+    'submit': 10,
+}
+TASKS_PER_PROJECT = 50
+CSRF_TOKEN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def load_accounts(database_url, count, seed):
+    """Owners of projects with tasks, with a few of their projects and tasks each."""
+    from sqlalchemy import create_engine, func, select
+    from models import Project, Task, User
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            rows = connection.execute(
+                select(User.username, Project.id)
+                .join(Project, Project.owner_id == User.id)
+                .where(select(Task.id).where(Task.project_id == Project.id).exists())
+                .order_by(User.id, Project.id)).all()
+            projects_by_owner = defaultdict(list)
+            for username, project_id in rows:
+                projects_by_owner[username].append(project_id)
+
+            rng = random.Random(seed)
+            owners = rng.sample(sorted(projects_by_owner), min(count, len(projects_by_owner)))
+            accounts = []
+            for username in owners:
+                projects = {}
+                for project_id in projects_by_owner[username][:5]:
+                    projects[project_id] = list(connection.scalars(
+                        select(Task.id).where(Task.project_id == project_id)
+                        .order_by(func.random()).limit(TASKS_PER_PROJECT)))
+                accounts.append({'username': username, 'projects': projects})
+            assignees = list(connection.scalars(select(User.username).order_by(func.random()).limit(200)))
+    finally:
+        engine.dispose()
+    return accounts, assignees
+
+
+async def login_form(session, base_url, username, password):
+    """Fields to POST to /login, including the form's CSRF token when it has one."""
+    async with session.get(base_url + '/login') as response:
+        match = CSRF_TOKEN.search(await response.text())
+    data = {'username': username, 'password': password}
+    if match:
+        data['csrf_token'] = match.group(1)
+    return data
+
+
+class Stats:
+    """Latencies and failures per action."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+
+    def record(self, action, elapsed, error=None):
+        self.latencies[action].append(elapsed)
+        if error is not None:
+            self.errors[action] += 1
+            self.error_samples.setdefault(action, error)
+
+    def report(self, duration):
+        actions = {}
+        for action, samples in sorted(self.latencies.items()):
+            actions[action] = {
+                'requests': len(samples),
+                'rps': len(samples) / duration,
+                'p50_ms': percentile(samples, 0.50) * 1000,
+                'p95_ms': percentile(samples, 0.95) * 1000,
+                'p99_ms': percentile(samples, 0.99) * 1000,
+                'error_rate': self.errors[action] / len(samples),
+            }
+            if action in self.error_samples:
+                actions[action]['first_error'] = self.error_samples[action]
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            'requests': total,
+            'rps': total / duration,
+            'error_rate': sum(self.errors.values()) / total if total else 0.0,
+            'actions': actions,
+        }
+
+
+class SimulatedUser:
+    def __init__(self, base_url, account, assignees, stats, rng, think):
+        self.base_url = base_url
+        self.account = account
+        self.assignees = assignees
+        self.stats = stats
+        self.rng = rng
+        self.think = think
+
+    async def request(self, session, action, method, path, expect=(200,), **kwargs):
+        started = time.perf_counter()
+        error = None
+        try:
+            async with session.request(method, self.base_url + path, allow_redirects=False, **kwargs) as response:
+                await response.read()
+                if response.status not in expect:
+                    error = f'{method} {path}: HTTP {response.status}'
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = f'{method} {path}: {type(e).__name__} {e}'
+        self.stats.record(action, time.perf_counter() - started, error)
+        return error is None
+
+    async def login(self, session):
+        data = await login_form(session, self.base_url, self.account['username'], PASSWORD)
+        # A successful login redirects; a failed one renders the form again with 200
+        return await self.request(session, 'login', 'POST', '/login', expect=(302,), data=data)
+
+    async def step(self, session):
+        action = self.rng.choices(list(MIX), weights=list(MIX.values()))[0]
+        project_id = self.rng.choice(list(self.account['projects']))
+        tasks = self.account['projects'][project_id]
+        task_id = self.rng.choice(tasks)
+
+        if action == 'projects':
+            await self.request(session, action, 'GET', '/projects')
+        elif action == 'view_project':
+            await self.request(session, action, 'GET', f'/projects/{project_id}')
+        elif action == 'toggle_task':
+            await self.request(session, action, 'POST', f'/api/tasks/{task_id}/toggle')
+        elif action == 'assign_task':
+            await self.request(session, action, 'POST', f'/api/tasks/{task_id}/assign',
+                               json={'username': self.rng.choice(self.assignees)})
+        elif action == 'task_detail':
+            await self.request(session, action, 'GET', f'/tasks/{task_id}')
+        elif action == 'submit':
+            await self.request(session, action, 'POST', f'/tasks/{task_id}', expect=(302,),
+                               data={'action': 'submit', 'submission_text': 'Load test submission',
+                                     'submission_url': 'https://example.com/load-test'})
+
+    async def run(self, start_delay, deadline):
+        await asyncio.sleep(start_delay)
+        # One connection per user, kept alive across its requests like a browser tab
+        connector = aiohttp.TCPConnector(limit=1)
+        timeout = aiohttp.ClientTimeout(total=30)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         cookie_jar=aiohttp.CookieJar(unsafe=True)) as session:
+            if not await self.login(session):
+                return
+            while time.monotonic() < deadline:
+                await self.step(session)
+                if self.think:
+                    await asyncio.sleep(self.rng.expovariate(1 / self.think))
+
+
+async def drive(base_url, accounts, assignees, duration, ramp_up, think, seed):
+    stats = Stats()
+    started = time.monotonic()
+    deadline = started + ramp_up + duration
+    users = [SimulatedUser(base_url, account, assignees, stats, random.Random(seed + i), think)
+             for i, account in enumerate(accounts)]
+    await asyncio.gather(*(user.run(ramp_up * i / len(users), deadline) for i, user in enumerate(users)))
+    login = stats.latencies.pop('login', [])
+    login_errors = stats.errors.pop('login', 0)
+    # Throughput is over the whole run, ramp-up included, as requests made during it are counted too
+    return stats, time.monotonic() - started, {'logins': len(login), 'login_errors': login_errors}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(database_url, workers):
+    """Start gunicorn on a free local port; returns the process and its base URL."""
+    port = free_port()
+    env = dict(os.environ, FLASK_ENV='production', DATABASE_URL=database_url,
+               SECRET_KEY=os.environ.get('SECRET_KEY', 'load-test'))
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py',
+                                '--workers', str(workers), '--bind', f'127.0.0.1:{port}',
+                                '--log-level', 'warning'], env=env)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit('gunicorn exited during startup')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process, base_url
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit('gunicorn did not start listening within 30s')
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_report(report, previous=None):
+    print(f'{report["requests"]} requests, {report["rps"]:.1f} req/s, '
+          f'{report["error_rate"] * 100:.2f}% errors')
+    print(f'{"action":<16}{"requests":>10}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"errors":>9}')
+    for action, row in report['actions'].items():
+        line = (f'{action:<16}{row["requests"]:>10}{row["rps"]:>9.1f}{row["p50_ms"]:>9.1f}'
+                f'{row["p95_ms"]:>9.1f}{row["p99_ms"]:>9.1f}{row["error_rate"] * 100:>8.2f}%')
+        before = previous and previous['actions'].get(action)
+        if before:
+            line += f'   p95 {(row["p95_ms"] / before["p95_ms"] - 1) * 100:+.0f}% vs {before["p95_ms"]:.1f}'
+        print(line)
+    for action, row in report['actions'].items():
+        if 'first_error' in row:
+            print(f'first {action} error: {row["first_error"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help='server to test; by default gunicorn is started locally')
+    parser.add_argument('--db', help='SQLite file with the seeded data (seeded when empty)')
+    parser.add_argument('--database-url', help='database of the server under test, instead of --db')
+    parser.add_argument('--scale', type=float, default=0.01, help='dataset size when seeding, see bench_routes')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers when starting the server')
+    parser.add_argument('--users', type=int, default=20, help='simulated users')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of load after ramp-up')
+    parser.add_argument('--ramp-up', type=float, default=5.0, help='seconds over which users log in')
+    parser.add_argument('--think', type=float, default=0.0, help='mean pause between a user\'s requests, seconds')
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help='save the report as JSON to this file')
+    parser.add_argument('--compare', help='JSON report of an earlier run to compare with')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database_url = args.database_url
+        if database_url is None:
+            path = args.db or os.path.join(directory, 'load.db')
+            prepare_database(path, args.scale)
+            database_url = f'sqlite:///{path}'
+
+        accounts, assignees = load_accounts(database_url, args.users, args.seed)
+        if not accounts:
+            raise SystemExit('No project owners with tasks found; seed the database first')
+
+        process = None
+        base_url = args.url
+        if base_url is None:
+            process, base_url = start_server(database_url, args.workers)
+        try:
+            stats, duration, logins = asyncio.run(drive(base_url.rstrip('/'), accounts, assignees,
+                                                        args.duration, args.ramp_up, args.think, args.seed))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'url': args.url or f'local gunicorn, {args.workers} workers',
+            'users': len(accounts),
+            'duration': duration,
+            'think': args.think,
+            'python': platform.python_version(),
+            **logins,
+        },
+        **stats.report(duration),
+    }
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_report(report, previous)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
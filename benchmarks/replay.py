@@ -0,0 +1,201 @@
+# benchmarks/replay.py
+"""Replay captured production traffic against a build and diff per-route latency.
+
+Reads a file written with TRAFFIC_CAPTURE_PATH set (see traffic_capture.py)
+and re-sends each request as the user who made it: user ids are mapped to
+usernames through --database-url and every user logs in with --password, so
+replay against a staging copy whose passwords were reset, or a seeded
+database. Each user's requests go out in order on their own session; with
+--speed 1 they keep the captured inter-arrival times, --speed 4 plays the
+trace four times faster and --speed 0 sends each user's requests back to
+back. Logins, password changes and uploads are not replayed, as their
+secrets and files were not captured.
+
+Usage:
+    python -m benchmarks.replay capture.jsonl --url http://old:8000 --database-url sqlite:///staging.db --output old.json
+    python -m benchmarks.replay capture.jsonl --url http://new:8000 --database-url sqlite:///staging.db --output new.json
+    python -m benchmarks.replay --diff old.json new.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+import aiohttp
+from benchmarks.bench_routes import percentile
+from benchmarks.load_test import git_revision, login_form
+
+SKIPPED_ENDPOINTS = (None, 'login', 'logout', 'change_password', 'admin_change_password', 'import_users')
+
+
+def usernames(database_url, user_ids):
+    from sqlalchemy import create_engine, select
+    from models import User
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            return dict(connection.execute(select(User.id, User.username).where(User.id.in_(user_ids))).all())
+    finally:
+        engine.dispose()
+
+
+def pairs(values):
+    """[(key, value), ...] from a {key: [values]} capture field."""
+    return [(key, value) for key, items in (values or {}).items() for value in items]
+
+
+class Replay:
+    def __init__(self, base_url, records, names, password, speed):
+        self.base_url = base_url
+        self.records = records
+        self.names = names
+        self.password = password
+        self.speed = speed
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.mismatches = defaultdict(int)
+        self.max_lag = 0.0
+        self.login_failures = 0
+
+    async def send(self, session, record):
+        route = f'{record["e"]} {record["m"]}'
+        kwargs = {'params': pairs(record.get('q'))}
+        if 'j' in record:
+            kwargs['json'] = record['j']
+        elif 'f' in record:
+            kwargs['data'] = pairs(record['f'])
+        started = time.perf_counter()
+        try:
+            async with session.request(record['m'], self.base_url + record['p'],
+                                       allow_redirects=False, **kwargs) as response:
+                await response.read()
+                status = response.status
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            status = None
+        self.latencies[route].append(time.perf_counter() - started)
+        if status is None or status >= 500:
+            self.errors[route] += 1
+        elif status != record['s']:
+            self.mismatches[route] += 1
+
+    async def user(self, user_id, records, start):
+        timeout = aiohttp.ClientTimeout(total=60)
+        async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=1), timeout=timeout,
+                                         cookie_jar=aiohttp.CookieJar(unsafe=True)) as session:
+            if user_id is not None:
+                username = self.names.get(user_id)
+                data = username and await login_form(session, self.base_url, username, self.password)
+                status = None
+                if data:
+                    async with session.post(self.base_url + '/login', data=data, allow_redirects=False) as response:
+                        status = response.status
+                if status != 302:
+                    # Their requests still go out, anonymously, and show up as mismatches
+                    self.login_failures += 1
+
+            first = self.records[0]['t']
+            for record in records:
+                if self.speed:
+                    due = start + (record['t'] - first) / self.speed
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    else:
+                        self.max_lag = max(self.max_lag, -delay)
+                await self.send(session, record)
+
+    async def run(self):
+        by_user = defaultdict(list)
+        for record in self.records:
+            by_user[record.get('u')].append(record)
+        start = time.monotonic()
+        await asyncio.gather(*(self.user(user_id, records, start) for user_id, records in by_user.items()))
+        return time.monotonic() - start
+
+    def report(self, duration):
+        routes = {}
+        for route, samples in sorted(self.latencies.items()):
+            routes[route] = {
+                'requests': len(samples),
+                'p50_ms': percentile(samples, 0.50) * 1000,
+                'p95_ms': percentile(samples, 0.95) * 1000,
+                'p99_ms': percentile(samples, 0.99) * 1000,
+                'errors': self.errors[route],
+                'status_mismatches': self.mismatches[route],
+            }
+        return {'duration': duration, 'max_lag_ms': self.max_lag * 1000,
+                'login_failures': self.login_failures, 'routes': routes}
+
+
+def diff(before, after):
+    print(f'{"route":<34}{"requests":>9}{"p50 before":>12}{"p50 after":>11}{"p95 before":>12}'
+          f'{"p95 after":>11}{"p95 change":>12}')
+    for route in sorted(set(before['routes']) | set(after['routes'])):
+        old, new = before['routes'].get(route), after['routes'].get(route)
+        if old is None or new is None:
+            print(f'{route:<34} only in {"after" if old is None else "before"}')
+            continue
+        change = (new['p95_ms'] / old['p95_ms'] - 1) * 100 if old['p95_ms'] else 0.0
+        print(f'{route:<34}{new["requests"]:>9}{old["p50_ms"]:>12.1f}{new["p50_ms"]:>11.1f}'
+              f'{old["p95_ms"]:>12.1f}{new["p95_ms"]:>11.1f}{change:>+11.0f}%')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('capture', nargs='?', help='capture file written by traffic_capture')
+    parser.add_argument('--url', help='base URL of the build to replay against')
+    parser.add_argument('--database-url', help='database of that build, to look up usernames')
+    parser.add_argument('--password', default='password', help='password every replayed user logs in with')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='1 keeps the captured timing, N plays N times faster, 0 sends without waiting')
+    parser.add_argument('--limit', type=int, help='replay only the first N requests')
+    parser.add_argument('--output', help='save the per-route report as JSON')
+    parser.add_argument('--diff', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two saved reports and exit')
+    args = parser.parse_args()
+
+    if args.diff:
+        with open(args.diff[0]) as f, open(args.diff[1]) as g:
+            diff(json.load(f), json.load(g))
+        return
+    if not args.capture or not args.url:
+        parser.error('a capture file and --url are required unless --diff is given')
+
+    from traffic_capture import read_capture
+    records = [record for record in read_capture(args.capture) if record['e'] not in SKIPPED_ENDPOINTS]
+    if args.limit:
+        records = records[:args.limit]
+    if not records:
+        raise SystemExit('Nothing to replay')
+
+    user_ids = {record['u'] for record in records if record.get('u') is not None}
+    names = usernames(args.database_url, user_ids) if args.database_url and user_ids else {}
+    if user_ids and not names:
+        print('No usernames found; requests will be sent anonymously. Pass --database-url.', file=sys.stderr)
+
+    replay = Replay(args.url.rstrip('/'), records, names, args.password, args.speed)
+    report = {
+        'meta': {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'url': args.url,
+            'capture': args.capture,
+            'speed': args.speed,
+        },
+        **replay.report(asyncio.run(replay.run())),
+    }
+    print(f'Replayed {len(records)} requests in {report["duration"]:.1f}s; '
+          f'fell behind schedule by up to {report["max_lag_ms"]:.0f} ms; {report["login_failures"]} failed logins')
+    for route, row in report['routes'].items():
+        print(f'{route:<34}{row["requests"]:>7}  p50 {row["p50_ms"]:7.1f}  p95 {row["p95_ms"]:7.1f}  '
+              f'p99 {row["p99_ms"]:7.1f} ms  errors {row["errors"]}  status changed {row["status_mismatches"]}')
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """A thread-safe, size-bounded LRU cache whose entries expire after ttl seconds.
+
+    A ttl of None keeps entries until they are evicted or removed. Hits and
+    misses are counted so callers can report hit ratios; on_lookup, if set,
+    is also called with True or False after every get().
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self.on_lookup = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize=None, ttl=None):
+        """Resize the cache and change the ttl, dropping everything cached so far."""
+        with self._lock:
+            if maxsize is not None:
+                self.maxsize = maxsize
+            self.ttl = ttl
+            self._data.clear()
+
+    def get(self, key, default=None):
+        hit = False
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > self.timer():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    hit = True
+                else:
+                    del self._data[key]
+            if not hit:
+                self.misses += 1
+                value = default
+        if self.on_lookup is not None:
+            self.on_lookup(hit)
+        return value
+
+    def set(self, key, value):
+        expires_at = self.timer() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry is not None else default
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
@@ -0,0 +1,194 @@
+# commands.py
+
+import os
+import time
+import click
+import migrate
+from models import db, User
+from passwords import password_hasher
+from user_import import UserImporter
+from user_index import user_index
+from search import rebuild_search_index
+from seed import DISTRIBUTIONS, Seeder
+from outbox import outbox
+from jobs import job_runner
+
+
+def init_commands(app):
+    @app.cli.command('create-admin')
+    @click.option('--username', prompt=True)
+    @click.option('--email', prompt=True)
+    @click.password_option(help='Prompted for, with confirmation, when omitted.')
+    def create_admin(username, email, password):
+        """Create an administrator account."""
+        username = username.strip()
+        email = email.strip()
+        if not password:
+            raise click.ClickException('Password cannot be empty.')
+        if User.query.filter_by(username=username).first():
+            raise click.ClickException('Username already exists.')
+        if User.query.filter_by(email=email).first():
+            raise click.ClickException('Email already exists.')
+
+        db.session.add(User(username=username, email=email,
+                            password_hash=password_hasher.hash(password),
+                            is_admin=True, role='admin'))
+        db.session.commit()
+        click.echo('Admin account created successfully.')
+
+    @app.cli.command('import-users')
+    @click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+    @click.option('--password', default='prepkc123', show_default=True,
+                  help='Password for rows without a password column.')
+    @click.option('--batch-size', default=1000, show_default=True, help='Rows per INSERT batch.')
+    @click.option('--workers', default=os.cpu_count() or 1, show_default=True,
+                  help='Processes used to hash passwords.')
+    def import_users(csv_file, password, batch_size, workers):
+        """Create users from a CSV file with email[,username,password,first_name,last_name,role] columns."""
+        importer = UserImporter(password_hasher,
+                                batch_size=batch_size,
+                                hash_workers=workers,
+                                default_password=password)
+        report = importer.run(csv_file)
+
+        for error in report.errors:
+            click.echo(f'line {error["line"]}: {error["error"]}', err=True)
+        click.echo(f'Created {report.created} users, skipped {len(report.errors)} rows.')
+
+    @app.cli.command('seed')
+    @click.option('--users', default=1000, show_default=True)
+    @click.option('--projects', default=500, show_default=True)
+    @click.option('--tasks', default=100000, show_default=True)
+    @click.option('--members-per-project', default=4, show_default=True, help='Average members added to each project.')
+    @click.option('--max-depth', default=3, show_default=True, help='Deepest subtask level below a top-level task.')
+    @click.option('--root-ratio', default=0.3, show_default=True, help='Share of tasks that are top-level.')
+    @click.option('--assigned-ratio', default=0.6, show_default=True)
+    @click.option('--completed-ratio', default=0.3, show_default=True)
+    @click.option('--feedback-per-task', default=0.2, show_default=True)
+    @click.option('--submissions-per-task', default=0.2, show_default=True)
+    @click.option('--project-distribution', type=click.Choice(DISTRIBUTIONS), default='pareto', show_default=True,
+                  help='How tasks are spread over projects.')
+    @click.option('--assignee-distribution', type=click.Choice(DISTRIBUTIONS), default='pareto', show_default=True,
+                  help='How projects and assigned tasks are spread over users.')
+    @click.option('--days', default=365, show_default=True, help='Age of the oldest generated rows.')
+    @click.option('--seed', 'random_seed', default=1234, show_default=True, help='Random seed; same seed, same data.')
+    @click.option('--batch-size', default=10000, show_default=True, help='Rows per INSERT batch.')
+    @click.option('--password', default='password', show_default=True, help='Password of every generated user.')
+    @click.option('--search-index/--no-search-index', default=True, show_default=True,
+                  help='Rebuild the full-text search index afterwards.')
+    def seed(random_seed, password, search_index, **sizes):
+        """Generate synthetic users, projects, task trees, memberships, feedback and submissions."""
+        try:
+            seeder = Seeder(seed=random_seed, **sizes)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+
+        report = seeder.run(db.session.connection(), password_hasher.hash(password))
+        db.session.commit()
+        # Bulk inserts skip mapper events, so let the typeahead index reload itself
+        user_index.clear()
+        for table, rows in report.rows.items():
+            click.echo(f'{table:<14}{rows:>10} rows in {report.seconds[table]:.1f}s')
+
+        if search_index:
+            click.echo('Rebuilding the search index...')
+            rebuild_search_index()
+        click.echo('Done.')
+
+    @app.cli.command('search-reindex')
+    def search_reindex():
+        """Rebuild the full-text search index from projects, tasks, feedback and submissions."""
+        rebuild_search_index()
+        click.echo('Search index rebuilt.')
+
+    @app.cli.group('mail')
+    def mail_cli():
+        """Deliver queued mail and queue due-date reminders."""
+
+    @mail_cli.command('send')
+    def mail_send():
+        """Send every message that is due, in batches."""
+        if not outbox.enabled:
+            raise click.ClickException('MAIL_SERVER is not set.')
+        report = outbox.deliver_all()
+        click.echo(f'Sent {report.sent}, retrying {report.retried}, failed {report.failed}.')
+
+    @mail_cli.command('sweep')
+    @click.option('--date', 'day', type=click.DateTime(['%Y-%m-%d']),
+                  help='Sweep as if today were this date. Defaults to today (UTC).')
+    def mail_sweep(day):
+        """Queue reminders for tasks falling due."""
+        queued = outbox.sweep(day.date() if day else None)
+        click.echo(f'Queued {queued} reminders.')
+
+    @app.cli.group('jobs')
+    def jobs_cli():
+        """Run queued background jobs."""
+
+    @jobs_cli.command('run')
+    @click.option('--watch', is_flag=True, help='Keep polling for new jobs instead of exiting when none are left.')
+    def jobs_run(watch):
+        """Run queued jobs in this process, one at a time."""
+        while True:
+            count = job_runner.run_pending()
+            if count:
+                click.echo(f'Ran {count} jobs.')
+            if not watch:
+                return
+            time.sleep(job_runner.poll_interval)
+
+    @app.cli.group('db')
+    def db_cli():
+        """Apply and revert versioned schema migrations."""
+
+    @db_cli.command('upgrade')
+    @click.option('--to', 'target', type=int, help='Stop at this version instead of the latest.')
+    def db_upgrade(target):
+        """Apply pending migrations."""
+        try:
+            applied = migrate.upgrade(db.engine, target)
+        except migrate.MigrationError as e:
+            raise click.ClickException(str(e))
+        for migration in applied:
+            click.echo(f'Applied {migration.version:04d} {migration.name}')
+        click.echo(f'Database is at version {migrate.current_version(db.engine)}.')
+
+    @db_cli.command('downgrade')
+    @click.option('--to', 'target', type=int,
+                  help='Revert migrations newer than this version (0 reverts all). Defaults to one step back.')
+    def db_downgrade(target):
+        """Revert applied migrations."""
+        if target is None:
+            current = migrate.current_version(db.engine)
+            earlier = [m.version for m in migrate.discover() if m.version < current]
+            target = earlier[-1] if earlier else 0
+        try:
+            reverted = migrate.downgrade(db.engine, target)
+        except migrate.MigrationError as e:
+            raise click.ClickException(str(e))
+        for migration in reverted:
+            click.echo(f'Reverted {migration.version:04d} {migration.name}')
+        click.echo(f'Database is at version {migrate.current_version(db.engine)}.')
+
+    @db_cli.command('current')
+    def db_current():
+        """Show the database's schema version."""
+        click.echo(migrate.current_version(db.engine))
+
+    @db_cli.command('history')
+    def db_history():
+        """List migrations, marking those applied."""
+        current = migrate.current_version(db.engine)
+        for migration in migrate.discover():
+            marker = '*' if migration.version <= current else ' '
+            click.echo(f'{marker} {migration.version:04d} {migration.name}: {migration.description}')
+
+    @db_cli.command('stamp')
+    @click.argument('version', type=int)
+    def db_stamp(version):
+        """Mark migrations up to VERSION as applied without running them."""
+        try:
+            migrate.stamp(db.engine, version)
+        except migrate.MigrationError as e:
+            raise click.ClickException(str(e))
+        click.echo(f'Database stamped at version {version}.')
@@ -0,0 +1,117 @@
+# conditional.py
+
+import hashlib
+from datetime import datetime, timezone
+from flask import current_app, request, session
+from flask_login import current_user
+from sqlalchemy import func, select
+from models import db, Project, Task, Feedback, Submission, User, project_users
+
+
+class PageValidator:
+    """ETag/Last-Modified validator computed from a cheap fingerprint query.
+
+    The ETag covers the fingerprint plus who is looking, because pages render
+    per-user controls. On pages that display flash messages, responses rendered
+    while messages were pending get no validator, so a message is neither
+    swallowed by a 304 nor replayed from the browser cache.
+    """
+
+    def __init__(self, fingerprint, last_modified=None, shows_flashes=False):
+        viewer = (current_user.id, current_user.is_administrator())
+        fingerprint = tuple(_naive(value) for value in fingerprint)
+        self.etag = hashlib.sha1(repr((viewer, fingerprint)).encode()).hexdigest()
+        self.last_modified = last_modified.replace(tzinfo=timezone.utc) if last_modified else None
+        self.has_flashes = shows_flashes and bool(session.get('_flashes'))
+
+    def is_fresh(self):
+        if self.has_flashes:
+            return False
+        if request.if_none_match:
+            return request.if_none_match.contains(self.etag)
+        if request.if_modified_since and self.last_modified:
+            return request.if_modified_since >= self.last_modified.replace(microsecond=0)
+        return False
+
+    def not_modified(self):
+        return self.apply(current_app.response_class(status=304))
+
+    def apply(self, response):
+        if not self.has_flashes:
+            response.set_etag(self.etag)
+            if self.last_modified:
+                response.last_modified = self.last_modified
+        # Browsers may keep the page but must revalidate it on every view
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+
+def _naive(value):
+    # Timestamps are stored as naive UTC; objects created in this session may still be aware
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _latest(*values):
+    values = [_naive(value) for value in values if value is not None]
+    return max(values) if values else None
+
+
+def _count_and_latest(column, *criteria):
+    return (
+        select(func.count()).where(*criteria).scalar_subquery(),
+        select(func.max(column)).where(*criteria).scalar_subquery(),
+    )
+
+
+def project_validator(project_id):
+    """Fingerprint a project page from its row and its tasks, feedback, submissions and members.
+
+    Returns None if the project does not exist.
+    """
+    task_ids = select(Task.id).where(Task.project_id == project_id)
+    row = db.session.execute(
+        select(
+            Project.updated_at,
+            Project.owner_id,
+            User.username,
+            *_count_and_latest(Task.updated_at, Task.project_id == project_id),
+            *_count_and_latest(Feedback.feedback_date, Feedback.task_id.in_(task_ids)),
+            *_count_and_latest(Submission.submission_date, Submission.task_id.in_(task_ids)),
+            select(func.count()).where(project_users.c.project_id == project_id).scalar_subquery()
+        ).join(User, User.id == Project.owner_id).where(Project.id == project_id)
+    ).first()
+
+    if row is None:
+        return None
+    return PageValidator(tuple(row), _latest(row[0], row[4], row[6], row[8]))
+
+
+def task_validator(task):
+    """Fingerprint a task page from the task, its parent, feedback and submissions."""
+    parent_updated_at = select(Task.updated_at).where(Task.id == task.parent_id).scalar_subquery()
+    row = db.session.execute(
+        select(
+            parent_updated_at,
+            *_count_and_latest(Feedback.feedback_date, Feedback.task_id == task.id),
+            *_count_and_latest(Submission.submission_date, Submission.task_id == task.id)
+        )
+    ).first()
+
+    fingerprint = (task.updated_at, task.assigned_to_id, task.project.owner_id) + tuple(row)
+    return PageValidator(fingerprint, _latest(task.updated_at, row[0], row[2], row[4]))
+
+
+def profile_validator(user):
+    """Fingerprint a profile page from the user and the tasks assigned to them."""
+    row = db.session.execute(
+        select(func.count(Task.id), func.max(Task.updated_at), func.max(Project.updated_at))
+        .join(Project, Project.id == Task.project_id)
+        .where(Task.assigned_to_id == user.id)
+    ).first()
+
+    return PageValidator((user.updated_at,) + tuple(row),
+                         _latest(user.updated_at, row[1], row[2]),
+                         shows_flashes=True)
@@ -1,9 +1,91 @@
 # config.py
 import os
+from dotenv import load_dotenv
+from db_pool import engine_options
+
+# Settings below are read from the environment, so .env has to be loaded first
+load_dotenv()
 
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY', 'your_secret_key')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    PROJECTS_PER_PAGE = 24
+    RENDER_CACHE_SIZE = int(os.environ.get('RENDER_CACHE_SIZE', 2048))
+    SEARCH_RESULTS_LIMIT = 20
+    # Text search configuration used for the tsvector index on PostgreSQL
+    SEARCH_LANGUAGE = os.environ.get('SEARCH_LANGUAGE', 'english')
+    IDENTITY_CACHE_SIZE = int(os.environ.get('IDENTITY_CACHE_SIZE', 1024))
+    # Other workers keep serving a changed user's old identity for up to this many seconds
+    IDENTITY_CACHE_TTL = float(os.environ.get('IDENTITY_CACHE_TTL', 10))
+    # Seconds before a worker reloads its username typeahead index from the database
+    USER_SEARCH_REFRESH = float(os.environ.get('USER_SEARCH_REFRESH', 300))
+    # Any werkzeug method string, e.g. 'scrypt', 'scrypt:16384:8:1', 'pbkdf2:sha256:600000'
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt')
+    PASSWORD_SALT_LENGTH = int(os.environ.get('PASSWORD_SALT_LENGTH', 16))
+    # Threads per worker process used to verify passwords; 0 verifies inline
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 30))
+    USER_IMPORT_BATCH_SIZE = int(os.environ.get('USER_IMPORT_BATCH_SIZE', 1000))
+    USER_IMPORT_HASH_WORKERS = int(os.environ.get('USER_IMPORT_HASH_WORKERS', os.cpu_count() or 1))
+    # Applied to every SQLite connection; WAL lets readers run alongside the single writer
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'wal')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'normal')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 20000))
+    # Retries, with backoff starting at SQLITE_RETRY_BACKOFF seconds, for writes still locked after busy_timeout
+    SQLITE_WRITE_RETRIES = int(os.environ.get('SQLITE_WRITE_RETRIES', 5))
+    SQLITE_RETRY_BACKOFF = float(os.environ.get('SQLITE_RETRY_BACKOFF', 0.05))
+    # A statement shape running more than this many times in one request is reported as a likely N+1
+    SQL_REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', 10))
+    SQL_RAISE_ON_REPEAT = False
+    # Queries at least this slow are logged with their plan; 0 disables the log
+    SQL_SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_QUERY_MS', 200))
+    SQL_SLOW_QUERY_LOG = os.environ.get('SQL_SLOW_QUERY_LOG')
+    # When set, /metrics requires "Authorization: Bearer <token>"; without it only
+    # direct requests from this host are answered, unless METRICS_PUBLIC is set
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'false').lower() in ('1', 'true', 'yes')
+    # Profile reports (pstats dumps and text summaries); defaults to <instance>/profiles
+    PROFILE_DIR = os.environ.get('PROFILE_DIR')
+    PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+    PROFILE_TOP = int(os.environ.get('PROFILE_TOP', 40))
+    # Lifetime in seconds of the tokens handed out on /admin/profiles
+    PROFILE_TOKEN_MAX_AGE = int(os.environ.get('PROFILE_TOKEN_MAX_AGE', 3600))
+    # Profile one request in PROFILE_SAMPLE_EVERY to these endpoints, e.g. "view_project,toggle_task"; 0 disables
+    PROFILE_SAMPLE_EVERY = int(os.environ.get('PROFILE_SAMPLE_EVERY', 0))
+    PROFILE_SAMPLE_ENDPOINTS = [name for name in os.environ.get('PROFILE_SAMPLE_ENDPOINTS', '').split(',') if name]
+    # When set, a sanitized trace of every request is appended to this file for benchmarks/replay.py
+    TRAFFIC_CAPTURE_PATH = os.environ.get('TRAFFIC_CAPTURE_PATH')
+    # Outgoing mail is queued in the outbox table and sent in the background; unset MAIL_SERVER disables it
+    MAIL_SERVER = os.environ.get('MAIL_SERVER')
+    MAIL_PORT = int(os.environ.get('MAIL_PORT', 25))
+    MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'false').lower() in ('1', 'true', 'yes')
+    MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
+    MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    MAIL_SENDER = os.environ.get('MAIL_SENDER', 'noreply@localhost')
+    MAIL_TIMEOUT = float(os.environ.get('MAIL_TIMEOUT', 10))
+    # Messages sent per SMTP connection
+    MAIL_BATCH_SIZE = int(os.environ.get('MAIL_BATCH_SIZE', 50))
+    # Failed sends are retried after MAIL_RETRY_BACKOFF seconds, doubling each time, up to MAIL_MAX_ATTEMPTS tries
+    MAIL_MAX_ATTEMPTS = int(os.environ.get('MAIL_MAX_ATTEMPTS', 5))
+    MAIL_RETRY_BACKOFF = float(os.environ.get('MAIL_RETRY_BACKOFF', 60))
+    # How long a claimed batch is reserved for its sender before another may take it over
+    MAIL_LEASE_SECONDS = int(os.environ.get('MAIL_LEASE_SECONDS', 300))
+    # Seconds between background delivery runs in each worker; 0 leaves delivery to `flask mail send`
+    MAIL_SEND_INTERVAL = float(os.environ.get('MAIL_SEND_INTERVAL', 10))
+    # Assignees are reminded this many days before a task's due date
+    MAIL_REMINDER_DAYS = int(os.environ.get('MAIL_REMINDER_DAYS', 1))
+    # Threads per worker process running background jobs; 0 leaves them to `flask jobs run`
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    # Seconds between checks for jobs queued by other processes
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 2))
+    # A running job not heard from for this long is taken over by another runner
+    JOB_LEASE_SECONDS = int(os.environ.get('JOB_LEASE_SECONDS', 300))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', 30))
+    # Uploads waiting for their job; defaults to <instance>/jobs
+    JOB_FILES_DIR = os.environ.get('JOB_FILES_DIR')
 
 class DevelopmentConfig(Config):
     DEBUG = True
@@ -13,6 +95,10 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    USER_IMPORT_HASH_WORKERS = 0
+    SQL_RAISE_ON_REPEAT = True
+    MAIL_SEND_INTERVAL = 0
+    JOB_WORKERS = 0
 
 class ProductionConfig(Config):
     DEBUG = False
@@ -20,3 +106,5 @@ class ProductionConfig(Config):
     if uri and uri.startswith('postgres://'):
         uri = uri.replace('postgres://', 'postgresql://', 1)
     SQLALCHEMY_DATABASE_URI = uri
+    # Pool sizing, pre-ping, recycle and statement timeout from DB_* variables
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options(uri)
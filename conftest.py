@@ -1,14 +1,21 @@
 # conftest.py
 
 import pytest
-from app import app as flask_app
+from app import create_app
 from models import db
 from config import TestingConfig
+from identity import identity_cache
+from render_cache import render_cache
+from user_index import user_index
 
 @pytest.fixture
 def app():
-    # Configure the app for testing
-    flask_app.config.from_object(TestingConfig)
+    flask_app = create_app(TestingConfig)
+
+    # Ids are reused once the in-memory database is dropped, so start each test cold
+    identity_cache.clear()
+    render_cache.clear()
+    user_index.clear()
 
     with flask_app.app_context():
         # Create all tables in the in-memory database
@@ -0,0 +1,143 @@
+# db_pool.py
+
+import os
+import threading
+import time
+from collections import deque
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import QueuePool
+
+# Checkout times kept per pool for percentiles; older samples are dropped
+RECENT_SAMPLES = 1024
+
+
+class PoolStats:
+    """Counters for one engine's pool within this worker process."""
+
+    COUNTERS = ('checkouts', 'checkins', 'connects', 'invalidations', 'soft_invalidations', 'timeouts')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.waits = 0
+        self.wait_time = 0.0
+        self.checkout_time = 0.0
+        self.max_checkout_time = 0.0
+        self.overflow_high_water = 0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_checkout(self, elapsed, waited, overflow):
+        with self._lock:
+            self.checkout_time += elapsed
+            self.max_checkout_time = max(self.max_checkout_time, elapsed)
+            self.recent.append(elapsed)
+            if waited:
+                self.waits += 1
+                self.wait_time += elapsed
+            self.overflow_high_water = max(self.overflow_high_water, overflow)
+
+    def to_dict(self):
+        with self._lock:
+            counters = {name: getattr(self, name) for name in self.COUNTERS}
+            recent = sorted(self.recent)
+            timed = len(self.recent)
+            report = {
+                **counters,
+                'waits': self.waits,
+                'wait_ms_total': self.wait_time * 1000,
+                'checkout_ms_avg': self.checkout_time / timed * 1000 if timed else None,
+                'checkout_ms_max': self.max_checkout_time * 1000,
+                'overflow_high_water': self.overflow_high_water,
+            }
+
+        for name, fraction in (('checkout_ms_p50', 0.50), ('checkout_ms_p95', 0.95), ('checkout_ms_p99', 0.99)):
+            report[name] = recent[min(len(recent) - 1, int(len(recent) * fraction))] * 1000 if recent else None
+        return report
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that counts its events and times each checkout.
+
+    Pool events only fire once a connection has been handed out, so the time
+    spent getting one is measured around _do_get. A checkout counts as a wait
+    when no idle connection was available and the overflow was used up.
+    engine.dispose() replaces the pool through recreate(), which carries the
+    stats and the event listeners over to the new pool.
+    """
+
+    def __init__(self, *args, **kwargs):
+        inherited = kwargs.get('_dispatch') is not None
+        super().__init__(*args, **kwargs)
+        if not inherited:
+            self.stats = PoolStats()
+            self._listen()
+
+    def _listen(self):
+        stats = self.stats
+        for name, counter in (('checkout', 'checkouts'), ('checkin', 'checkins'),
+                              ('connect', 'connects'), ('invalidate', 'invalidations'),
+                              ('soft_invalidate', 'soft_invalidations')):
+            event.listen(self, name, lambda *args, counter=counter: stats.increment(counter))
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+    def _do_get(self):
+        waited = self.checkedin() == 0 and self._max_overflow > -1 and self.overflow() >= self._max_overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeout:
+            self.stats.increment('timeouts')
+            raise
+        self.stats.record_checkout(time.perf_counter() - start, waited, max(self.overflow(), 0))
+        return connection
+
+
+def engine_options(uri, environ=os.environ):
+    """SQLALCHEMY_ENGINE_OPTIONS for `uri`, tuned from DB_* environment variables.
+
+    Each worker process has its own pool, so workers * (DB_POOL_SIZE +
+    DB_MAX_OVERFLOW) has to stay below the server's max_connections.
+    """
+    if not uri or not uri.startswith('postgresql'):
+        return {}
+
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': int(environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(environ.get('DB_MAX_OVERFLOW', 2)),
+        'pool_timeout': float(environ.get('DB_POOL_TIMEOUT', 10)),
+        # Recycle before server or proxy idle timeouts close connections under us
+        'pool_recycle': int(environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': environ.get('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes'),
+    }
+    statement_timeout = int(environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    if statement_timeout:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+def pool_report(engines):
+    """State and counters of each engine's pool in this worker, keyed by bind name."""
+    report = {}
+    for bind, engine in engines.items():
+        pool = engine.pool
+        entry = {'pool': type(pool).__name__, 'status': pool.status()}
+        if isinstance(pool, QueuePool):
+            entry.update(size=pool.size(), checked_in=pool.checkedin(),
+                         checked_out=pool.checkedout(), overflow=pool.overflow(),
+                         timeout=pool.timeout())
+        stats = getattr(pool, 'stats', None)
+        if stats is not None:
+            entry['stats'] = stats.to_dict()
+        report[bind or 'default'] = entry
+    return {'pid': os.getpid(), 'engines': report}
@@ -0,0 +1,24 @@
+# gunicorn.conf.py
+#
+# Used by `gunicorn wsgi:app`. With PROMETHEUS_MULTIPROC_DIR set, workers share
+# their metrics through files in that directory.
+
+import glob
+import os
+
+wsgi_app = 'wsgi:app'
+
+
+def on_starting(server):
+    # Samples left by a previous run would otherwise be added to this one's
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for path in glob.glob(os.path.join(directory, '*.db')):
+            os.remove(path)
+
+
+def child_exit(server, worker):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
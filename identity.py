@@ -0,0 +1,40 @@
+# identity.py
+
+from sqlalchemy.orm import make_transient_to_detached
+from cache import TTLCache
+from models import db, User
+
+# Detached User snapshots keyed by id. Each worker process has its own copy
+# and invalidate_user() only reaches this one, so the ttl, kept short, bounds
+# how long another worker can serve a demoted, deactivated or deleted user.
+identity_cache = TTLCache(maxsize=1024, ttl=10)
+
+
+def init_identity_cache(app):
+    identity_cache.configure(maxsize=app.config['IDENTITY_CACHE_SIZE'],
+                             ttl=app.config['IDENTITY_CACHE_TTL'])
+
+
+def _snapshot(user):
+    """Copy a loaded user's columns into a detached instance safe to share between requests."""
+    snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+    make_transient_to_detached(snapshot)
+    return snapshot
+
+
+def load_user(user_id):
+    """Return the User for Flask-Login, skipping the database when a fresh snapshot is cached."""
+    snapshot = identity_cache.get(user_id)
+    if snapshot is not None:
+        # Attach a copy to this request's session without emitting a SELECT
+        return db.session.merge(snapshot, load=False)
+
+    user = db.session.get(User, user_id)
+    if user is not None:
+        identity_cache.set(user_id, _snapshot(user))
+    return user
+
+
+def invalidate_user(user_id):
+    """Forget a cached identity; call after committing changes to that user."""
+    identity_cache.pop(user_id)
@@ -0,0 +1,297 @@
+# jobs.py
+
+import os
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, event, or_, select, update
+from sqlalchemy.orm import Session
+from models import Job, db
+
+
+def utcnow():
+    # Naive UTC, as the DateTime columns store it
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class LeaseLost(Exception):
+    """The job's lease expired and another runner has taken it over."""
+
+
+class JobContext:
+    """Handed to a job handler to report progress.
+
+    progress() commits the session, so call it between units of work: what
+    was done so far is kept, and the lease is extended each time.
+    """
+
+    def __init__(self, runner, job_id, token):
+        self.runner = runner
+        self.job_id = job_id
+        self.token = token
+
+    def progress(self, done, total=None, message=None):
+        values = {'progress_done': done,
+                  'lease_expires_at': utcnow() + timedelta(seconds=self.runner.lease)}
+        if total is not None:
+            values['progress_total'] = total
+        if message is not None:
+            values['message'] = message[:200]
+        result = db.session.execute(update(Job).where(Job.id == self.job_id, Job.lease_owner == self.token)
+                                    .values(**values))
+        db.session.commit()
+        if result.rowcount == 0:
+            raise LeaseLost(self.job_id)
+
+
+class JobRunner:
+    """Runs slow operations outside requests from a queue in the jobs table.
+
+    Requests enqueue a job in their own transaction and answer 202 straight
+    away. Each worker process runs a poller thread that claims up to `workers`
+    jobs and runs them on a thread pool. A claim is a lease: lease_owner and
+    lease_expires_at are set in one UPDATE, using SELECT ... FOR UPDATE SKIP
+    LOCKED on PostgreSQL so concurrent runners pass over each other's rows,
+    and a compare-and-set on the claimable condition on SQLite, whose writes
+    are serialized anyway. A job whose runner died is claimed again once its
+    lease expires; failures are retried with exponential backoff up to the
+    job's max_attempts.
+    """
+
+    def __init__(self):
+        self.handlers = {}
+        self.cleanups = {}
+        self.workers = 0
+        self._app = None
+        self._lock = threading.Lock()
+        self._running = set()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._executor = None
+
+    def init_app(self, app):
+        config = app.config
+        self.workers = config['JOB_WORKERS']
+        self.poll_interval = config['JOB_POLL_INTERVAL']
+        self.lease = config['JOB_LEASE_SECONDS']
+        self.max_attempts = config['JOB_MAX_ATTEMPTS']
+        self.backoff = config['JOB_RETRY_BACKOFF']
+        self.files_dir = config['JOB_FILES_DIR'] or os.path.join(app.instance_path, 'jobs')
+        self._app = app
+
+        if self.workers:
+            # Threads do not survive a fork, so each gunicorn worker starts its own on first request
+            @app.before_request
+            def _start_runner():
+                self.start()
+
+    def task(self, kind, cleanup=None):
+        """Register the decorated function as the handler for jobs of `kind`.
+
+        It is called as handler(context, **params) inside an app context and
+        returns a JSON-serializable result. `cleanup(**params)`, when given,
+        is called once the job has failed for good, including when it is given
+        up on without the handler running, to release what its params refer to.
+        """
+        def register(handler):
+            self.handlers[kind] = handler
+            if cleanup is not None:
+                self.cleanups[kind] = cleanup
+            return handler
+        return register
+
+    def enqueue(self, kind, params=None, created_by=None, max_attempts=None):
+        """Add a job to the session; it becomes runnable when the caller commits."""
+        if kind not in self.handlers:
+            raise ValueError(f'Unknown job kind: {kind}')
+        job = Job(kind=kind, params=params or {}, status='queued', attempts=0,
+                  max_attempts=max_attempts or self.max_attempts, run_after=utcnow(), progress_done=0,
+                  created_by_id=created_by)
+        db.session.add(job)
+        db.session.info['jobs_enqueued'] = True
+        return job
+
+    def save_upload(self, upload):
+        """Store an uploaded file where a job can read it; returns its path."""
+        os.makedirs(self.files_dir, exist_ok=True)
+        path = os.path.join(self.files_dir, f'{uuid.uuid4().hex}.upload')
+        upload.save(path)
+        return path
+
+    # Claiming
+
+    def claim(self, limit):
+        """Lease up to `limit` runnable jobs. Returns (lease token, job ids)."""
+        token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'[-64:]
+        now = utcnow()
+        claimable = or_(and_(Job.status == 'queued', Job.run_after <= now),
+                        and_(Job.status == 'running', Job.lease_expires_at < now))
+        candidates = select(Job.id).where(claimable).order_by(Job.id).limit(limit)
+        if db.session.get_bind().dialect.name == 'postgresql':
+            # Locked rows belong to runners claiming right now; skip them rather than wait
+            ids = db.session.scalars(candidates.with_for_update(skip_locked=True)).all()
+            condition = Job.id.in_(ids)
+        else:
+            ids = db.session.scalars(candidates).all()
+            # Rows claimed by another runner since the select no longer match
+            condition = and_(Job.id.in_(ids), claimable)
+        if not ids:
+            db.session.rollback()
+            return token, []
+
+        db.session.execute(update(Job).where(condition).values(
+            status='running', lease_owner=token, lease_expires_at=now + timedelta(seconds=self.lease),
+            attempts=Job.attempts + 1, started_at=now, finished_at=None))
+        db.session.commit()
+        return token, db.session.scalars(select(Job.id).where(Job.lease_owner == token)
+                                         .order_by(Job.id)).all()
+
+    # Running
+
+    def _finish(self, job_id, token, **values):
+        db.session.execute(update(Job).where(Job.id == job_id, Job.lease_owner == token)
+                           .values(lease_owner=None, lease_expires_at=None, **values))
+        db.session.commit()
+
+    def _give_up(self, job_id, token, kind, params, error):
+        self._finish(job_id, token, status='failed', error=error, finished_at=utcnow())
+        cleanup = self.cleanups.get(kind)
+        if cleanup is not None:
+            try:
+                cleanup(**params)
+            except Exception:
+                self._app.logger.exception('Cleaning up after job %s (%s) failed', job_id, kind)
+
+    def execute(self, job_id, token):
+        """Run a claimed job in the current app context and record how it ended."""
+        job = db.session.get(Job, job_id)
+        if job is None or job.lease_owner != token:
+            return
+        handler = self.handlers.get(job.kind)
+        kind, params, attempts, max_attempts = job.kind, dict(job.params or {}), job.attempts, job.max_attempts
+        if handler is None:
+            self._finish(job_id, token, status='failed', error=f'No handler for job kind {kind}',
+                         finished_at=utcnow())
+            return
+        if attempts > max_attempts:
+            # Claimed again after its runners kept dying mid-job
+            self._give_up(job_id, token, kind, params, f'Gave up after {max_attempts} attempts')
+            return
+
+        try:
+            result = handler(JobContext(self, job_id, token), **params)
+        except LeaseLost:
+            db.session.rollback()
+            self._app.logger.warning('Job %s lost its lease to another runner', job_id)
+            return
+        except Exception:
+            db.session.rollback()
+            self._app.logger.exception('Job %s (%s) failed', job_id, kind)
+            error = traceback.format_exc(limit=5)
+            if attempts < max_attempts:
+                self._finish(job_id, token, status='queued', error=error,
+                             run_after=utcnow() + timedelta(seconds=self.backoff * 2 ** (attempts - 1)))
+            else:
+                self._give_up(job_id, token, kind, params, error)
+            return
+        self._finish(job_id, token, status='succeeded', result=result, error=None, finished_at=utcnow())
+
+    def run_pending(self, batch=10):
+        """Claim and run runnable jobs in this thread until none are left. Returns how many ran."""
+        count = 0
+        while True:
+            token, ids = self.claim(batch)
+            if not ids:
+                return count
+            for job_id in ids:
+                self.execute(job_id, token)
+                count += 1
+
+    # Background runner
+
+    def start(self):
+        with self._lock:
+            if self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._running = set()
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            self._thread = threading.Thread(target=self._poll, name='job-poller', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread_pid == os.getpid():
+            self._thread.join(timeout)
+            self._executor.shutdown(wait=True)
+
+    def wake(self):
+        self._wake.set()
+
+    def _run_in_context(self, job_id, token):
+        with self._app.app_context():
+            try:
+                self.execute(job_id, token)
+            except Exception:
+                self._app.logger.exception('Job %s could not be recorded', job_id)
+            finally:
+                db.session.remove()
+
+    def _done(self, future):
+        with self._lock:
+            self._running.discard(future)
+        self._wake.set()
+
+    def _poll(self):
+        app = self._app
+        while not self._stop.is_set():
+            with self._lock:
+                free = self.workers - len(self._running)
+            if free > 0:
+                with app.app_context():
+                    try:
+                        token, ids = self.claim(free)
+                    except Exception:
+                        app.logger.exception('Claiming jobs failed')
+                        db.session.rollback()
+                        ids = []
+                    finally:
+                        db.session.remove()
+                for job_id in ids:
+                    future = self._executor.submit(self._run_in_context, job_id, token)
+                    with self._lock:
+                        self._running.add(future)
+                    future.add_done_callback(self._done)
+                if ids and len(ids) == free:
+                    # There may be more waiting; look again as soon as a thread is free
+                    continue
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+
+job_runner = JobRunner()
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_runner(session):
+    # Jobs committed in this process can start without waiting for the next poll
+    if session.info.pop('jobs_enqueued', False):
+        job_runner.wake()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_wake(session, previous_transaction):
+    session.info.pop('jobs_enqueued', None)
+
+
+def init_jobs(app):
+    # Registers the handlers
+    import user_jobs  # noqa: F401
+    job_runner.init_app(app)
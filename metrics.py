@@ -0,0 +1,180 @@
+# metrics.py
+
+import hmac
+import os
+import time
+from flask import Response, abort, before_render_template, g, request, template_rendered
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram,
+                               REGISTRY, generate_latest, multiprocess)
+from sqlalchemy import event
+from models import db
+from identity import identity_cache
+from render_cache import render_cache
+
+# With PROMETHEUS_MULTIPROC_DIR set (before prometheus_client is imported), every
+# gunicorn worker writes its samples to mmap files in that directory and /metrics
+# sums them, so any worker can answer a scrape for all of them
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+
+LATENCY_BUCKETS = (.005, .01, .025, .05, .075, .1, .25, .5, .75, 1.0, 2.5, 5.0, 10.0)
+
+# Status is a label of the histogram rather than a separate counter: its _count
+# series already counts responses, and one observation per request stays cheap
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Request latency by route and status code',
+                            ['endpoint', 'method', 'status'], buckets=LATENCY_BUCKETS)
+IN_PROGRESS = Gauge('http_requests_in_progress', 'Requests being handled', multiprocess_mode='livesum')
+TEMPLATE_RENDER = Histogram('template_render_seconds', 'Template render time', ['template'],
+                            buckets=LATENCY_BUCKETS)
+POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections checked out of the pool',
+                         multiprocess_mode='livesum')
+POOL_EVENTS = Counter('db_pool_events', 'Pool checkouts, new connections and invalidations', ['event'])
+# Hit ratio: rate(cache_lookups_total{result="hit"}[5m]) / rate(cache_lookups_total[5m])
+CACHE_LOOKUPS = Counter('cache_lookups', 'Cache lookups by cache and result', ['cache', 'result'])
+
+LOOPBACK = ('127.0.0.1', '::1')
+
+# Resolving label values takes a lock and a dict lookup inside prometheus_client,
+# so children are looked up once per label combination and reused
+_latency_children = {}
+
+if MULTIPROCESS:
+    # Each worker's count has to reach the shared files
+    def _enter(key):
+        IN_PROGRESS.inc()
+
+    def _leave(key):
+        IN_PROGRESS.dec()
+else:
+    # Gauge.inc() and dec() each take a lock; adding to and discarding from a set
+    # is atomic under the GIL, and the gauge reads its size only when scraped
+    _in_flight = set()
+    _enter = _in_flight.add
+    _leave = _in_flight.discard
+    IN_PROGRESS.set_function(lambda: len(_in_flight))
+
+
+def _latency(endpoint, method, status):
+    key = (endpoint, method, status)
+    child = _latency_children.get(key)
+    if child is None:
+        child = _latency_children[key] = REQUEST_LATENCY.labels(endpoint, method, status)
+    return child
+
+
+class MetricsMiddleware:
+    """WSGI wrapper recording latency, status and in-flight count for every request.
+
+    It works on the WSGI call rather than Flask hooks because g and request are
+    context-local proxies costing a microsecond or more per access; here the
+    state lives in locals and the endpoint is read off the request object,
+    which init_metrics has Flask leave in the environ. Latency runs until the
+    response body is returned, so for streamed responses it is the time to
+    the first byte.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        status = '500'
+
+        def _start_response(status_line, headers, exc_info=None):
+            nonlocal status
+            status = status_line[:3]
+            return start_response(status_line, headers, exc_info)
+
+        key = id(environ)
+        _enter(key)
+        started = time.perf_counter()
+        try:
+            return self.wsgi_app(environ, _start_response)
+        finally:
+            elapsed = time.perf_counter() - started
+            _leave(key)
+            flask_request = environ.get('metrics.request')
+            rule = flask_request.url_rule if flask_request is not None else None
+            endpoint = rule.endpoint if rule is not None else 'unmatched'
+            _latency(endpoint, environ['REQUEST_METHOD'], status).observe(elapsed)
+
+
+def _template_started(sender, template, context, **extra):
+    g.setdefault('template_starts', []).append(time.perf_counter())
+
+
+def _template_finished(sender, template, context, **extra):
+    starts = g.get('template_starts')
+    if starts:
+        TEMPLATE_RENDER.labels(template.name or 'string').observe(time.perf_counter() - starts.pop())
+
+
+before_render_template.connect(_template_started)
+template_rendered.connect(_template_finished)
+
+
+def _count_lookups(name):
+    hit = CACHE_LOOKUPS.labels(name, 'hit')
+    miss = CACHE_LOOKUPS.labels(name, 'miss')
+    return lambda found: (hit if found else miss).inc()
+
+
+identity_cache.on_lookup = _count_lookups('identity')
+render_cache.on_lookup = _count_lookups('render')
+
+
+def instrument_pool(engine):
+    checkouts = POOL_EVENTS.labels('checkout')
+    connects = POOL_EVENTS.labels('connect')
+    invalidations = POOL_EVENTS.labels('invalidate')
+
+    @event.listens_for(engine, 'checkout')
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts.inc()
+        POOL_CHECKED_OUT.inc()
+
+    @event.listens_for(engine, 'checkin')
+    def _checkin(dbapi_connection, connection_record):
+        POOL_CHECKED_OUT.dec()
+
+    @event.listens_for(engine, 'connect')
+    def _connect(dbapi_connection, connection_record):
+        connects.inc()
+
+    @event.listens_for(engine, 'invalidate')
+    def _invalidate(dbapi_connection, connection_record, exception):
+        invalidations.inc()
+
+
+def render_metrics():
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
+
+
+def init_metrics(app):
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_pool(engine)
+
+    class Request(app.request_class):
+        def __init__(self, environ, *args, **kwargs):
+            super().__init__(environ, *args, **kwargs)
+            environ['metrics.request'] = self
+
+    app.request_class = Request
+    app.wsgi_app = MetricsMiddleware(app.wsgi_app)
+
+    @app.route('/metrics')
+    def metrics():
+        token = app.config['METRICS_TOKEN']
+        if token:
+            supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+            if not hmac.compare_digest(supplied, token):
+                abort(401)
+        elif not app.config['METRICS_PUBLIC']:
+            # A reverse proxy on this host connects from loopback too, but adds X-Forwarded-For
+            if request.remote_addr not in LOOPBACK or 'X-Forwarded-For' in request.headers:
+                abort(403)
+        return Response(render_metrics(), mimetype=CONTENT_TYPE_LATEST)
@@ -0,0 +1,148 @@
+# migrate.py
+
+import importlib
+import pkgutil
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table, delete, func, insert, select
+from sqlalchemy.schema import DropIndex
+import migrations
+
+# One row per applied migration; the highest version is the schema's current version
+version_table = Table(
+    'schema_migrations', MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+class MigrationError(Exception):
+    pass
+
+
+class Migration:
+    """A module in migrations/ named NNNN_description.py with upgrade(connection) and downgrade(connection)."""
+
+    __slots__ = ('version', 'name', 'module')
+
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+
+    @property
+    def description(self):
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+    def __repr__(self):
+        return f'<Migration {self.version:04d} {self.name}>'
+
+
+def discover(package=migrations):
+    """Return the migrations in `package`, ordered by version."""
+    found = {}
+    for info in pkgutil.iter_modules(package.__path__):
+        prefix, _, name = info.name.partition('_')
+        if not prefix.isdigit():
+            continue
+        version = int(prefix)
+        if version in found:
+            raise MigrationError(f'Duplicate migration version {version:04d}')
+        found[version] = Migration(version, name, importlib.import_module(f'{package.__name__}.{info.name}'))
+    return [found[version] for version in sorted(found)]
+
+
+def current_version(engine):
+    with engine.begin() as connection:
+        version_table.create(connection, checkfirst=True)
+        return connection.scalar(select(func.max(version_table.c.version))) or 0
+
+
+@contextmanager
+def _transaction(engine):
+    """engine.begin(), with the transaction opened explicitly on SQLite.
+
+    pysqlite only begins a transaction right before INSERT, UPDATE or DELETE,
+    so CREATE and DROP statements ahead of the first of those would each
+    commit on their own and survive a migration that fails halfway.
+    """
+    with engine.begin() as connection:
+        if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+            connection.exec_driver_sql('BEGIN')
+        yield connection
+
+
+def _check_target(target, available):
+    if target != 0 and target not in {migration.version for migration in available}:
+        raise MigrationError(f'Unknown migration version {target}')
+
+
+def upgrade(engine, target=None, package=migrations):
+    """Apply pending migrations up to `target` (default: the latest). Returns the ones applied."""
+    available = discover(package)
+    if target is None:
+        target = available[-1].version if available else 0
+    _check_target(target, available)
+
+    current = current_version(engine)
+    applied = []
+    for migration in available:
+        if current < migration.version <= target:
+            # The schema change and its version row commit together
+            with _transaction(engine) as connection:
+                migration.module.upgrade(connection)
+                connection.execute(insert(version_table).values(
+                    version=migration.version, name=migration.name,
+                    applied_at=datetime.now(timezone.utc)))
+            applied.append(migration)
+    return applied
+
+
+def downgrade(engine, target, package=migrations):
+    """Revert applied migrations newer than `target` (0 reverts everything). Returns the ones reverted."""
+    available = discover(package)
+    _check_target(target, available)
+
+    current = current_version(engine)
+    reverted = []
+    for migration in reversed(available):
+        if target < migration.version <= current:
+            with _transaction(engine) as connection:
+                migration.module.downgrade(connection)
+                connection.execute(delete(version_table).where(version_table.c.version == migration.version))
+            reverted.append(migration)
+    return reverted
+
+
+def stamp(engine, target, package=migrations):
+    """Record migrations up to `target` as applied without running them.
+
+    For databases whose tables were made by db.create_all() before migrations existed.
+    """
+    available = discover(package)
+    _check_target(target, available)
+    with engine.begin() as connection:
+        version_table.create(connection, checkfirst=True)
+        connection.execute(delete(version_table))
+        for migration in available:
+            if migration.version <= target:
+                connection.execute(insert(version_table).values(
+                    version=migration.version, name=migration.name,
+                    applied_at=datetime.now(timezone.utc)))
+
+
+# Helpers for migrations. They take table and column names rather than models,
+# so a migration keeps meaning the same thing after models.py moves on.
+
+def _index(name, table, columns):
+    target = Table(table, MetaData(), *(Column(column) for column in columns))
+    return Index(name, *(target.c[column] for column in columns))
+
+
+def create_index(connection, name, table, *columns):
+    _index(name, table, columns).create(connection, checkfirst=True)
+
+
+def drop_index(connection, name, table, *columns):
+    connection.execute(DropIndex(_index(name, table, columns), if_exists=True))
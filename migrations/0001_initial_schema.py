@@ -0,0 +1,80 @@
+"""Create the users, projects, project_users, tasks, feedback and submissions tables."""
+
+from sqlalchemy import (JSON, Boolean, Column, DateTime, ForeignKey, Integer, MetaData,
+                        String, Table, Text)
+
+# The schema as it stood before migrations were introduced. checkfirst makes
+# this safe to run against a database created earlier by db.create_all().
+metadata = MetaData()
+
+Table('users', metadata,
+      Column('id', Integer, primary_key=True),
+      Column('username', String(64), unique=True, nullable=False),
+      Column('email', String(120), unique=True, nullable=False),
+      Column('password_hash', String(256), nullable=False),
+      Column('first_name', String(64)),
+      Column('last_name', String(64)),
+      Column('created_at', DateTime, nullable=False),
+      Column('updated_at', DateTime, nullable=False),
+      Column('is_admin', Boolean),
+      Column('role', String(20)),
+      Column('is_active', Boolean))
+
+Table('projects', metadata,
+      Column('id', Integer, primary_key=True),
+      Column('title', String(100), nullable=False),
+      Column('description', Text),
+      Column('status', String(20)),
+      Column('priority', String(20)),
+      Column('due_date', DateTime),
+      Column('owner_id', Integer, ForeignKey('users.id'), nullable=False),
+      Column('created_at', DateTime),
+      Column('updated_at', DateTime),
+      Column('github_url', String(500)),
+      Column('document_url', String(500)),
+      Column('features', JSON),
+      Column('project_url', String(500)))
+
+Table('project_users', metadata,
+      Column('project_id', Integer, ForeignKey('projects.id'), primary_key=True),
+      Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+      Column('role', String(50)))
+
+Table('tasks', metadata,
+      Column('id', Integer, primary_key=True),
+      Column('title', String(100), nullable=False),
+      Column('description', Text),
+      Column('status', String(20)),
+      Column('priority', String(20)),
+      Column('is_completed', Boolean),
+      Column('due_date', DateTime),
+      Column('created_at', DateTime),
+      Column('updated_at', DateTime),
+      Column('project_id', Integer, ForeignKey('projects.id'), nullable=False),
+      Column('parent_id', Integer, ForeignKey('tasks.id')),
+      Column('assigned_to_id', Integer, ForeignKey('users.id')),
+      Column('created_by_id', Integer, ForeignKey('users.id'), nullable=False),
+      Column('notes', Text))
+
+Table('feedback', metadata,
+      Column('id', Integer, primary_key=True),
+      Column('task_id', Integer, ForeignKey('tasks.id'), nullable=False),
+      Column('feedback_text', Text, nullable=False),
+      Column('feedback_date', DateTime),
+      Column('feedback_by_id', Integer, ForeignKey('users.id'), nullable=False))
+
+Table('submissions', metadata,
+      Column('id', Integer, primary_key=True),
+      Column('task_id', Integer, ForeignKey('tasks.id'), nullable=False),
+      Column('submission_text', Text),
+      Column('submission_url', String(500)),
+      Column('submission_date', DateTime),
+      Column('submitted_by_id', Integer, ForeignKey('users.id')))
+
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
+
+
+def downgrade(connection):
+    metadata.drop_all(connection, checkfirst=True)
@@ -0,0 +1,21 @@
+"""Add the indexes behind the keyset-paginated /projects listing and its filters."""
+
+from migrate import create_index, drop_index
+
+INDEXES = [
+    ('ix_projects_created_at_id', 'projects', 'created_at', 'id'),
+    ('ix_projects_status_created_at_id', 'projects', 'status', 'created_at', 'id'),
+    ('ix_projects_priority_created_at_id', 'projects', 'priority', 'created_at', 'id'),
+    ('ix_projects_owner_id_created_at_id', 'projects', 'owner_id', 'created_at', 'id'),
+    ('ix_projects_due_date', 'projects', 'due_date'),
+]
+
+
+def upgrade(connection):
+    for name, table, *columns in INDEXES:
+        create_index(connection, name, table, *columns)
+
+
+def downgrade(connection):
+    for name, table, *columns in reversed(INDEXES):
+        drop_index(connection, name, table, *columns)
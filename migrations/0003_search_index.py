@@ -0,0 +1,62 @@
+"""Create the full-text search index and fill it from existing rows."""
+
+from flask import current_app, has_app_context
+
+# The index as it was when this migration was written; search.py may move on
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "kind UNINDEXED, ref_id UNINDEXED, project_id UNINDEXED, task_id UNINDEXED, "
+    "title, body, tokenize='porter unicode61')",
+]
+
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS search_index ("
+    "doc_id BIGINT PRIMARY KEY, kind VARCHAR(16) NOT NULL, ref_id INTEGER NOT NULL, "
+    "project_id INTEGER NOT NULL, task_id INTEGER, title TEXT, body TEXT, "
+    "document TSVECTOR GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('{language}', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('{language}', coalesce(body, '')), 'B')) STORED)",
+    "CREATE INDEX IF NOT EXISTS ix_search_index_document ON search_index USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_search_index_project_id ON search_index (project_id)",
+]
+
+# Document ids pack the source row id with its kind: project 0, task 1, feedback 2, submission 3
+SOURCES = [
+    "SELECT id * 4 + 0, 'project', id, id, NULL, title, "
+    "coalesce(description, '') || ' ' || coalesce(CAST(features AS TEXT), '') FROM projects",
+    "SELECT id * 4 + 1, 'task', id, project_id, id, title, "
+    "coalesce(description, '') || ' ' || coalesce(notes, '') FROM tasks",
+    "SELECT f.id * 4 + 2, 'feedback', f.id, t.project_id, f.task_id, NULL, f.feedback_text "
+    "FROM feedback f JOIN tasks t ON t.id = f.task_id",
+    "SELECT s.id * 4 + 3, 'submission', s.id, t.project_id, s.task_id, NULL, "
+    "coalesce(s.submission_text, '') || ' ' || coalesce(s.submission_url, '') "
+    "FROM submissions s JOIN tasks t ON t.id = s.task_id",
+]
+
+
+def _language():
+    if has_app_context():
+        return current_app.config['SEARCH_LANGUAGE']
+    return 'english'
+
+
+def upgrade(connection):
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        statements, key = SQLITE_DDL, 'rowid'
+    elif dialect == 'postgresql':
+        statements, key = [ddl.format(language=_language()) for ddl in POSTGRES_DDL], 'doc_id'
+    else:
+        return
+    # Start clean in case db.create_all() already made the table
+    connection.exec_driver_sql('DROP TABLE IF EXISTS search_index')
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+    for source in SOURCES:
+        connection.exec_driver_sql(
+            f'INSERT INTO search_index ({key}, kind, ref_id, project_id, task_id, title, body) {source}')
+
+
+def downgrade(connection):
+    if connection.dialect.name in ('sqlite', 'postgresql'):
+        connection.exec_driver_sql('DROP TABLE IF EXISTS search_index')
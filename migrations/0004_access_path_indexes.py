@@ -0,0 +1,29 @@
+"""Index tasks, feedback, submissions and memberships by the columns pages look them up by.
+
+- tasks (project_id, parent_id): a project's task tree and its top-level tasks
+- tasks (assigned_to_id, due_date): a user's assigned tasks, soonest due first
+- feedback (task_id, feedback_date) and submissions (task_id, submission_date):
+  a task's history in date order
+- project_users (user_id, project_id): a user's projects; the primary key
+  only serves lookups by project
+"""
+
+from migrate import create_index, drop_index
+
+INDEXES = [
+    ('ix_tasks_project_id_parent_id', 'tasks', 'project_id', 'parent_id'),
+    ('ix_tasks_assigned_to_id_due_date', 'tasks', 'assigned_to_id', 'due_date'),
+    ('ix_feedback_task_id_feedback_date', 'feedback', 'task_id', 'feedback_date'),
+    ('ix_submissions_task_id_submission_date', 'submissions', 'task_id', 'submission_date'),
+    ('ix_project_users_user_id_project_id', 'project_users', 'user_id', 'project_id'),
+]
+
+
+def upgrade(connection):
+    for name, table, *columns in INDEXES:
+        create_index(connection, name, table, *columns)
+
+
+def downgrade(connection):
+    for name, table, *columns in reversed(INDEXES):
+        drop_index(connection, name, table, *columns)
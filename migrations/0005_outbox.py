@@ -0,0 +1,38 @@
+"""Create the outbox table and index tasks by due date for the reminder sweep."""
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text
+from migrate import create_index, drop_index
+
+metadata = MetaData()
+
+outbox = Table('outbox', metadata,
+               Column('id', Integer, primary_key=True),
+               Column('kind', String(20), nullable=False),
+               Column('recipient', String(120), nullable=False),
+               Column('subject', String(200), nullable=False),
+               Column('body', Text, nullable=False),
+               Column('dedupe_key', String(200), unique=True),
+               Column('status', String(20), nullable=False),
+               Column('attempts', Integer, nullable=False),
+               Column('next_attempt_at', DateTime, nullable=False),
+               Column('claimed_by', String(64)),
+               Column('last_error', Text),
+               Column('created_at', DateTime),
+               Column('sent_at', DateTime))
+
+INDEXES = [
+    ('ix_outbox_status_next_attempt_at', 'outbox', 'status', 'next_attempt_at'),
+    ('ix_tasks_due_date', 'tasks', 'due_date'),
+]
+
+
+def upgrade(connection):
+    outbox.create(connection, checkfirst=True)
+    for name, table, *columns in INDEXES:
+        create_index(connection, name, table, *columns)
+
+
+def downgrade(connection):
+    for name, table, *columns in reversed(INDEXES):
+        drop_index(connection, name, table, *columns)
+    outbox.drop(connection, checkfirst=True)
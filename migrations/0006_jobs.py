@@ -0,0 +1,36 @@
+"""Create the jobs table for the background job runner."""
+
+from sqlalchemy import JSON, Column, DateTime, Integer, MetaData, String, Table, Text
+from migrate import create_index, drop_index
+
+metadata = MetaData()
+
+jobs = Table('jobs', metadata,
+             Column('id', Integer, primary_key=True),
+             Column('kind', String(50), nullable=False),
+             Column('params', JSON),
+             Column('status', String(20), nullable=False),
+             Column('attempts', Integer, nullable=False),
+             Column('max_attempts', Integer, nullable=False),
+             Column('run_after', DateTime, nullable=False),
+             Column('lease_owner', String(64)),
+             Column('lease_expires_at', DateTime),
+             Column('progress_done', Integer, nullable=False),
+             Column('progress_total', Integer),
+             Column('message', String(200)),
+             Column('result', JSON),
+             Column('error', Text),
+             Column('created_by_id', Integer),
+             Column('created_at', DateTime),
+             Column('started_at', DateTime),
+             Column('finished_at', DateTime))
+
+
+def upgrade(connection):
+    jobs.create(connection, checkfirst=True)
+    create_index(connection, 'ix_jobs_status_run_after', 'jobs', 'status', 'run_after')
+
+
+def downgrade(connection):
+    drop_index(connection, 'ix_jobs_status_run_after', 'jobs', 'status', 'run_after')
+    jobs.drop(connection, checkfirst=True)
@@ -0,0 +1,5 @@
+# migrations/__init__.py
+#
+# Versioned schema changes, applied in order by `flask db upgrade`. Add a new
+# module named NNNN_short_description.py with upgrade(connection) and
+# downgrade(connection); never edit one that has been released.
@@ -12,6 +12,8 @@ project_users = db.Table('project_users',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
     db.Column('role', db.String(50), default='member')  # e.g., 'owner', 'member', 'viewer'
 )
+# The primary key leads with project_id, so a user's projects need their own index
+db.Index('ix_project_users_user_id_project_id', project_users.c.user_id, project_users.c.project_id)
 
 # User model
 class User(db.Model, UserMixin):
@@ -47,6 +49,19 @@ class Project(db.Model):
     __tablename__ = 'projects'
     
     VALID_STATUSES = ['active', 'completed', 'on_hold', 'archived']
+    VALID_PRIORITIES = ['low', 'medium', 'high']
+    
+    # Indexes backing the keyset-paginated /projects listing and its filters.
+    # The equality filters end in (created_at, id) so their pages come out in
+    # index order; due dates are filtered by range, after which rows are no
+    # longer in created_at order, so that index is on due_date alone.
+    __table_args__ = (
+        db.Index('ix_projects_created_at_id', 'created_at', 'id'),
+        db.Index('ix_projects_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_projects_priority_created_at_id', 'priority', 'created_at', 'id'),
+        db.Index('ix_projects_owner_id_created_at_id', 'owner_id', 'created_at', 'id'),
+        db.Index('ix_projects_due_date', 'due_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
@@ -76,6 +91,13 @@ class Project(db.Model):
 class Task(db.Model):
     __tablename__ = 'tasks'
     
+    __table_args__ = (
+        db.Index('ix_tasks_project_id_parent_id', 'project_id', 'parent_id'),
+        db.Index('ix_tasks_assigned_to_id_due_date', 'assigned_to_id', 'due_date'),
+        # The daily reminder sweep reads tasks due in a date range
+        db.Index('ix_tasks_due_date', 'due_date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
@@ -107,6 +129,10 @@ class Task(db.Model):
 class Feedback(db.Model):
     __tablename__ = 'feedback'
     
+    __table_args__ = (
+        db.Index('ix_feedback_task_id_feedback_date', 'task_id', 'feedback_date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
     feedback_text = db.Column(db.Text, nullable=False)
@@ -120,6 +146,10 @@ class Feedback(db.Model):
 class Submission(db.Model):
     __tablename__ = 'submissions'
     
+    __table_args__ = (
+        db.Index('ix_submissions_task_id_submission_date', 'task_id', 'submission_date'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     task_id = db.Column(db.Integer, db.ForeignKey('tasks.id'), nullable=False)
     submission_text = db.Column(db.Text)
@@ -129,4 +159,76 @@ class Submission(db.Model):
     
     # Relationships
     task = db.relationship('Task', back_populates='submissions')
-    submitted_by = db.relationship('User')
\ No newline at end of file
+    submitted_by = db.relationship('User')
+
+class OutboxMessage(db.Model):
+    __tablename__ = 'outbox'
+    
+    KINDS = ['message', 'invite', 'reminder']
+    
+    # The sender's "what is due now" scan
+    __table_args__ = (
+        db.Index('ix_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False, default='message')
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    # Set for messages that must be queued at most once, e.g. one reminder per task and due date
+    dedupe_key = db.Column(db.String(200), unique=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False)
+    # The sender holding the message until next_attempt_at
+    claimed_by = db.Column(db.String(64))
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    sent_at = db.Column(db.DateTime)
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    
+    STATUSES = ['queued', 'running', 'succeeded', 'failed']
+    
+    # The runners' "what can be claimed now" scan
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.JSON, default=dict)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False)
+    # The runner holding the job; others may take it over once lease_expires_at passes
+    lease_owner = db.Column(db.String(64))
+    lease_expires_at = db.Column(db.DateTime)
+    progress_done = db.Column(db.Integer, nullable=False, default=0)
+    progress_total = db.Column(db.Integer)
+    message = db.Column(db.String(200))
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    # Not a foreign key: jobs outlive the users who queued them, e.g. a user deleting another admin
+    created_by_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'attempts': self.attempts,
+            'progress': {'done': self.progress_done, 'total': self.progress_total},
+            'message': self.message,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+        }
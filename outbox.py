@@ -0,0 +1,311 @@
+# outbox.py
+
+import os
+import smtplib
+import socket
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+from email.message import EmailMessage
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from models import OutboxMessage, Project, Task, User, db
+
+
+def utcnow():
+    # Naive UTC, as the DateTime columns store it
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def reminder_key(task_id, due_date):
+    return f'reminder:{task_id}:{due_date:%Y-%m-%d}'
+
+
+class DeliveryReport:
+    """Messages sent, rescheduled and given up on in one delivery run."""
+
+    def __init__(self):
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+
+    def __bool__(self):
+        return bool(self.sent or self.retried or self.failed)
+
+    def to_dict(self):
+        return {'sent': self.sent, 'retried': self.retried, 'failed': self.failed}
+
+
+class Outbox:
+    """Mail queued in the outbox table and delivered in the background.
+
+    Requests only insert rows, in the same transaction as the change that
+    caused them, so a request never waits on SMTP and a rolled back change
+    sends nothing. A sender thread in each worker process claims up to
+    `batch_size` due rows by leasing them (claimed_by plus next_attempt_at
+    pushed `lease` seconds ahead, in one UPDATE that only matches unclaimed
+    rows), sends them over one SMTP connection, and reschedules failures
+    with exponential backoff. Pending reminders for the same recipient go
+    out as one digest. Once a day it also queues reminders for tasks
+    falling due, keyed so every worker may sweep without sending twice.
+    """
+
+    def __init__(self):
+        self.server = None
+        self._app = None
+        self._thread = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._swept_on = None
+
+    def init_app(self, app):
+        config = app.config
+        self.server = config['MAIL_SERVER']
+        self.port = config['MAIL_PORT']
+        self.use_tls = config['MAIL_USE_TLS']
+        self.username = config['MAIL_USERNAME']
+        self.password = config['MAIL_PASSWORD']
+        self.sender = config['MAIL_SENDER']
+        self.timeout = config['MAIL_TIMEOUT']
+        self.batch_size = config['MAIL_BATCH_SIZE']
+        self.max_attempts = config['MAIL_MAX_ATTEMPTS']
+        self.backoff = config['MAIL_RETRY_BACKOFF']
+        self.lease = config['MAIL_LEASE_SECONDS']
+        self.interval = config['MAIL_SEND_INTERVAL']
+        self.reminder_days = config['MAIL_REMINDER_DAYS']
+        self._app = app
+
+        if self.enabled and self.interval:
+            # Threads do not survive a fork, so each gunicorn worker starts its own on first request
+            @app.before_request
+            def _start_sender():
+                self.start()
+
+    @property
+    def enabled(self):
+        return bool(self.server)
+
+    def enqueue(self, recipient, subject, body, kind='message', dedupe_key=None):
+        """Add a message to the session; it is queued when the caller commits."""
+        message = OutboxMessage(kind=kind, recipient=recipient, subject=subject, body=body,
+                                dedupe_key=dedupe_key, status='pending', attempts=0,
+                                next_attempt_at=utcnow())
+        db.session.add(message)
+        return message
+
+    # Sweeping
+
+    def sweep(self, today=None):
+        """Queue reminders for open, assigned tasks due `reminder_days` after `today`.
+
+        One range query over ix_tasks_due_date finds them; tasks already
+        reminded about for the same due date are skipped. Returns how many
+        reminders were queued.
+        """
+        start = datetime.combine((today or utcnow().date()) + timedelta(days=self.reminder_days), time.min)
+        rows = db.session.execute(
+            select(Task.id, Task.title, Task.due_date, Project.title.label('project'), User.email)
+            .join(User, User.id == Task.assigned_to_id)
+            .join(Project, Project.id == Task.project_id)
+            .where(Task.due_date >= start, Task.due_date < start + timedelta(days=1),
+                   Task.is_completed.is_not(True))
+        ).all()
+        if not rows:
+            return 0
+
+        keys = [reminder_key(row.id, row.due_date) for row in rows]
+        queued = set(db.session.scalars(
+            select(OutboxMessage.dedupe_key).where(OutboxMessage.dedupe_key.in_(keys))))
+        now = utcnow()
+        new = [{'kind': 'reminder', 'recipient': row.email, 'subject': 'Tasks due soon',
+                'body': f'- {row.title} ({row.project}), due {row.due_date:%Y-%m-%d}',
+                'dedupe_key': key, 'status': 'pending', 'attempts': 0,
+                'next_attempt_at': now, 'created_at': now}
+               for row, key in zip(rows, keys) if key not in queued]
+        if not new:
+            return 0
+        try:
+            db.session.execute(insert(OutboxMessage), new)
+            db.session.commit()
+        except IntegrityError:
+            # Another worker queued the same reminders first
+            db.session.rollback()
+            return 0
+        return len(new)
+
+    # Delivery
+
+    def _claim(self, now):
+        token = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'[-64:]
+        due = (OutboxMessage.status == 'pending', OutboxMessage.next_attempt_at <= now)
+        ids = db.session.scalars(select(OutboxMessage.id).where(*due)
+                                 .order_by(OutboxMessage.id).limit(self.batch_size)).all()
+        if not ids:
+            return []
+        # Rows claimed by another sender since the select no longer match `due`
+        db.session.execute(update(OutboxMessage).where(OutboxMessage.id.in_(ids), *due)
+                           .values(claimed_by=token, next_attempt_at=now + timedelta(seconds=self.lease)))
+        db.session.commit()
+        return db.session.scalars(select(OutboxMessage).where(OutboxMessage.claimed_by == token)
+                                  .order_by(OutboxMessage.id)).all()
+
+    def _compose(self, rows):
+        """[(EmailMessage, rows it carries)]; a recipient's reminders become one digest."""
+        messages = []
+        reminders = defaultdict(list)
+        for row in rows:
+            if row.kind == 'reminder':
+                reminders[row.recipient].append(row)
+            else:
+                messages.append((self._message(row.recipient, row.subject, row.body), [row]))
+        for recipient, group in reminders.items():
+            count = len(group)
+            subject = f'{count} task{"s" if count != 1 else ""} due soon'
+            body = 'These tasks assigned to you are due soon:\n\n' + '\n'.join(row.body for row in group)
+            messages.append((self._message(recipient, subject, body), group))
+        return messages
+
+    def _message(self, recipient, subject, body):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = recipient
+        message['Subject'] = subject
+        message.set_content(body)
+        return message
+
+    def _connect(self):
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+        except BaseException:
+            smtp.close()
+            raise
+        return smtp
+
+    @staticmethod
+    def _settle(row, status):
+        row.status = status
+        if row.kind == 'invite':
+            # Invites carry a password; keep it only while the message may still be sent
+            row.body = ''
+
+    def _retry(self, rows, error, now, report):
+        for row in rows:
+            row.attempts += 1
+            row.claimed_by = None
+            row.last_error = str(error)[:1000]
+            if row.attempts >= self.max_attempts:
+                self._settle(row, 'failed')
+                report.failed += 1
+            else:
+                row.next_attempt_at = now + timedelta(seconds=self.backoff * 2 ** (row.attempts - 1))
+                report.retried += 1
+
+    def _fail(self, rows, error, report):
+        for row in rows:
+            row.attempts += 1
+            row.claimed_by = None
+            self._settle(row, 'failed')
+            row.last_error = str(error)[:1000]
+            report.failed += 1
+
+    def deliver(self):
+        """Send one batch of due messages over a single SMTP connection. Returns a DeliveryReport."""
+        report = DeliveryReport()
+        now = utcnow()
+        rows = self._claim(now)
+        if not rows:
+            return report
+
+        messages = self._compose(rows)
+        try:
+            smtp = self._connect()
+        except (OSError, smtplib.SMTPException) as error:
+            for _, group in messages:
+                self._retry(group, error, now, report)
+        else:
+            with smtp:
+                for index, (message, group) in enumerate(messages):
+                    try:
+                        smtp.send_message(message)
+                    except smtplib.SMTPRecipientsRefused as error:
+                        self._fail(group, error, report)
+                    except smtplib.SMTPResponseException as error:
+                        # 5xx replies are permanent; 4xx ones are worth retrying
+                        if error.smtp_code >= 500:
+                            self._fail(group, error, report)
+                        else:
+                            self._retry(group, error, now, report)
+                    except (OSError, smtplib.SMTPException) as error:
+                        # The connection is gone; the rest of the batch waits for the next run
+                        for _, rest in messages[index:]:
+                            self._retry(rest, error, now, report)
+                        break
+                    else:
+                        for row in group:
+                            self._settle(row, 'sent')
+                            row.attempts += 1
+                            row.claimed_by = None
+                            row.sent_at = utcnow()
+                        report.sent += len(group)
+        db.session.commit()
+        return report
+
+    def deliver_all(self):
+        """Deliver batches until nothing is due. Returns the combined DeliveryReport."""
+        total = DeliveryReport()
+        while True:
+            report = self.deliver()
+            if not report:
+                return total
+            total.sent += report.sent
+            total.retried += report.retried
+            total.failed += report.failed
+            if not report.sent:
+                return total
+
+    # Background sender
+
+    def start(self):
+        with self._lock:
+            if self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='outbox-sender', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None and self._thread_pid == os.getpid():
+            self._thread.join(timeout)
+
+    def _run(self):
+        app = self._app
+        while True:
+            with app.app_context():
+                try:
+                    today = utcnow().date()
+                    if self._swept_on != today:
+                        self.sweep(today)
+                        self._swept_on = today
+                    self.deliver_all()
+                except Exception:
+                    app.logger.exception('Outbox delivery failed')
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+            if self._stop.wait(self.interval):
+                return
+
+
+outbox = Outbox()
+
+
+def init_outbox(app):
+    outbox.init_app(app)
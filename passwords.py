@@ -0,0 +1,70 @@
+# passwords.py
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+@lru_cache(maxsize=None)
+def method_prefix(method):
+    """Expand a werkzeug method name to the full parameter set stored in hashes.
+
+    e.g. 'scrypt' -> 'scrypt:32768:8:1', 'pbkdf2' -> 'pbkdf2:sha256:1000000'.
+    """
+    return generate_password_hash('', method=method, salt_length=1).split('$', 1)[0]
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords according to a configurable policy.
+
+    Stored hashes created with an older method or cost are reported by
+    needs_rehash() so they can be upgraded the next time the user logs in.
+    With workers > 0, verification runs in a bounded thread pool so a burst of
+    logins can only occupy that many threads' worth of CPU at once.
+    """
+
+    def __init__(self, method='scrypt', salt_length=16, workers=0, timeout=30):
+        self.method = method
+        self.salt_length = salt_length
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.method = app.config['PASSWORD_HASH_METHOD']
+        self.salt_length = app.config['PASSWORD_SALT_LENGTH']
+        self.workers = app.config['PASSWORD_HASH_WORKERS']
+        self.timeout = app.config['PASSWORD_HASH_TIMEOUT']
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method, salt_length=self.salt_length)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != method_prefix(self.method)
+
+    def verify(self, password_hash, password):
+        if not self.workers:
+            return check_password_hash(password_hash, password)
+        future = self._get_executor().submit(check_password_hash, password_hash, password)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Nobody is waiting for it any more; drop it if it has not started
+            future.cancel()
+            raise
+
+    def _get_executor(self):
+        # Threads do not survive a fork, so each gunicorn worker builds its own pool
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                                    thread_name_prefix='password-hash')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,61 @@
+# permissions.py
+
+from flask import g, has_app_context
+from sqlalchemy import event, exists
+from models import db, project_users, User
+
+
+def init_permissions(app):
+    @app.before_request
+    def reset_membership_decisions():
+        # g outlives a request when the app context is pushed around it (tests, CLI)
+        g.pop('project_membership', None)
+
+
+def is_project_member(user_id, project_id):
+    """Check project_users for the pair with a single EXISTS query.
+
+    Answers are memoized on flask.g, so repeated checks within one request
+    cost nothing after the first.
+    """
+    decisions = g.setdefault('project_membership', {})
+    key = (user_id, project_id)
+    if key not in decisions:
+        decisions[key] = db.session.query(
+            exists().where(
+                project_users.c.project_id == project_id,
+                project_users.c.user_id == user_id
+            )
+        ).scalar()
+    return decisions[key]
+
+
+def forget_project_membership(user_id=None, project_id=None):
+    """Drop memoized decisions after membership changes within the current request."""
+    if not has_app_context():
+        return
+    decisions = g.get('project_membership')
+    if not decisions:
+        return
+    for key in list(decisions):
+        if (user_id is None or key[0] == user_id) and (project_id is None or key[1] == project_id):
+            del decisions[key]
+
+
+# project_users is a plain table, so membership changes are caught on the relationship
+@event.listens_for(User.member_of_projects, 'append')
+@event.listens_for(User.member_of_projects, 'remove')
+def _membership_changed(user, project, initiator):
+    forget_project_membership(user.id, project.id)
+
+
+def can_act_on_project(user, project):
+    """Owners and members may add, toggle and assign tasks in a project."""
+    return project.owner_id == user.id or is_project_member(user.id, project.id)
+
+
+def can_view_task(user, task):
+    """Admins, the assignee and anyone who can act on the task's project may view it."""
+    return (user.is_administrator() or
+            task.assigned_to_id == user.id or
+            can_act_on_project(user, task.project))
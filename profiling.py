@@ -0,0 +1,227 @@
+# profiling.py
+
+import cProfile
+import functools
+import io
+import itertools
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from urllib.parse import parse_qs
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from models import User, db
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_PARAM = '_profile'
+REPORT_SUFFIXES = ('.prof', '.txt')
+_UNSAFE = re.compile(r'[^A-Za-z0-9_.-]+')
+
+
+class ProfileStore:
+    """Ring buffer of profile reports in one directory, shared by all workers.
+
+    A report is a pstats dump (`<stem>.prof`, for snakeviz or pstats) and a
+    text summary (`<stem>.txt`). Stems start with a UTC timestamp, so sorting
+    by name sorts by age, and only the newest `keep` reports are kept.
+    """
+
+    def __init__(self, directory, keep=50):
+        self.directory = directory
+        self.keep = keep
+
+    def stem(self, label):
+        stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+        return f'{stamp}-{os.getpid()}-{_UNSAFE.sub("_", label).strip("_")[:60]}'
+
+    def save(self, stem, profile, summary):
+        os.makedirs(self.directory, exist_ok=True)
+        profile.dump_stats(os.path.join(self.directory, stem + '.prof'))
+        with open(os.path.join(self.directory, stem + '.txt'), 'w') as f:
+            f.write(summary)
+        self.prune()
+
+    def stems(self):
+        if not os.path.isdir(self.directory):
+            return []
+        names = {name.rsplit('.', 1)[0] for name in os.listdir(self.directory) if name.endswith(REPORT_SUFFIXES)}
+        return sorted(names, reverse=True)
+
+    def prune(self):
+        for stem in self.stems()[self.keep:]:
+            for suffix in REPORT_SUFFIXES:
+                try:
+                    os.remove(os.path.join(self.directory, stem + suffix))
+                except FileNotFoundError:
+                    pass  # Another worker pruned it first
+
+    def reports(self):
+        """Newest first, with the size of each file."""
+        reports = []
+        for stem in self.stems():
+            files = {}
+            for suffix in REPORT_SUFFIXES:
+                path = os.path.join(self.directory, stem + suffix)
+                if os.path.exists(path):
+                    files[suffix] = os.path.getsize(path)
+            created = datetime.strptime(stem.split('-', 1)[0], '%Y%m%dT%H%M%S%f').replace(tzinfo=timezone.utc)
+            reports.append({'stem': stem, 'created': created, 'files': files})
+        return reports
+
+    def is_report(self, filename):
+        stem, _, suffix = filename.rpartition('.')
+        return '.' + suffix in REPORT_SUFFIXES and stem in self.stems()
+
+
+class Profiler:
+    """Runs single requests under cProfile and tracemalloc and stores the reports.
+
+    tracemalloc is process-wide, so one request at a time is profiled per
+    worker; a request arriving while another is being profiled runs as usual.
+    """
+
+    def __init__(self, store, top=40):
+        self.store = store
+        self.top = top
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profiling(self, label, details):
+        """Profile the body of the with block; yields the report stem, or None when busy."""
+        if not self._lock.acquire(blocking=False):
+            yield None
+            return
+        try:
+            stem = self.store.stem(label)
+            already_tracing = tracemalloc.is_tracing()
+            if not already_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            profile = cProfile.Profile()
+            started = time.perf_counter()
+            profile.enable()
+            try:
+                yield stem
+            finally:
+                profile.disable()
+                elapsed = time.perf_counter() - started
+                snapshot = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                if not already_tracing:
+                    tracemalloc.stop()
+                try:
+                    self.store.save(stem, profile, self.summary(details, elapsed, profile, snapshot, peak))
+                except OSError:
+                    logger.exception('Could not save profile report %s', stem)
+        finally:
+            self._lock.release()
+
+    def summary(self, details, elapsed, profile, snapshot, peak):
+        out = io.StringIO()
+        for key, value in details.items():
+            out.write(f'{key}: {value}\n')
+        out.write(f'wall time: {elapsed * 1000:.1f} ms\n')
+        out.write(f'pid: {os.getpid()}\n\n')
+
+        stats = pstats.Stats(profile, stream=out)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+
+        # Blocks allocated during the request and still alive when it finished
+        snapshot = snapshot.filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+        out.write(f'\nPeak traced memory: {peak / 1024:.1f} KiB\nTop allocations still held at the end:\n')
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            out.write(f'{stat}\n')
+        return out.getvalue()
+
+
+class ProfilingMiddleware:
+    """Profile the whole request when it carries a valid signed token.
+
+    Only the environ is inspected, so requests without a token pay for two
+    dict lookups. Tokens come from the admin profiles page and expire after
+    PROFILE_TOKEN_MAX_AGE seconds; invalid ones are ignored, as are tokens
+    whose holder `authorize(issued_to)` no longer accepts.
+    """
+
+    def __init__(self, wsgi_app, profiler, serializer, max_age, authorize=None):
+        self.wsgi_app = wsgi_app
+        self.profiler = profiler
+        self.serializer = serializer
+        self.max_age = max_age
+        self.authorize = authorize
+
+    def token(self, environ):
+        token = environ.get(TOKEN_HEADER)
+        query = environ.get('QUERY_STRING', '')
+        if token is None and TOKEN_PARAM + '=' in query:
+            token = parse_qs(query).get(TOKEN_PARAM, [None])[0]
+        return token
+
+    def __call__(self, environ, start_response):
+        token = self.token(environ)
+        if token is None:
+            return self.wsgi_app(environ, start_response)
+        try:
+            issued_to = self.serializer.loads(token, max_age=self.max_age)
+        except BadSignature:
+            logger.warning('Ignoring invalid profile token for %s', environ.get('PATH_INFO'))
+            return self.wsgi_app(environ, start_response)
+        if self.authorize is not None and not self.authorize(issued_to):
+            logger.warning('Ignoring profile token of %s, who is no longer an active admin', issued_to)
+            return self.wsgi_app(environ, start_response)
+
+        method, path = environ['REQUEST_METHOD'], environ.get('PATH_INFO', '')
+        details = {'request': f'{method} {path}', 'trigger': f'token issued to {issued_to}'}
+        with self.profiler.profiling(f'{method}{path}', details) as stem:
+            def _start_response(status, headers, exc_info=None):
+                if stem:
+                    headers.append(('X-Profile-Report', stem))
+                return start_response(status, headers, exc_info)
+
+            return self.wsgi_app(environ, _start_response)
+
+
+def sampled(view, endpoint, profiler, every):
+    """Profile one call in `every` of a view function; the others run unprofiled."""
+    calls = itertools.count(1)
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if next(calls) % every:
+            return view(*args, **kwargs)
+        details = {'endpoint': endpoint, 'arguments': kwargs, 'trigger': f'sampled 1 in {every}'}
+        with profiler.profiling(endpoint, details):
+            return view(*args, **kwargs)
+
+    return wrapper
+
+
+def init_profiling(app):
+    """Install the token middleware and wrap the sampled views. Call after the routes are registered."""
+    directory = app.config['PROFILE_DIR'] or os.path.join(app.instance_path, 'profiles')
+    profiler = Profiler(ProfileStore(directory, keep=app.config['PROFILE_KEEP']), top=app.config['PROFILE_TOP'])
+    serializer = URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='profile-request')
+    app.extensions['profiling'] = profiler
+    app.extensions['profiling.tokens'] = serializer
+
+    def is_active_admin(username):
+        # Checked on every profiled request, so losing admin rights also voids tokens already issued
+        with app.app_context():
+            user = db.session.execute(db.select(User.is_admin, User.is_active)
+                                      .where(User.username == username)).first()
+        return user is not None and bool(user.is_admin) and user.is_active is not False
+
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, profiler, serializer, app.config['PROFILE_TOKEN_MAX_AGE'],
+                                       authorize=is_active_admin)
+
+    every = app.config['PROFILE_SAMPLE_EVERY']
+    if every:
+        for endpoint in app.config['PROFILE_SAMPLE_ENDPOINTS']:
+            app.view_functions[endpoint] = sampled(app.view_functions[endpoint], endpoint, profiler, every)
@@ -0,0 +1,201 @@
+# queries.py
+
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import joinedload
+from models import db, Project, Task, User
+
+
+class ProjectSummary:
+    """A project plus the task counts shown on its card."""
+
+    __slots__ = ('project', 'open_count', 'assigned_count', 'completed_count', 'total_count',
+                 'latest_task_change')
+
+    def __init__(self, project, open_count=0, assigned_count=0, completed_count=0, total_count=0,
+                 latest_task_change=None):
+        self.project = project
+        self.open_count = open_count
+        self.assigned_count = assigned_count
+        self.completed_count = completed_count
+        self.total_count = total_count
+        self.latest_task_change = latest_task_change
+
+    @property
+    def version(self):
+        """Changes whenever anything shown on the project's card changes."""
+        return (self.project.updated_at, self.project.owner.username, self.latest_task_change,
+                self.open_count, self.assigned_count, self.total_count)
+
+
+def task_counts(project_ids):
+    """Return {project_id: (open, assigned, completed, total, latest_update)} using one grouped aggregate."""
+    if not project_ids:
+        return {}
+
+    rows = db.session.query(
+        Task.project_id,
+        func.sum(case((Task.status == 'open', 1), else_=0)),
+        func.count(Task.assigned_to_id),
+        func.sum(case((Task.status == 'completed', 1), else_=0)),
+        func.count(Task.id),
+        func.max(Task.updated_at)
+    ).filter(Task.project_id.in_(project_ids))\
+        .group_by(Task.project_id)\
+        .all()
+
+    return {row[0]: tuple(int(value or 0) for value in row[1:5]) + (row[5],) for row in rows}
+
+
+def project_summaries(query=None):
+    """Load projects with their owners joined in and attach per-project task counts.
+
+    Costs two queries no matter how many projects match: one for the projects
+    (owners joined) and one grouped aggregate over their tasks.
+    """
+    if query is None:
+        query = Project.query.order_by(Project.created_at.desc())
+
+    return summarize(query.options(joinedload(Project.owner)).all())
+
+
+def summarize(projects):
+    """Attach per-project task counts to already loaded projects, in one grouped aggregate."""
+    counts = task_counts([project.id for project in projects])
+    return [ProjectSummary(project, *counts.get(project.id, ())) for project in projects]
+
+
+def encode_cursor(project):
+    """Encode the (created_at, id) keyset position of a project as an opaque token.
+
+    created_at is encoded as an empty string when it is NULL.
+    """
+    created_at = project.created_at.isoformat() if project.created_at is not None else ''
+    raw = f'{created_at}|{project.id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a token from encode_cursor(). Raises ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, project_id = raw.rsplit('|', 1)
+        return (datetime.fromisoformat(created_at) if created_at else None), int(project_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def parse_project_filters(args):
+    """Build a filter dict from request args. Raises ValueError on bad values."""
+    filters = {}
+
+    status = args.get('status')
+    if status:
+        if status not in Project.VALID_STATUSES:
+            raise ValueError(f'Invalid status. Must be one of: {", ".join(Project.VALID_STATUSES)}')
+        filters['status'] = status
+
+    priority = args.get('priority')
+    if priority:
+        if priority not in Project.VALID_PRIORITIES:
+            raise ValueError(f'Invalid priority. Must be one of: {", ".join(Project.VALID_PRIORITIES)}')
+        filters['priority'] = priority
+
+    owner = args.get('owner')
+    if owner:
+        filters['owner'] = owner
+
+    for key in ('due_after', 'due_before'):
+        if value := args.get(key):
+            try:
+                filters[key] = datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError('Invalid date format') from None
+
+    return filters
+
+
+def filter_projects(query, filters):
+    """Apply the filters from parse_project_filters() to a Project query."""
+    if 'status' in filters:
+        query = query.filter(Project.status == filters['status'])
+    if 'priority' in filters:
+        query = query.filter(Project.priority == filters['priority'])
+    if 'owner' in filters:
+        owner_id = db.select(User.id).where(User.username == filters['owner']).scalar_subquery()
+        query = query.filter(Project.owner_id == owner_id)
+    if 'due_after' in filters:
+        query = query.filter(Project.due_date >= filters['due_after'])
+    if 'due_before' in filters:
+        query = query.filter(Project.due_date <= filters['due_before'])
+    return query
+
+
+def project_page(filters=None, cursor=None, limit=24):
+    """Return (summaries, next_cursor) for one page of projects, newest first.
+
+    Pages seek on (created_at, id) instead of using OFFSET, so every page costs
+    the same as the first. Projects without a created_at, which only rows
+    written outside the ORM can lack, follow all the others, newest id first;
+    they are fetched separately so that NULLs, which databases sort
+    differently, never enter the seek. next_cursor is None on the last page.
+    """
+    query = filter_projects(Project.query, filters or {}).options(joinedload(Project.owner))
+    created_at, project_id = decode_cursor(cursor) if cursor else (None, None)
+
+    projects = []
+    if created_at is not None or project_id is None:
+        dated = query.filter(Project.created_at.is_not(None))
+        if created_at is not None:
+            dated = dated.filter(or_(
+                Project.created_at < created_at,
+                and_(Project.created_at == created_at, Project.id < project_id)
+            ))
+        projects = dated.order_by(Project.created_at.desc(), Project.id.desc()).limit(limit + 1).all()
+
+    if len(projects) <= limit:
+        undated = query.filter(Project.created_at.is_(None))
+        if project_id is not None and created_at is None:
+            undated = undated.filter(Project.id < project_id)
+        projects += undated.order_by(Project.id.desc()).limit(limit + 1 - len(projects)).all()
+
+    next_cursor = None
+    if len(projects) > limit:
+        projects = projects[:limit]
+        next_cursor = encode_cursor(projects[-1])
+
+    return summarize(projects), next_cursor
+
+
+class TaskNode:
+    """A task and its child nodes, built in memory by task_tree()."""
+
+    __slots__ = ('task', 'children')
+
+    def __init__(self, task):
+        self.task = task
+        self.children = []
+
+
+def task_tree(project_id):
+    """Load every task of a project with its assignee and return the root TaskNodes.
+
+    One query fetches the tasks (assignees joined); the parent->children links
+    are then resolved in a single pass over the rows.
+    """
+    tasks = Task.query.options(joinedload(Task.assigned_to))\
+        .filter_by(project_id=project_id)\
+        .order_by(Task.id)\
+        .all()
+
+    nodes = {task.id: TaskNode(task) for task in tasks}
+    roots = []
+    for task in tasks:
+        if task.parent_id is None:
+            roots.append(nodes[task.id])
+        elif task.parent_id in nodes:
+            nodes[task.parent_id].children.append(nodes[task.id])
+
+    return roots
@@ -0,0 +1,150 @@
+# query_stats.py
+
+import logging
+import os
+import re
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+from models import db
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('slow_queries')
+
+# Bound parameters in either paramstyle, then runs of them (IN lists), then literals
+_PLACEHOLDER = re.compile(r'%\(\w+\)s|\?|\$\d+')
+_PLACEHOLDER_LIST = re.compile(r'\?(\s*,\s*\?)+')
+_NUMBER = re.compile(r'\b\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+
+EXPLAINABLE = ('select', 'update', 'delete', 'with')
+
+
+class RepeatedQueryError(AssertionError):
+    """Raised in tests when one statement shape runs too often in a request (an N+1)."""
+
+
+def statement_shape(statement):
+    """Normalize SQL so that the same query with different ids or IN-list lengths compares equal."""
+    shape = _PLACEHOLDER.sub('?', statement)
+    shape = _PLACEHOLDER_LIST.sub('?', shape)
+    shape = _NUMBER.sub('N', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class RequestQueries:
+    """Queries issued while handling one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record(self, statement, elapsed):
+        self.count += 1
+        self.duration += elapsed
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self, threshold):
+        """Shapes that ran more than `threshold` times, most frequent first."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count > threshold]
+
+    def server_timing(self):
+        total = (time.perf_counter() - self.started) * 1000
+        return (f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries", '
+                f'app;dur={total:.1f}')
+
+
+def explain(cursor, statement, parameters, dialect):
+    """Return the plan for a statement using a fresh DBAPI cursor on the same connection.
+
+    This runs inside the caller's transaction. A failed statement aborts the
+    whole transaction on PostgreSQL, so there the EXPLAIN is confined to a
+    savepoint that is rolled back if it fails.
+    """
+    if not statement.lstrip().lower().startswith(EXPLAINABLE):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect == 'sqlite' else 'EXPLAIN '
+    savepoint = dialect != 'sqlite'
+    plan_cursor = cursor.connection.cursor()
+    try:
+        if savepoint:
+            plan_cursor.execute('SAVEPOINT explain_plan')
+        try:
+            plan_cursor.execute(prefix + statement, parameters)
+            plan = '\n'.join(' '.join(str(column) for column in row) for row in plan_cursor.fetchall())
+        except Exception as e:
+            if savepoint:
+                plan_cursor.execute('ROLLBACK TO SAVEPOINT explain_plan')
+            plan = f'EXPLAIN failed: {e}'
+        if savepoint:
+            plan_cursor.execute('RELEASE SAVEPOINT explain_plan')
+        return plan
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
+    finally:
+        plan_cursor.close()
+
+
+def instrument_engine(engine, config):
+    slow_seconds = config['SQL_SLOW_QUERY_MS'] / 1000
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'handle_error')
+    def _failed(context):
+        started = context.connection.info.get('query_started') if context.connection is not None else None
+        if started:
+            started.pop()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_started'].pop()
+        if has_request_context() and 'sql_queries' in g:
+            g.sql_queries.record(statement, elapsed)
+
+        if slow_seconds and elapsed >= slow_seconds:
+            plan = None if executemany else explain(cursor, statement, parameters, engine.dialect.name)
+            slow_query_logger.warning('%.1f ms%s\n%s\nparameters: %r\nplan:\n%s',
+                                      elapsed * 1000,
+                                      f' in {request.method} {request.path}' if has_request_context() else '',
+                                      statement, parameters, plan)
+
+
+def init_query_stats(app):
+    path = app.config['SQL_SLOW_QUERY_LOG']
+    if path and not any(getattr(handler, 'baseFilename', None) == os.path.abspath(path)
+                        for handler in slow_query_logger.handlers):
+        handler = logging.FileHandler(path)
+        handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+        slow_query_logger.addHandler(handler)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine, app.config)
+
+    @app.before_request
+    def _start_recording():
+        g.sql_queries = RequestQueries()
+
+    @app.after_request
+    def _report_queries(response):
+        queries = g.pop('sql_queries', None)
+        if queries is None:
+            return response
+
+        repeated = queries.repeated(app.config['SQL_REPEAT_THRESHOLD'])
+        if repeated:
+            details = '; '.join(f'{count}x {shape}' for shape, count in repeated)
+            if app.config['SQL_RAISE_ON_REPEAT']:
+                raise RepeatedQueryError(f'{request.method} {request.path} repeated queries: {details}')
+            logger.warning('Possible N+1 in %s %s: %s', request.method, request.path, details)
+
+        if current_user.is_authenticated and current_user.is_administrator():
+            response.headers['Server-Timing'] = queries.server_timing()
+        return response
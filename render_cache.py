@@ -0,0 +1,71 @@
+# render_cache.py
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from sqlalchemy import event
+from cache import TTLCache
+from models import Project, Task, User
+
+# Rendered fragments keyed by (name, key), each stored with the version it was rendered for
+render_cache = TTLCache(maxsize=2048)
+
+
+class FragmentCacheExtension(Extension):
+    """Adds {% cache name[, key[, version]] %}...{% endcache %} to templates.
+
+    The body is rendered once and reused until the version changes or the entry
+    is invalidated. Keep anything that depends on the current user outside the
+    block, since cached fragments are shared between users.
+    """
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        while len(args) < 3:
+            args.append(nodes.Const(None))
+
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args[:3]), [], [], body).set_lineno(lineno)
+
+    def _render(self, name, key, version, caller):
+        entry = render_cache.get((name, key))
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        html = caller()
+        render_cache.set((name, key), (version, html))
+        return html
+
+
+def init_render_cache(app):
+    render_cache.configure(maxsize=app.config['RENDER_CACHE_SIZE'])
+    app.jinja_env.add_extension(FragmentCacheExtension)
+
+
+def invalidate_project(project_id):
+    render_cache.pop(('project-card', project_id))
+
+
+@event.listens_for(Project, 'after_insert')
+@event.listens_for(Project, 'after_update')
+@event.listens_for(Project, 'after_delete')
+def _project_changed(mapper, connection, target):
+    invalidate_project(target.id)
+
+
+@event.listens_for(Task, 'after_insert')
+@event.listens_for(Task, 'after_update')
+@event.listens_for(Task, 'after_delete')
+def _task_changed(mapper, connection, target):
+    invalidate_project(target.project_id)
+
+
+# project_users is a plain table, so membership changes are caught on the relationship
+@event.listens_for(User.member_of_projects, 'append')
+@event.listens_for(User.member_of_projects, 'remove')
+def _membership_changed(user, project, initiator):
+    invalidate_project(project.id)
@@ -1,23 +1,70 @@
-from flask import flash, redirect, render_template, url_for, request, jsonify
+from flask import flash, redirect, render_template, url_for, request, jsonify, make_response, abort, send_from_directory
 from flask_login import login_required, login_user, logout_user, current_user
 from forms import LoginForm
-from models import User, db, Project, Task, Submission, Feedback
-from werkzeug.security import check_password_hash, generate_password_hash
+from models import User, db, Project, Task, Submission, Feedback, Job
+from sqlalchemy.orm import contains_eager, joinedload
 from datetime import datetime, timezone
 import werkzeug.exceptions
 from urllib.parse import urlparse
+from queries import parse_project_filters, project_page, task_tree
+from permissions import can_act_on_project, can_view_task
+from identity import invalidate_user
+from passwords import password_hasher
+from conditional import profile_validator, project_validator, task_validator
+from search import search
+from user_index import user_index
+from db_pool import pool_report
+from outbox import outbox
+from jobs import job_runner
+
+def verify_password(password_hash, password, busy_response):
+    """password_hasher.verify() for a view.
+
+    When no hashing thread frees up within PASSWORD_HASH_TIMEOUT, the user is
+    asked to retry and the request ends with `busy_response()` instead of a 500.
+    """
+    try:
+        return password_hasher.verify(password_hash, password)
+    except TimeoutError:
+        flash('The server is busy. Please try again in a few seconds.', 'error')
+        abort(make_response(busy_response()))
 
 def init_routes(app):
     @app.route('/')
     def index():
         return render_template('index.html')
     
+    @app.route('/search')
+    @login_required
+    def search_page():
+        query = request.args.get('q', '').strip()
+        results = search(query, current_user, limit=app.config['SEARCH_RESULTS_LIMIT']) if query else []
+        return render_template('search.html', query=query, results=results)
+
+    @app.route('/api/search')
+    @login_required
+    def api_search():
+        query = request.args.get('q', '').strip()
+        # A limit that is not a number falls back to the default; any other is kept within 1..100
+        limit = request.args.get('limit', app.config['SEARCH_RESULTS_LIMIT'], type=int)
+        limit = max(1, min(limit, 100))
+        
+        results = search(query, current_user, limit=limit)
+        return jsonify({'results': [result.to_dict() for result in results]})
+    
     @app.route('/login', methods=['GET', 'POST'])
     def login():
         form = LoginForm()
         if form.validate_on_submit():
             user = User.query.filter_by(username=form.username.data).first()
-            if user and check_password_hash(user.password_hash, form.password.data):
+            if user and verify_password(user.password_hash, form.password.data,
+                                        lambda: (render_template('login.html', form=form), 503,
+                                                 {'Retry-After': '5'})):
+                # Upgrade hashes made under an older policy while we have the plaintext
+                if password_hasher.needs_rehash(user.password_hash):
+                    user.password_hash = password_hasher.hash(form.password.data)
+                    db.session.commit()
+                    invalidate_user(user.id)
                 login_user(user)
                 flash('Logged in successfully.', 'success')
                 return redirect(url_for('index'))
@@ -35,8 +82,35 @@ def init_routes(app):
     @app.route('/projects')
     @login_required
     def projects():
-        projects = Project.query.order_by(Project.created_at.desc()).all()
-        return render_template('projects.html', projects=projects)
+        try:
+            filters = parse_project_filters(request.args)
+        except ValueError as e:
+            flash(str(e), 'error')
+            filters = {}
+
+        summaries, next_cursor = project_page(filters, limit=app.config['PROJECTS_PER_PAGE'])
+        return render_template('projects.html',
+                             summaries=summaries,
+                             next_cursor=next_cursor,
+                             filters=request.args,
+                             statuses=Project.VALID_STATUSES,
+                             priorities=Project.VALID_PRIORITIES)
+
+    @app.route('/projects/page')
+    @login_required
+    def projects_page():
+        try:
+            filters = parse_project_filters(request.args)
+            summaries, next_cursor = project_page(filters,
+                                                  cursor=request.args.get('cursor'),
+                                                  limit=app.config['PROJECTS_PER_PAGE'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({
+            'html': render_template('components/project_cards.html', summaries=summaries),
+            'next_cursor': next_cursor
+        })
 
     @app.route('/projects/create', methods=['GET', 'POST'])
     @login_required
@@ -87,15 +161,24 @@ def init_routes(app):
                 db.session.rollback()
                 return jsonify({'error': str(e)}), 500
         
-        # Get all users for member selection
-        users = User.query.filter(User.id != current_user.id).all()
-        return render_template('create_project.html', users=users) 
+        return render_template('create_project.html') 
 
     @app.route('/projects/<int:project_id>')
     @login_required
     def view_project(project_id):
-        project = Project.query.get_or_404(project_id)
-        return render_template('view_project.html', project=project, project_id=project_id)
+        # Answer revalidations from a single fingerprint query before loading the tree
+        validator = project_validator(project_id)
+        if validator is None:
+            abort(404)
+        if validator.is_fresh():
+            return validator.not_modified()
+        
+        project = Project.query.options(joinedload(Project.owner)).filter_by(id=project_id).first_or_404()
+        return validator.apply(make_response(render_template('view_project.html',
+                             project=project,
+                             project_id=project_id,
+                             task_tree=task_tree(project_id),
+                             members=project.members.all())))
 
     @app.route('/projects/<int:project_id>/edit', methods=['GET', 'POST'])
     @login_required
@@ -131,9 +214,7 @@ def init_routes(app):
             flash('Project updated successfully!', 'success')
             return redirect(url_for('view_project', project_id=project.id))
         
-        # Get all users for member selection
-        users = User.query.filter(User.id != current_user.id).all()
-        return render_template('edit_project.html', project=project, users=users) 
+        return render_template('edit_project.html', project=project) 
 
     @app.route('/project/<int:project_id>/add_task', methods=['POST'])
     @login_required
@@ -142,7 +223,7 @@ def init_routes(app):
             project = Project.query.get_or_404(project_id)
             
             # Check if user has permission
-            if project.owner_id != current_user.id and current_user not in project.members:
+            if not can_act_on_project(current_user, project):
                 return jsonify({'success': False, 'error': 'Unauthorized'}), 403
             
             # Get form data
@@ -183,7 +264,7 @@ def init_routes(app):
             task = Task.query.get_or_404(task_id)
             
             # Check if user has access to this task's project
-            if task.project.owner_id != current_user.id and current_user not in task.project.members:
+            if not can_act_on_project(current_user, task.project):
                 return jsonify({'success': False, 'error': 'Unauthorized'}), 403
             
             # Toggle the completion state
@@ -210,6 +291,22 @@ def init_routes(app):
             return jsonify({'user_id': user.id})
         return jsonify({'error': 'User not found'}), 404
 
+    @app.route('/api/users/search')
+    @login_required
+    def search_users():
+        try:
+            limit = min(int(request.args.get('limit', 10)), 50)
+        except ValueError:
+            return jsonify({'error': 'Invalid limit'}), 400
+
+        # Served from the in-memory prefix index; only admins can find users by email or see it
+        is_admin = current_user.is_administrator()
+        matches = user_index.search(request.args.get('q', ''), limit=limit, emails=is_admin)
+        fields = ('id', 'username', 'first_name', 'last_name')
+        if is_admin:
+            fields += ('email',)
+        return jsonify({'users': [{field: match[field] for field in fields} for match in matches]})
+
     @app.route('/api/tasks/<int:task_id>/assign', methods=['POST'])
     @login_required
     def assign_task(task_id):
@@ -218,7 +315,7 @@ def init_routes(app):
             project = task.project
             
             # Check permissions
-            if project.owner_id != current_user.id and current_user not in project.members:
+            if not can_act_on_project(current_user, project):
                 return jsonify({'success': False, 'error': 'Unauthorized'}), 403
             
             data = request.get_json()
@@ -244,18 +341,23 @@ def init_routes(app):
     def user_profile(username):
         user = User.query.filter_by(username=username).first_or_404()
         
-        # Update this line to get tasks assigned to this user
-        assigned_tasks = Task.query.filter_by(assigned_to_id=user.id)\
-            .join(Project)\
-            .order_by(Task.due_date.asc())\
-            .all()
-        
         # If user is admin or viewing their own profile
         if current_user.is_administrator() or current_user.username == username:
-            return render_template('profile.html', 
+            validator = profile_validator(user)
+            if validator.is_fresh():
+                return validator.not_modified()
+            
+            # Load each task's project from the join instead of one query per task
+            assigned_tasks = Task.query.filter_by(assigned_to_id=user.id)\
+                .join(Project)\
+                .options(contains_eager(Task.project))\
+                .order_by(Task.due_date.asc())\
+                .all()
+            
+            return validator.apply(make_response(render_template('profile.html', 
                                  user=user, 
                                  assigned_tasks=assigned_tasks,
-                                 is_admin=current_user.is_administrator())
+                                 is_admin=current_user.is_administrator())))
         
         flash('You do not have permission to view this profile.', 'error')
         return redirect(url_for('index'))
@@ -300,13 +402,18 @@ def init_routes(app):
         new_user = User(
             username=username,
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=password_hasher.hash(password),
             role='user',
             is_admin=False
         )
         
         try:
             db.session.add(new_user)
+            if outbox.enabled:
+                # Committed with the user, and sent by the background sender
+                outbox.enqueue(email, 'Your account', render_template(
+                    'email/invite.txt', username=username, password=password,
+                    login_url=url_for('login', _external=True)), kind='invite')
             db.session.commit()
             flash(f'User {email} created successfully.', 'success')
         except Exception as e:
@@ -315,6 +422,26 @@ def init_routes(app):
             
         return redirect(url_for('admin_users'))
 
+    @app.route('/admin/users/import', methods=['POST'])
+    @login_required
+    def import_users():
+        if not current_user.is_administrator():
+            return jsonify({'success': False, 'error': 'Access denied. Admin privileges required.'}), 403
+        
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({'success': False, 'error': 'CSV file is required'}), 400
+        
+        # Large files take minutes to hash and insert, so the import runs as a job.
+        # Rows committed before a failure stay, so it is not retried.
+        job = job_runner.enqueue('import_users', {
+            'path': job_runner.save_upload(upload),
+            # Hashed here so the plain password is never stored with the job
+            'default_password_hash': password_hasher.hash(request.form.get('password') or 'prepkc123'),
+        }, created_by=current_user.id, max_attempts=1)
+        db.session.commit()
+        return job_accepted(job)
+
     @app.route('/admin/users/<username>/delete', methods=['DELETE'])
     @login_required
     def delete_user(username):
@@ -329,23 +456,71 @@ def init_routes(app):
         if not user:
             return jsonify({'success': False, 'error': 'User not found'}), 404
         
-        try:
-            # Remove user from all projects
-            for project in user.member_of_projects:
-                project.members.remove(user)
-            
-            # Reassign or delete tasks
-            Task.query.filter_by(assigned_to_id=user.id).update({'assigned_to_id': None})
-            Task.query.filter_by(created_by_id=user.id).update({'created_by_id': current_user.id})
-            
-            # Delete the user
-            db.session.delete(user)
-            db.session.commit()
-            
-            return jsonify({'success': True})
-        except Exception as e:
-            db.session.rollback()
-            return jsonify({'success': False, 'error': str(e)}), 500
+        # Detaching a user from all of their tasks can take a while, so it runs as a job
+        job = job_runner.enqueue('delete_user', {'user_id': user.id, 'reassign_to': current_user.id},
+                                 created_by=current_user.id)
+        db.session.commit()
+        return job_accepted(job)
+
+    def job_accepted(job):
+        status_url = url_for('admin_job', job_id=job.id)
+        response = jsonify({'success': True, 'job_id': job.id, 'status_url': status_url})
+        response.status_code = 202
+        response.headers['Location'] = status_url
+        return response
+
+    @app.route('/admin/jobs')
+    @login_required
+    def admin_jobs():
+        if not current_user.is_administrator():
+            abort(403)
+
+        jobs = db.session.scalars(db.select(Job).order_by(Job.id.desc()).limit(100)).all()
+        return render_template('admin/jobs.html', jobs=jobs, workers=job_runner.workers)
+
+    @app.route('/admin/jobs/<int:job_id>')
+    @login_required
+    def admin_job(job_id):
+        if not current_user.is_administrator():
+            return jsonify({'success': False, 'error': 'Access denied'}), 403
+
+        job = db.session.get(Job, job_id)
+        if job is None:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        return jsonify({'success': True, 'job': job.to_dict()})
+
+    @app.route('/admin/db/pool')
+    @login_required
+    def admin_db_pool():
+        if not current_user.is_administrator():
+            return jsonify({'success': False, 'error': 'Access denied'}), 403
+        
+        # Per worker: each gunicorn process has its own pool and counters
+        return jsonify(pool_report(db.engines))
+
+    @app.route('/admin/profiles')
+    @login_required
+    def admin_profiles():
+        if not current_user.is_administrator():
+            abort(403)
+
+        profiler = app.extensions['profiling']
+        token = app.extensions['profiling.tokens'].dumps(current_user.username)
+        return render_template('admin/profiles.html', reports=profiler.store.reports(), token=token,
+                               token_max_age=app.config['PROFILE_TOKEN_MAX_AGE'],
+                               sample_every=app.config['PROFILE_SAMPLE_EVERY'],
+                               sample_endpoints=app.config['PROFILE_SAMPLE_ENDPOINTS'])
+
+    @app.route('/admin/profiles/<filename>')
+    @login_required
+    def download_profile(filename):
+        if not current_user.is_administrator():
+            abort(403)
+
+        store = app.extensions['profiling'].store
+        if not store.is_report(filename):
+            abort(404)
+        return send_from_directory(store.directory, filename, as_attachment=filename.endswith('.prof'))
 
     @app.route('/admin/users/<username>/info', methods=['GET'])
     @login_required
@@ -411,6 +586,7 @@ def init_routes(app):
             user.is_active = data['is_active']
             
             db.session.commit()
+            invalidate_user(user.id)
             return jsonify({'success': True})
             
         except Exception as e:
@@ -429,7 +605,8 @@ def init_routes(app):
         confirm_password = request.form.get('confirm_password')
         
         # Verify current password
-        if not check_password_hash(current_user.password_hash, current_password):
+        if not verify_password(current_user.password_hash, current_password,
+                               lambda: redirect(url_for('user_profile', username=username))):
             flash('Current password is incorrect.', 'error')
             return redirect(url_for('user_profile', username=username))
         
@@ -439,8 +616,9 @@ def init_routes(app):
             return redirect(url_for('user_profile', username=username))
         
         # Update password
-        current_user.password_hash = generate_password_hash(new_password)
+        current_user.password_hash = password_hasher.hash(new_password)
         db.session.commit()
+        invalidate_user(current_user.id)
         
         flash('Password updated successfully.', 'success')
         return redirect(url_for('user_profile', username=username))
@@ -454,8 +632,10 @@ def init_routes(app):
         task = Task.query.get_or_404(task_id)
         
         try:
-            # Delete all subtasks first
-            Task.query.filter_by(parent_id=task_id).delete()
+            # Delete all subtasks first, through the session so their feedback,
+            # submissions and search index entries go with them
+            for subtask in task.subtasks:
+                db.session.delete(subtask)
             
             # Delete the task
             db.session.delete(task)
@@ -514,6 +694,7 @@ def init_routes(app):
             current_user.last_name = data.get('last_name')
             
             db.session.commit()
+            invalidate_user(current_user.id)
             return jsonify({'success': True})
             
         except Exception as e:
@@ -540,8 +721,9 @@ def init_routes(app):
             if not new_password or len(new_password) < 6:
                 return jsonify({'success': False, 'error': 'Password must be at least 6 characters'}), 400
             
-            user.password_hash = generate_password_hash(new_password)
+            user.password_hash = password_hasher.hash(new_password)
             db.session.commit()
+            invalidate_user(user.id)
             
             return jsonify({'success': True})
             
@@ -556,10 +738,7 @@ def init_routes(app):
         project = task.project
         
         # Check if user has access to this task
-        if not (current_user.is_administrator() or 
-                project.owner_id == current_user.id or 
-                current_user in project.members or 
-                task.assigned_to_id == current_user.id):
+        if not can_view_task(current_user, task):
             flash('You do not have permission to view this task.', 'error')
             return redirect(url_for('view_project', project_id=project.id))
         
@@ -606,11 +785,15 @@ def init_routes(app):
             db.session.commit()
             return redirect(url_for('task_detail', task_id=task_id))
         
+        validator = task_validator(task)
+        if validator.is_fresh():
+            return validator.not_modified()
+        
         # Get submissions and feedback ordered by date
         submissions = Submission.query.filter_by(task_id=task_id).order_by(Submission.submission_date.desc()).all()
         feedback_entries = Feedback.query.filter_by(task_id=task_id).order_by(Feedback.feedback_date.desc()).all()
         
-        return render_template('task_detail.html', 
+        return validator.apply(make_response(render_template('task_detail.html', 
                              task=task, 
                              submissions=submissions,
-                             feedback_entries=feedback_entries)
\ No newline at end of file
+                             feedback_entries=feedback_entries)))
\ No newline at end of file
@@ -0,0 +1,249 @@
+# search.py
+
+import re
+from flask import current_app, has_app_context
+from markupsafe import Markup, escape
+from sqlalchemy import event, select, text
+from models import db, Project, Task, Feedback, Submission
+
+# Each document's id in search_index packs the source row id with its kind
+KIND_CODES = {'project': 0, 'task': 1, 'feedback': 2, 'submission': 3}
+
+# Control characters survive FTS5 snippet() and ts_headline(), so matches are
+# marked with them and turned into <mark> tags only after the text is escaped
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+    "kind UNINDEXED, ref_id UNINDEXED, project_id UNINDEXED, task_id UNINDEXED, "
+    "title, body, tokenize='porter unicode61')",
+)
+
+POSTGRES_DDL = (
+    "CREATE TABLE IF NOT EXISTS search_index ("
+    "doc_id BIGINT PRIMARY KEY, kind VARCHAR(16) NOT NULL, ref_id INTEGER NOT NULL, "
+    "project_id INTEGER NOT NULL, task_id INTEGER, title TEXT, body TEXT, "
+    "document TSVECTOR GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('{language}', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('{language}', coalesce(body, '')), 'B')) STORED)",
+    "CREATE INDEX IF NOT EXISTS ix_search_index_document ON search_index USING GIN (document)",
+    "CREATE INDEX IF NOT EXISTS ix_search_index_project_id ON search_index (project_id)",
+)
+
+
+def _language():
+    if has_app_context():
+        return current_app.config['SEARCH_LANGUAGE']
+    return 'english'
+
+
+def create_search_index(connection):
+    if connection.dialect.name == 'sqlite':
+        statements = SQLITE_DDL
+    elif connection.dialect.name == 'postgresql':
+        statements = [ddl.format(language=_language()) for ddl in POSTGRES_DDL]
+    else:
+        return
+    for statement in statements:
+        connection.exec_driver_sql(statement)
+
+
+def drop_search_index(connection):
+    if connection.dialect.name in ('sqlite', 'postgresql'):
+        connection.exec_driver_sql('DROP TABLE IF EXISTS search_index')
+
+
+# search_index is not a mapped table, so create_all()/drop_all() manage it through DDL events
+@event.listens_for(db.metadata, 'after_create')
+def _after_create(target, connection, **kw):
+    create_search_index(connection)
+
+
+@event.listens_for(db.metadata, 'before_drop')
+def _before_drop(target, connection, **kw):
+    drop_search_index(connection)
+
+
+def _doc_id(kind, ref_id):
+    return ref_id * len(KIND_CODES) + KIND_CODES[kind]
+
+
+def _join(*parts):
+    return ' '.join(part for part in parts if part)
+
+
+def _document(connection, kind, target):
+    """Return (project_id, task_id, title, body) for a model instance."""
+    if kind == 'project':
+        return target.id, None, target.title, _join(target.description, *(target.features or []))
+    if kind == 'task':
+        return target.project_id, target.id, target.title, _join(target.description, target.notes)
+
+    project_id = connection.scalar(select(Task.project_id).where(Task.id == target.task_id))
+    if kind == 'feedback':
+        return project_id, target.task_id, None, target.feedback_text
+    return project_id, target.task_id, None, _join(target.submission_text, target.submission_url)
+
+
+def index_document(connection, kind, target):
+    project_id, task_id, title, body = _document(connection, kind, target)
+    params = {
+        'doc_id': _doc_id(kind, target.id), 'kind': kind, 'ref_id': target.id,
+        'project_id': project_id, 'task_id': task_id, 'title': title, 'body': body,
+    }
+
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text('DELETE FROM search_index WHERE rowid = :doc_id'), params)
+        connection.execute(text(
+            'INSERT INTO search_index (rowid, kind, ref_id, project_id, task_id, title, body) '
+            'VALUES (:doc_id, :kind, :ref_id, :project_id, :task_id, :title, :body)'), params)
+    elif connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            'INSERT INTO search_index (doc_id, kind, ref_id, project_id, task_id, title, body) '
+            'VALUES (:doc_id, :kind, :ref_id, :project_id, :task_id, :title, :body) '
+            'ON CONFLICT (doc_id) DO UPDATE SET title = EXCLUDED.title, body = EXCLUDED.body, '
+            'project_id = EXCLUDED.project_id, task_id = EXCLUDED.task_id'), params)
+
+
+def remove_document(connection, kind, ref_id):
+    key = 'rowid' if connection.dialect.name == 'sqlite' else 'doc_id'
+    if connection.dialect.name in ('sqlite', 'postgresql'):
+        connection.execute(text(f'DELETE FROM search_index WHERE {key} = :doc_id'),
+                           {'doc_id': _doc_id(kind, ref_id)})
+
+
+def _register(model, kind):
+    # Index rows inside the same flush that writes them, so the index commits
+    # or rolls back together with the data
+    @event.listens_for(model, 'after_insert')
+    @event.listens_for(model, 'after_update')
+    def _saved(mapper, connection, target):
+        index_document(connection, kind, target)
+
+    @event.listens_for(model, 'after_delete')
+    def _deleted(mapper, connection, target):
+        remove_document(connection, kind, target.id)
+
+
+_register(Project, 'project')
+_register(Task, 'task')
+_register(Feedback, 'feedback')
+_register(Submission, 'submission')
+
+
+def rebuild_search_index():
+    """Recreate the index from the source tables with set-based INSERT ... SELECT statements.
+
+    Needed after bulk loads that bypass ORM events.
+    """
+    connection = db.session.connection()
+    drop_search_index(connection)
+    create_search_index(connection)
+    rebuild_search_index_on(connection)
+    db.session.commit()
+
+
+def rebuild_search_index_on(connection):
+    """Fill an empty search_index from the source tables."""
+    if connection.dialect.name not in ('sqlite', 'postgresql'):
+        return
+    key = 'rowid' if connection.dialect.name == 'sqlite' else 'doc_id'
+    n = len(KIND_CODES)
+    sources = [
+        f"SELECT id * {n} + 0, 'project', id, id, NULL, title, "
+        "coalesce(description, '') || ' ' || coalesce(CAST(features AS TEXT), '') FROM projects",
+        f"SELECT id * {n} + 1, 'task', id, project_id, id, title, "
+        "coalesce(description, '') || ' ' || coalesce(notes, '') FROM tasks",
+        f"SELECT f.id * {n} + 2, 'feedback', f.id, t.project_id, f.task_id, NULL, f.feedback_text "
+        "FROM feedback f JOIN tasks t ON t.id = f.task_id",
+        f"SELECT s.id * {n} + 3, 'submission', s.id, t.project_id, s.task_id, NULL, "
+        "coalesce(s.submission_text, '') || ' ' || coalesce(s.submission_url, '') "
+        "FROM submissions s JOIN tasks t ON t.id = s.task_id",
+    ]
+    for source in sources:
+        connection.exec_driver_sql(
+            f'INSERT INTO search_index ({key}, kind, ref_id, project_id, task_id, title, body) {source}')
+
+
+def _fts5_query(terms):
+    # Quote every term so user input can never be parsed as FTS5 syntax; the
+    # last term also matches as a prefix for search-as-you-type
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def _visibility_clause(user):
+    """SQL limiting results to what task_detail/view_project would let the user see."""
+    if user.is_administrator():
+        return '1 = 1'
+    return (
+        "(s.kind = 'project' "
+        "OR s.project_id IN (SELECT id FROM projects WHERE owner_id = :user_id) "
+        "OR s.project_id IN (SELECT project_id FROM project_users WHERE user_id = :user_id) "
+        "OR s.task_id IN (SELECT id FROM tasks WHERE assigned_to_id = :user_id))"
+    )
+
+
+class SearchResult:
+    __slots__ = ('kind', 'ref_id', 'project_id', 'task_id', 'title', 'snippet')
+
+    def __init__(self, kind, ref_id, project_id, task_id, title, snippet):
+        self.kind = kind
+        self.ref_id = ref_id
+        self.project_id = project_id
+        self.task_id = task_id
+        self.title = title
+        self.snippet = snippet
+
+    @property
+    def highlighted(self):
+        """The snippet as HTML with matches wrapped in <mark>."""
+        html = str(escape(self.snippet or ''))
+        return Markup(html.replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>'))
+
+    def to_dict(self):
+        return {
+            'kind': self.kind,
+            'id': self.ref_id,
+            'project_id': self.project_id,
+            'task_id': self.task_id,
+            'title': self.title,
+            'snippet': str(self.highlighted),
+        }
+
+
+def search(query, user, limit=20):
+    """Return up to `limit` SearchResults for `query`, best match first, that `user` may see."""
+    terms = re.findall(r'\w+', query or '')
+    if not terms:
+        return []
+
+    params = {'user_id': user.id, 'limit': limit}
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite':
+        params['query'] = _fts5_query(terms)
+        sql = (
+            "SELECT s.kind, s.ref_id, s.project_id, s.task_id, s.title, "
+            f"snippet(search_index, 5, '{MATCH_START}', '{MATCH_END}', '...', 16) "
+            "FROM search_index s "
+            f"WHERE search_index MATCH :query AND {_visibility_clause(user)} "
+            # Title matches weigh ten times body matches
+            "ORDER BY bm25(search_index, 0, 0, 0, 0, 10.0, 1.0) LIMIT :limit"
+        )
+    elif connection.dialect.name == 'postgresql':
+        params['query'] = ' & '.join(terms) + ':*'
+        params['language'] = _language()
+        sql = (
+            "SELECT kind, ref_id, project_id, task_id, title, ts_headline(CAST(:language AS regconfig), body, q, "
+            f"'StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords=24, MinWords=8') "
+            "FROM (SELECT s.*, q, ts_rank(s.document, q) AS rank "
+            "FROM search_index s, to_tsquery(CAST(:language AS regconfig), :query) q "
+            f"WHERE s.document @@ q AND {_visibility_clause(user)} "
+            "ORDER BY rank DESC LIMIT :limit) ranked ORDER BY rank DESC"
+        )
+    else:
+        return []
+
+    return [SearchResult(*row) for row in connection.execute(text(sql), params)]
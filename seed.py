@@ -0,0 +1,217 @@
+# seed.py
+
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, insert, select, text
+from models import Feedback, Project, Submission, Task, User, project_users
+
+DISTRIBUTIONS = ('uniform', 'pareto')
+TASK_STATUSES = ('open', 'in_progress', 'blocked')
+PRIORITIES = ('low', 'medium', 'high')
+# Shape of the pareto distribution that puts about 80% of the weight on 20% of the items
+PARETO_ALPHA = 1.16
+
+
+def weights(count, distribution, rng):
+    """Relative sizes for `count` items: equal, or heavy-tailed like real usage."""
+    if distribution == 'uniform':
+        return [1.0] * count
+    return [rng.paretovariate(PARETO_ALPHA) for _ in range(count)]
+
+
+def split(total, item_weights):
+    """Divide `total` into integer parts proportional to `item_weights`."""
+    scale = total / sum(item_weights)
+    shares = [weight * scale for weight in item_weights]
+    parts = [int(share) for share in shares]
+    # Hand the remainder to the largest fractional parts so the sum is exact
+    by_fraction = sorted(range(len(shares)), key=lambda i: parts[i] - shares[i])
+    for i in by_fraction[:total - sum(parts)]:
+        parts[i] += 1
+    return parts
+
+
+def cumulative(item_weights):
+    totals = []
+    running = 0.0
+    for weight in item_weights:
+        running += weight
+        totals.append(running)
+    return totals
+
+
+class SeedReport:
+    """Rows inserted per table and the time each table took."""
+
+    def __init__(self):
+        self.rows = {}
+        self.seconds = {}
+
+    def to_dict(self):
+        return {'rows': self.rows, 'seconds': self.seconds}
+
+
+class Seeder:
+    """Generates synthetic users, projects, task trees, memberships, feedback and submissions.
+
+    Rows are built from a seeded random generator, so the same settings always
+    produce the same data, and written with executemany Core inserts of
+    `batch_size` rows, bypassing the ORM. Ids continue after the largest
+    existing id of each table, so seeding adds to whatever is already there.
+    Everyone gets the same password hash, computed once.
+    """
+
+    def __init__(self, users=1000, projects=500, tasks=100000, members_per_project=4, max_depth=3,
+                 root_ratio=0.3, assigned_ratio=0.6, completed_ratio=0.3, feedback_per_task=0.2,
+                 submissions_per_task=0.2, project_distribution='pareto', assignee_distribution='pareto',
+                 days=365, seed=1234, batch_size=10000):
+        if users < 1 or projects < 1 or tasks < 0:
+            raise ValueError('Need at least one user and one project')
+        for distribution in (project_distribution, assignee_distribution):
+            if distribution not in DISTRIBUTIONS:
+                raise ValueError(f'Distribution must be one of: {", ".join(DISTRIBUTIONS)}')
+        self.users = users
+        self.projects = projects
+        self.tasks = tasks
+        self.members_per_project = members_per_project
+        self.max_depth = max_depth
+        self.root_ratio = root_ratio
+        self.assigned_ratio = assigned_ratio
+        self.completed_ratio = completed_ratio
+        self.feedback_per_task = feedback_per_task
+        self.submissions_per_task = submissions_per_task
+        self.project_distribution = project_distribution
+        self.assignee_distribution = assignee_distribution
+        self.days = days
+        self.seed = seed
+        self.batch_size = batch_size
+
+    def run(self, connection, password_hash):
+        """Insert everything on `connection` (the caller commits) and return a SeedReport."""
+        report = SeedReport()
+        rng = random.Random(self.seed)
+        self.now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+        def next_id(model):
+            return (connection.scalar(select(func.max(model.id))) or 0) + 1
+
+        first_user = next_id(User)
+        user_ids = range(first_user, first_user + self.users)
+        first_project = next_id(Project)
+        project_ids = range(first_project, first_project + self.projects)
+        first_task = next_id(Task)
+        task_ids = range(first_task, first_task + self.tasks)
+
+        project_sizes = split(self.tasks, weights(self.projects, self.project_distribution, rng))
+        assignee_weights = cumulative(weights(self.users, self.assignee_distribution, rng))
+        owners = rng.choices(user_ids, cum_weights=assignee_weights, k=self.projects)
+
+        tables = (
+            ('users', User.__table__, self._users(user_ids, password_hash)),
+            ('projects', Project.__table__, self._projects(project_ids, owners, rng)),
+            ('project_users', project_users, self._members(project_ids, user_ids, rng)),
+            ('tasks', Task.__table__, self._tasks(first_task, project_ids, project_sizes, owners,
+                                                  user_ids, assignee_weights, rng)),
+            ('feedback', Feedback.__table__,
+             self._feedback(next_id(Feedback), task_ids, user_ids, rng)),
+            ('submissions', Submission.__table__,
+             self._submissions(next_id(Submission), task_ids, user_ids, rng)),
+        )
+        for name, table, rows in tables:
+            started = time.perf_counter()
+            report.rows[name] = self._insert(connection, table, rows)
+            report.seconds[name] = time.perf_counter() - started
+
+        if connection.dialect.name == 'postgresql':
+            # Explicit ids leave the serial sequences behind
+            for name in ('users', 'projects', 'tasks', 'feedback', 'submissions'):
+                connection.execute(text(f"SELECT setval(pg_get_serial_sequence('{name}', 'id'), "
+                                        f"(SELECT max(id) FROM {name}))"))
+        return report
+
+    def _insert(self, connection, table, rows):
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                connection.execute(insert(table), batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            connection.execute(insert(table), batch)
+            count += len(batch)
+        return count
+
+    def _created(self, rng):
+        return self.now - timedelta(minutes=rng.randrange(self.days * 24 * 60))
+
+    def _users(self, user_ids, password_hash):
+        now = self.now
+        for user_id in user_ids:
+            yield {'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+                   'password_hash': password_hash, 'first_name': f'First{user_id % 500}',
+                   'last_name': f'Last{user_id % 700}', 'created_at': now, 'updated_at': now,
+                   'is_admin': False, 'role': 'user', 'is_active': True}
+
+    def _projects(self, project_ids, owners, rng):
+        for project_id, owner_id in zip(project_ids, owners):
+            created = self._created(rng)
+            yield {'id': project_id, 'title': f'Project {project_id}',
+                   'description': f'Synthetic project {project_id}',
+                   'status': rng.choice(Project.VALID_STATUSES), 'priority': rng.choice(PRIORITIES),
+                   'due_date': created + timedelta(days=rng.randrange(30, 400)), 'owner_id': owner_id,
+                   'created_at': created, 'updated_at': created, 'features': []}
+
+    def _members(self, project_ids, user_ids, rng):
+        most = min(2 * self.members_per_project, len(user_ids))
+        for project_id in project_ids:
+            for user_id in rng.sample(user_ids, rng.randint(0, most)):
+                yield {'project_id': project_id, 'user_id': user_id, 'role': 'member'}
+
+    def _tasks(self, first_task, project_ids, project_sizes, owners, user_ids, assignee_weights, rng):
+        task_id = first_task
+        random_ = rng.random
+        for project_id, size, owner_id in zip(project_ids, project_sizes, owners):
+            if not size:
+                continue
+            created = self.now - timedelta(days=rng.randrange(self.days))
+            assignees = rng.choices(user_ids, cum_weights=assignee_weights, k=size)
+            # Tasks that can still take children, with their depth
+            parents = []
+            depths = {}
+            for assignee in assignees:
+                parent_id = None
+                if parents and random_() >= self.root_ratio:
+                    parent_id = parents[int(random_() * len(parents))]
+                depth = 0 if parent_id is None else depths[parent_id] + 1
+                if depth < self.max_depth:
+                    parents.append(task_id)
+                    depths[task_id] = depth
+                completed = random_() < self.completed_ratio
+                yield {'id': task_id, 'title': f'Task {task_id}', 'description': None,
+                       'status': 'completed' if completed else TASK_STATUSES[int(random_() * 3)],
+                       'priority': PRIORITIES[int(random_() * 3)], 'is_completed': completed,
+                       'due_date': created + timedelta(days=int(random_() * 120)) if random_() < 0.7 else None,
+                       'created_at': created, 'updated_at': created, 'project_id': project_id,
+                       'parent_id': parent_id,
+                       'assigned_to_id': assignee if random_() < self.assigned_ratio else None,
+                       'created_by_id': owner_id, 'notes': None}
+                task_id += 1
+
+    def _feedback(self, first_id, task_ids, user_ids, rng):
+        if not task_ids:
+            return
+        for feedback_id in range(first_id, first_id + int(len(task_ids) * self.feedback_per_task)):
+            yield {'id': feedback_id, 'task_id': rng.choice(task_ids), 'feedback_text': f'Feedback {feedback_id}',
+                   'feedback_date': self._created(rng), 'feedback_by_id': rng.choice(user_ids)}
+
+    def _submissions(self, first_id, task_ids, user_ids, rng):
+        if not task_ids:
+            return
+        for submission_id in range(first_id, first_id + int(len(task_ids) * self.submissions_per_task)):
+            yield {'id': submission_id, 'task_id': rng.choice(task_ids),
+                   'submission_text': f'Submission {submission_id}',
+                   'submission_url': f'https://example.com/submissions/{submission_id}',
+                   'submission_date': self._created(rng), 'submitted_by_id': rng.choice(user_ids)}
@@ -0,0 +1,113 @@
+# sqlite_tuning.py
+
+import random
+import sqlite3
+import time
+from sqlalchemy import event
+from models import db
+
+JOURNAL_MODES = ('delete', 'truncate', 'persist', 'memory', 'wal', 'off')
+SYNCHRONOUS_MODES = ('off', 'normal', 'full', 'extra')
+
+# Primary result codes; extended codes such as SQLITE_BUSY_SNAPSHOT share the low byte
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+
+def is_lock_error(error):
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xff in (SQLITE_BUSY, SQLITE_LOCKED)
+    return str(error).startswith(('database is locked', 'database table is locked'))
+
+
+def pragmas(config):
+    """PRAGMA statements run on every new SQLite connection, built from config."""
+    journal_mode = config['SQLITE_JOURNAL_MODE'].lower()
+    synchronous = config['SQLITE_SYNCHRONOUS'].lower()
+    if journal_mode not in JOURNAL_MODES:
+        raise ValueError(f'SQLITE_JOURNAL_MODE must be one of: {", ".join(JOURNAL_MODES)}')
+    if synchronous not in SYNCHRONOUS_MODES:
+        raise ValueError(f'SQLITE_SYNCHRONOUS must be one of: {", ".join(SYNCHRONOUS_MODES)}')
+
+    return [
+        f'PRAGMA journal_mode={journal_mode}',
+        f'PRAGMA busy_timeout={int(config["SQLITE_BUSY_TIMEOUT_MS"])}',
+        # NORMAL only fsyncs at checkpoints under WAL: a power cut can lose the
+        # last commits but never corrupts the database
+        f'PRAGMA synchronous={synchronous}',
+        f'PRAGMA mmap_size={int(config["SQLITE_MMAP_SIZE"])}',
+        # Negative sizes are in KiB rather than pages
+        f'PRAGMA cache_size={-int(config["SQLITE_CACHE_SIZE_KB"])}',
+    ]
+
+
+class LockRetry:
+    """Re-run a statement that failed because another process holds the write lock.
+
+    busy_timeout already makes SQLite wait for the lock; this covers the
+    writes still refused after it runs out, with jittered exponential backoff
+    so that competing workers do not retry in lockstep. Retrying a single
+    statement is safe: a busy error aborts the statement, not the
+    transaction, and pysqlite only opens a transaction right before the first
+    write, so a refused write never holds a stale read snapshot.
+    """
+
+    def __init__(self, retries=5, backoff=0.05, max_backoff=1.0, sleep=time.sleep):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.retried = 0
+
+    def delay(self, attempt):
+        return min(self.max_backoff, self.backoff * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+    def run(self, operation):
+        for attempt in range(self.retries + 1):
+            try:
+                return operation()
+            except sqlite3.OperationalError as e:
+                if attempt == self.retries or not is_lock_error(e):
+                    raise
+                self.retried += 1
+                self.sleep(self.delay(attempt))
+
+    def install(self, engine):
+        @event.listens_for(engine, 'do_execute')
+        def _execute(cursor, statement, parameters, context):
+            self.run(lambda: cursor.execute(statement, parameters))
+            return True
+
+        @event.listens_for(engine, 'do_executemany')
+        def _executemany(cursor, statement, parameters, context):
+            self.run(lambda: cursor.executemany(statement, parameters))
+            return True
+
+        @event.listens_for(engine, 'do_execute_no_params')
+        def _execute_no_params(cursor, statement, context):
+            self.run(lambda: cursor.execute(statement))
+            return True
+
+
+def tune_engine(engine, config):
+    statements = pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+    retry = LockRetry(retries=config['SQLITE_WRITE_RETRIES'], backoff=config['SQLITE_RETRY_BACKOFF'])
+    retry.install(engine)
+    return retry
+
+
+def init_sqlite(app):
+    """Apply the SQLite settings to every SQLite engine of the app. Does not connect."""
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                tune_engine(engine, app.config)
@@ -0,0 +1,87 @@
+import pytest
+from datetime import datetime
+from werkzeug.security import generate_password_hash
+from models import User, Project, Task, db
+import api
+
+@pytest.fixture
+def test_admin_user():
+    return User(username='admin', email='admin@example.com',
+                password_hash=generate_password_hash('password123'),
+                is_admin=True, role='admin')
+
+@pytest.fixture
+def test_project(test_admin_user):
+    return Project(title='API Project', description='Description', owner=test_admin_user,
+                   due_date=datetime(2025, 5, 1), features=['One'])
+
+def login(client):
+    client.post('/login', data={'username': 'admin', 'password': 'password123'})
+
+def test_api_project(client, app, test_admin_user, test_project):
+    """Test the project endpoint with all and with selected fields"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project])
+        db.session.commit()
+        login(client)
+
+        data = client.get(f'/api/projects/{test_project.id}').get_json()
+        assert data['title'] == 'API Project'
+        assert data['owner'] == 'admin'
+        assert data['due_date'] == '2025-05-01T00:00:00'
+        assert data['features'] == ['One']
+
+        data = client.get(f'/api/projects/{test_project.id}?fields=id,owner').get_json()
+        assert data == {'id': test_project.id, 'owner': 'admin'}
+
+def test_api_project_errors(client, app, test_admin_user, test_project):
+    """Test unknown fields and missing projects"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project])
+        db.session.commit()
+        login(client)
+
+        response = client.get(f'/api/projects/{test_project.id}?fields=id,password_hash')
+        assert response.status_code == 400
+        assert 'password_hash' in response.get_json()['error']
+        assert client.get(f'/api/projects/{test_project.id}?fields=,').status_code == 400
+        assert client.get(f'/api/projects/{test_project.id}/tasks?fields= , ').status_code == 400
+
+        assert client.get('/api/projects/999').status_code == 404
+        assert client.get('/api/projects/999/tasks').status_code == 404
+
+def test_api_project_requires_login(client, app, test_admin_user, test_project):
+    """Test that anonymous users are redirected"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project])
+        db.session.commit()
+
+        assert client.get(f'/api/projects/{test_project.id}').status_code == 302
+
+def test_api_project_tasks_streams_in_batches(client, app, test_admin_user, test_project, monkeypatch):
+    """Test the streamed task list across several fetch batches"""
+    monkeypatch.setattr(api, 'TASK_STREAM_BATCH', 3)
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project])
+        for i in range(7):
+            db.session.add(Task(title=f'Task {i}', project=test_project, created_by=test_admin_user,
+                                assigned_to=test_admin_user if i % 2 else None))
+        db.session.commit()
+        login(client)
+
+        response = client.get(f'/api/projects/{test_project.id}/tasks?fields=id,title,status,assigned_to')
+        assert response.status_code == 200
+        assert response.is_streamed
+        tasks = response.get_json()
+        assert [t['title'] for t in tasks] == [f'Task {i}' for i in range(7)]
+        assert tasks[1] == {'id': tasks[1]['id'], 'title': 'Task 1', 'status': 'open', 'assigned_to': 'admin'}
+        assert tasks[0]['assigned_to'] is None
+
+def test_api_project_tasks_empty(client, app, test_admin_user, test_project):
+    """Test that a project without tasks streams an empty list"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project])
+        db.session.commit()
+        login(client)
+
+        assert client.get(f'/api/projects/{test_project.id}/tasks').get_json() == []
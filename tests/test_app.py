@@ -0,0 +1,47 @@
+from app import create_app
+from config import TestingConfig
+from models import User, db
+from passwords import password_hasher
+
+def test_create_app_uses_given_config():
+    """Test that each call builds an independent app from the given config"""
+    first = create_app(TestingConfig)
+    second = create_app('config.TestingConfig')
+
+    assert first is not second
+    assert first.config['TESTING'] and second.config['TESTING']
+    assert 'login' in first.view_functions
+
+def test_create_app_does_not_connect(tmp_path):
+    """Test that building the app leaves the database untouched"""
+    database = tmp_path / 'app.db'
+
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{database}'
+
+    create_app(FileConfig)
+    # SQLite creates the file on first connect
+    assert not database.exists()
+
+def test_create_admin_command(app, runner):
+    """Test creating an admin from the CLI, including duplicate checks"""
+    result = runner.invoke(args=['create-admin', '--username', 'root', '--email', 'root@example.com'],
+                           input='secret123\nsecret123\n')
+    assert result.exit_code == 0, result.output
+    assert 'Admin account created successfully.' in result.output
+
+    user = User.query.filter_by(username='root').one()
+    assert user.is_admin and user.role == 'admin'
+    assert password_hasher.verify(user.password_hash, 'secret123')
+
+    result = runner.invoke(args=['create-admin', '--username', 'root', '--email', 'other@example.com',
+                                 '--password', 'secret123'])
+    assert result.exit_code != 0
+    assert 'Username already exists.' in result.output
+
+def test_create_admin_rejects_mismatched_passwords(app, runner):
+    """Test that the confirmation prompt must match"""
+    result = runner.invoke(args=['create-admin', '--username', 'root', '--email', 'root@example.com'],
+                           input='secret123\nsecret456\n')
+    assert result.exit_code != 0
+    assert User.query.count() == 0
@@ -0,0 +1,157 @@
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from cache import TTLCache
+from identity import identity_cache
+from models import User, db
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def test_user():
+    return User(username='user', email='user@example.com',
+                password_hash=generate_password_hash('password123'))
+
+@pytest.fixture
+def test_admin_user():
+    return User(username='admin', email='admin@example.com',
+                password_hash=generate_password_hash('password123'),
+                is_admin=True, role='admin')
+
+def fresh_request(app, client, method, url, **kwargs):
+    """Issue a request in its own app context, as a real server would, so g starts empty"""
+    with app.app_context():
+        return client.open(url, method=method, **kwargs)
+
+def test_ttl_cache_expiry_and_counters():
+    """Test that entries expire after the ttl and hits/misses are counted"""
+    timer = FakeTimer()
+    cache = TTLCache(maxsize=10, ttl=5, timer=timer)
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    timer.now = 6
+    assert cache.get('a') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+def test_ttl_cache_evicts_least_recently_used():
+    """Test that the cache stays within maxsize, evicting the oldest entry"""
+    cache = TTLCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert len(cache) == 2
+
+def test_user_loader_uses_identity_cache(client, test_user, app):
+    """Test that authenticated requests after the first are served from the cache"""
+    with app.app_context():
+        db.session.add(test_user)
+        db.session.commit()
+        client.post('/login', data={'username': 'user', 'password': 'password123'})
+
+        fresh_request(app, client, 'GET', '/projects')
+        fresh_request(app, client, 'GET', '/projects')
+        stats = identity_cache.stats()
+        assert stats['misses'] == 1
+        assert stats['hits'] >= 1
+
+def test_edit_profile_invalidates_identity(client, test_user, app):
+    """Test that profile edits are visible on the next request"""
+    with app.app_context():
+        db.session.add(test_user)
+        db.session.commit()
+        client.post('/login', data={'username': 'user', 'password': 'password123'})
+        fresh_request(app, client, 'GET', '/projects')
+
+        response = fresh_request(app, client, 'POST', '/profile/user/edit', json={
+            'email': 'changed@example.com',
+            'first_name': 'Changed',
+            'last_name': 'Name'
+        })
+        assert response.get_json()['success'] == True
+        assert identity_cache.get(test_user.id) is None
+
+        response = fresh_request(app, client, 'GET', '/profile/user')
+        assert b'changed@example.com' in response.data
+
+def test_edit_user_invalidates_identity(client, test_admin_user, test_user, app):
+    """Test that admin role changes drop the cached identity"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_user])
+        db.session.commit()
+        user_id = test_user.id
+
+        client.post('/login', data={'username': 'user', 'password': 'password123'})
+        fresh_request(app, client, 'GET', '/projects')
+        assert identity_cache.get(user_id) is not None
+
+        client.get('/logout')
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+        response = fresh_request(app, client, 'POST', '/admin/users/user/edit', json={
+            'username': 'user',
+            'email': 'user@example.com',
+            'role': 'admin',
+            'is_admin': True,
+            'is_active': False
+        })
+        assert response.get_json()['success'] == True
+        assert identity_cache.get(user_id) is None
+
+def test_identity_changed_by_another_worker(tmp_path, monkeypatch):
+    """Test that hits need no query and that another worker's change shows once the ttl runs out"""
+    from app import create_app
+    from config import TestingConfig
+
+    class SharedConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "shared.db"}'
+
+    serving, other = create_app(SharedConfig), create_app(SharedConfig)
+    timer = FakeTimer()
+    monkeypatch.setattr(identity_cache, 'timer', timer)
+    with other.app_context():
+        db.create_all()
+        db.session.add(User(username='admin', email='admin@example.com', is_admin=True, role='admin',
+                            password_hash=generate_password_hash('password123')))
+        db.session.commit()
+
+    client = serving.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'password123'})
+    assert fresh_request(serving, client, 'GET', '/admin/users').status_code == 200
+
+    statements = []
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    with serving.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        fresh_request(serving, client, 'GET', '/admin/jobs')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert not any('FROM users' in statement for statement in statements)
+
+    # The other worker demotes the user; this worker's cache keeps it until the ttl ends
+    with other.app_context():
+        db.session.get(User, 1).is_admin = False
+        db.session.commit()
+    assert fresh_request(serving, client, 'GET', '/admin/users').status_code == 200
+    timer.now += identity_cache.ttl + 1
+    assert fresh_request(serving, client, 'GET', '/admin/users').status_code == 302
+
+    with other.app_context():
+        db.session.delete(db.session.get(User, 1))
+        db.session.commit()
+    timer.now += identity_cache.ttl + 1
+    response = fresh_request(serving, client, 'GET', '/projects')
+    assert response.status_code == 302 and '/login' in response.location
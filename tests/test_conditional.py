@@ -0,0 +1,135 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from models import User, Project, Task, Feedback, db
+
+@pytest.fixture
+def test_admin_user():
+    return User(username='admin', email='admin@example.com',
+                password_hash=generate_password_hash('password123'),
+                is_admin=True, role='admin')
+
+@pytest.fixture
+def test_regular_user():
+    return User(username='user', email='user@example.com',
+                password_hash=generate_password_hash('password123'))
+
+@pytest.fixture
+def test_task(test_admin_user, test_regular_user):
+    project = Project(title='Project', description='Description', owner=test_admin_user)
+    return Task(title='Task', project=project, created_by=test_admin_user, assigned_to=test_regular_user)
+
+def login(client, username):
+    client.post('/login', data={'username': username, 'password': 'password123'})
+
+def test_view_project_revalidation(client, app, test_admin_user, test_regular_user, test_task):
+    """Test 304 on an unchanged project and a fresh page after a change"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_regular_user, test_task])
+        db.session.commit()
+        login(client, 'admin')
+        url = f'/projects/{test_task.project_id}'
+
+        response = client.get(url)
+        assert response.status_code == 200
+        etag = response.headers['ETag']
+        assert 'no-cache' in response.headers['Cache-Control']
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 304
+        assert response.data == b''
+
+        db.session.add(Task(title='Another', project_id=test_task.project_id, created_by=test_admin_user))
+        db.session.commit()
+
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert b'Another' in response.data
+
+def test_view_project_if_modified_since(client, app, test_admin_user, test_regular_user, test_task):
+    """Test that Last-Modified is honoured without an ETag"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_regular_user, test_task])
+        db.session.commit()
+        login(client, 'admin')
+        url = f'/projects/{test_task.project_id}'
+
+        last_modified = client.get(url).headers['Last-Modified']
+        response = client.get(url, headers={'If-Modified-Since': last_modified})
+        assert response.status_code == 304
+
+        response = client.get(url, headers={'If-Modified-Since': 'Thu, 01 Jan 1970 00:00:00 GMT'})
+        assert response.status_code == 200
+
+def test_view_project_missing(client, app, test_admin_user):
+    """Test that the validator path still 404s"""
+    with app.app_context():
+        db.session.add(test_admin_user)
+        db.session.commit()
+        login(client, 'admin')
+
+        assert client.get('/projects/999').status_code == 404
+
+def test_etag_differs_per_viewer(client, app, test_admin_user, test_regular_user, test_task):
+    """Test that one user's ETag never validates another user's page"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_regular_user, test_task])
+        db.session.commit()
+        url = f'/projects/{test_task.project_id}'
+
+        login(client, 'admin')
+        admin_etag = client.get(url).headers['ETag']
+        client.get('/logout')
+
+        login(client, 'user')
+        response = client.get(url, headers={'If-None-Match': admin_etag})
+        assert response.status_code == 200
+
+def test_task_detail_revalidation(client, app, test_admin_user, test_regular_user, test_task):
+    """Test 304 on task_detail until feedback is added"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_regular_user, test_task])
+        db.session.commit()
+        login(client, 'admin')
+        url = f'/tasks/{test_task.id}'
+
+        etag = client.get(url).headers['ETag']
+        assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+        db.session.add(Feedback(task_id=test_task.id, feedback_text='Nice', feedback_by_id=test_admin_user.id))
+        db.session.commit()
+        response = client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+        assert b'Nice' in response.data
+
+def test_task_detail_permission_checked_first(client, app, test_admin_user, test_regular_user, test_task):
+    """Test that a valid ETag does not bypass the permission check"""
+    with app.app_context():
+        outsider = User(username='outsider', email='outsider@example.com',
+                        password_hash=generate_password_hash('password123'))
+        db.session.add_all([test_admin_user, test_regular_user, test_task, outsider])
+        db.session.commit()
+
+        login(client, 'outsider')
+        response = client.get(f'/tasks/{test_task.id}', headers={'If-None-Match': '*'})
+        assert response.status_code == 302
+
+def test_profile_revalidation(client, app, test_admin_user, test_regular_user, test_task):
+    """Test 304 on the profile page until an assigned task changes"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_regular_user, test_task])
+        db.session.commit()
+        login(client, 'user')
+
+        # The pending login flash is shown here, so this response must not be cached
+        response = client.get('/profile/user')
+        assert b'Logged in successfully.' in response.data
+        assert 'ETag' not in response.headers
+
+        etag = client.get('/profile/user').headers['ETag']
+        assert client.get('/profile/user', headers={'If-None-Match': etag}).status_code == 304
+
+        test_task.title = 'Renamed'
+        db.session.commit()
+        response = client.get('/profile/user', headers={'If-None-Match': etag})
+        assert response.status_code == 200
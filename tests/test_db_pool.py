@@ -0,0 +1,105 @@
+import threading
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from werkzeug.security import generate_password_hash
+from db_pool import InstrumentedQueuePool, engine_options, pool_report
+from models import User, db
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "pool.db"}', poolclass=InstrumentedQueuePool,
+                           pool_size=1, max_overflow=0, pool_timeout=0.2)
+    yield engine
+    engine.dispose()
+
+def test_engine_options_from_environment():
+    """Test pool settings parsed from DB_* variables, and none for SQLite"""
+    options = engine_options('postgresql://db/app', {
+        'DB_POOL_SIZE': '8', 'DB_MAX_OVERFLOW': '0', 'DB_POOL_PRE_PING': 'false',
+        'DB_STATEMENT_TIMEOUT_MS': '5000',
+    })
+    assert options['poolclass'] is InstrumentedQueuePool
+    assert options['pool_size'] == 8
+    assert options['max_overflow'] == 0
+    assert options['pool_pre_ping'] is False
+    assert options['pool_recycle'] == 1800
+    assert options['connect_args'] == {'options': '-c statement_timeout=5000'}
+
+    assert 'connect_args' not in engine_options('postgresql://db/app', {'DB_STATEMENT_TIMEOUT_MS': '0'})
+    assert engine_options('sqlite:///app.db', {}) == {}
+    assert engine_options(None, {}) == {}
+
+def test_checkouts_are_counted_and_timed(engine):
+    """Test checkout, checkin and connect counters and latency figures"""
+    for _ in range(3):
+        with engine.connect() as connection:
+            connection.execute(text('SELECT 1'))
+
+    stats = engine.pool.stats.to_dict()
+    assert stats['checkouts'] == 3
+    assert stats['checkins'] == 3
+    assert stats['connects'] == 1
+    assert stats['waits'] == 0
+    assert stats['checkout_ms_p50'] is not None
+    assert stats['checkout_ms_max'] >= stats['checkout_ms_p50']
+
+def test_waits_and_timeouts(engine):
+    """Test that exhausting the pool records waits and timeouts"""
+    held = engine.connect()
+    with pytest.raises(PoolTimeout):
+        engine.connect()
+    assert engine.pool.stats.timeouts == 1
+
+    released = threading.Timer(0.05, held.close)
+    released.start()
+    with engine.connect():
+        pass
+    released.join()
+
+    stats = engine.pool.stats.to_dict()
+    assert stats['waits'] == 1
+    assert stats['wait_ms_total'] > 0
+
+def test_invalidation_and_dispose(engine):
+    """Test invalidation counts and that stats survive dispose without double counting"""
+    with engine.connect() as connection:
+        connection.invalidate()
+    stats = engine.pool.stats
+    assert stats.invalidations == 1
+
+    engine.dispose()
+    assert engine.pool.stats is stats
+    with engine.connect():
+        pass
+    assert stats.checkouts == 2
+    assert stats.connects == 2
+
+def test_pool_report(engine):
+    """Test the per-engine report"""
+    with engine.connect():
+        report = pool_report({None: engine})
+    entry = report['engines']['default']
+    assert entry['pool'] == 'InstrumentedQueuePool'
+    assert entry['checked_out'] == 1
+    assert entry['stats']['checkouts'] == 1
+
+def test_admin_pool_endpoint(client, app):
+    """Test that only admins can read pool telemetry"""
+    with app.app_context():
+        db.session.add_all([
+            User(username='admin', email='admin@example.com', is_admin=True, role='admin',
+                 password_hash=generate_password_hash('password123')),
+            User(username='user', email='user@example.com',
+                 password_hash=generate_password_hash('password123')),
+        ])
+        db.session.commit()
+
+        client.post('/login', data={'username': 'user', 'password': 'password123'})
+        assert client.get('/admin/db/pool').status_code == 403
+        client.get('/logout')
+
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+        data = client.get('/admin/db/pool').get_json()
+        assert 'default' in data['engines']
+        assert data['pid'] > 0
@@ -0,0 +1,198 @@
+import time
+from datetime import timedelta
+import pytest
+from werkzeug.security import generate_password_hash
+from app import create_app
+from config import TestingConfig
+from jobs import JobContext, LeaseLost, job_runner, utcnow
+from models import Job, Project, Task, User, db
+import user_jobs
+
+calls = []
+
+@job_runner.task('test_sum')
+def sum_job(context, numbers):
+    total = 0
+    for i, number in enumerate(numbers, start=1):
+        total += number
+        context.progress(i, len(numbers), f'Added {number}')
+    return {'total': total}
+
+@job_runner.task('test_flaky')
+def flaky_job(context, fail_times):
+    calls.append(1)
+    if len(calls) <= fail_times:
+        raise RuntimeError('temporary failure')
+    return 'ok'
+
+@pytest.fixture
+def admin(app):
+    user = User(username='admin', email='admin@example.com',
+                password_hash=generate_password_hash('password123'), is_admin=True, role='admin')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def test_job_runs_and_reports_progress(app):
+    """Test that a queued job runs, records its progress and stores its result"""
+    job = job_runner.enqueue('test_sum', {'numbers': [1, 2, 3]})
+    db.session.commit()
+    assert job.status == 'queued'
+
+    assert job_runner.run_pending() == 1
+    db.session.refresh(job)
+    assert job.status == 'succeeded' and job.result == {'total': 6}
+    assert (job.progress_done, job.progress_total, job.message) == (3, 3, 'Added 3')
+    assert job.attempts == 1 and job.lease_owner is None and job.finished_at is not None
+    assert job_runner.run_pending() == 0
+
+def test_failed_jobs_are_retried_then_given_up(app):
+    """Test exponential backoff between attempts and failure after max_attempts"""
+    calls.clear()
+    job = job_runner.enqueue('test_flaky', {'fail_times': 5}, max_attempts=2)
+    db.session.commit()
+
+    job_runner.run_pending()
+    db.session.refresh(job)
+    assert job.status == 'queued' and job.attempts == 1 and 'temporary failure' in job.error
+    assert job.run_after > utcnow() + timedelta(seconds=job_runner.backoff - 5)
+    assert job_runner.run_pending() == 0
+
+    job.run_after = utcnow()
+    db.session.commit()
+    job_runner.run_pending()
+    db.session.refresh(job)
+    assert job.status == 'failed' and job.attempts == 2 and len(calls) == 2
+
+def test_claims_are_exclusive_until_the_lease_expires(app):
+    """Test that a leased job is not claimed twice and that an expired lease is taken over"""
+    job = job_runner.enqueue('test_sum', {'numbers': [1]})
+    db.session.commit()
+
+    first, ids = job_runner.claim(5)
+    assert ids == [job.id]
+    assert job_runner.claim(5)[1] == []
+
+    # The first runner dies; once its lease runs out another takes the job over
+    db.session.execute(db.update(Job).values(lease_expires_at=utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+    second, ids = job_runner.claim(5)
+    assert ids == [job.id] and second != first
+
+    # The first runner wakes up: it can neither report progress nor finish the job
+    with pytest.raises(LeaseLost):
+        JobContext(job_runner, job.id, first).progress(1)
+    job_runner.execute(job.id, first)
+    db.session.refresh(job)
+    assert job.status == 'running' and job.lease_owner == second
+
+    job_runner.execute(job.id, second)
+    db.session.refresh(job)
+    assert job.status == 'succeeded' and job.attempts == 2
+
+def test_abandoned_import_removes_its_upload(app, tmp_path):
+    """Test that a job given up on after its runner died still runs its cleanup"""
+    upload = tmp_path / 'users.upload'
+    upload.write_text('email\nann@example.com\n')
+    job = job_runner.enqueue('import_users', {'path': str(upload), 'default_password_hash': 'x'},
+                             max_attempts=1)
+    db.session.commit()
+
+    # Claimed by a runner that dies before running it
+    job_runner.claim(1)
+    db.session.execute(db.update(Job).values(lease_expires_at=utcnow() - timedelta(seconds=1)))
+    db.session.commit()
+
+    assert job_runner.run_pending() == 1
+    db.session.refresh(job)
+    assert job.status == 'failed' and 'Gave up' in job.error
+    assert not upload.exists()
+    assert User.query.count() == 0
+
+def test_unknown_kind_is_rejected(app):
+    """Test that only registered job kinds can be queued"""
+    with pytest.raises(ValueError, match='Unknown job kind'):
+        job_runner.enqueue('no_such_job')
+
+def test_delete_user_job_reassigns_in_batches(app, admin, monkeypatch):
+    """Test the delete_user job on a user with more tasks than one batch"""
+    monkeypatch.setattr(user_jobs, 'REASSIGN_BATCH_SIZE', 2)
+    leaving = User(username='leaving', email='leaving@example.com', password_hash='x')
+    project = Project(title='Project', owner=admin)
+    project.members.append(leaving)
+    db.session.add_all([leaving, project])
+    db.session.flush()
+    for i in range(5):
+        db.session.add(Task(title=f'Task {i}', project=project, assigned_to=leaving,
+                            created_by=leaving if i % 2 else admin))
+    db.session.commit()
+
+    job = job_runner.enqueue('delete_user', {'user_id': leaving.id, 'reassign_to': admin.id})
+    db.session.commit()
+    job_runner.run_pending()
+
+    db.session.refresh(job)
+    assert job.status == 'succeeded' and job.result == {'deleted': True, 'username': 'leaving'}
+    assert (job.progress_done, job.progress_total) == (7, 5)
+    assert User.query.filter_by(username='leaving').first() is None
+    assert Task.query.filter(Task.assigned_to_id.is_not(None)).count() == 0
+    assert Task.query.filter_by(created_by_id=admin.id).count() == 5
+
+    job = job_runner.enqueue('delete_user', {'user_id': 999, 'reassign_to': admin.id})
+    db.session.commit()
+    job_runner.run_pending()
+    db.session.refresh(job)
+    assert job.result == {'deleted': False}
+
+def test_admin_jobs_pages(client, app, admin):
+    """Test the jobs page and the status endpoint, for admins only"""
+    job = job_runner.enqueue('test_sum', {'numbers': [4]}, created_by=admin.id)
+    db.session.commit()
+    job_id = job.id
+
+    assert client.get('/admin/jobs').status_code == 302
+    client.post('/login', data={'username': 'admin', 'password': 'password123'})
+    response = client.get('/admin/jobs')
+    assert response.status_code == 200
+    assert b'test_sum' in response.data and b'flask jobs run' in response.data
+
+    data = client.get(f'/admin/jobs/{job_id}').get_json()
+    assert data['job']['status'] == 'queued'
+    assert client.get('/admin/jobs/999').status_code == 404
+
+def test_background_runner(tmp_path):
+    """Test that the runner started by the first request picks up jobs committed afterwards"""
+    class JobConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "jobs.db"}'
+        JOB_WORKERS = 2
+        JOB_POLL_INTERVAL = 30
+
+    app = create_app(JobConfig)
+    with app.app_context():
+        db.create_all()
+    app.test_client().get('/login')
+    try:
+        with app.app_context():
+            for i in range(3):
+                job_runner.enqueue('test_sum', {'numbers': [i, i]})
+            db.session.commit()
+
+        # The commit wakes the runner; the poll interval alone would take 30 seconds
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            with app.app_context():
+                if Job.query.filter_by(status='succeeded').count() == 3:
+                    break
+            time.sleep(0.05)
+    finally:
+        job_runner.stop(timeout=5)
+    with app.app_context():
+        assert sorted(job.result['total'] for job in Job.query) == [0, 2, 4]
+
+def test_jobs_command(app, runner):
+    """Test flask jobs run"""
+    job_runner.enqueue('test_sum', {'numbers': [1, 1]})
+    db.session.commit()
+    result = runner.invoke(args=['jobs', 'run'])
+    assert 'Ran 1 jobs.' in result.output
+    assert Job.query.one().status == 'succeeded'
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+from prometheus_client import REGISTRY
+from werkzeug.security import generate_password_hash
+from models import User, db
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+def test_request_latency_and_status(client, app):
+    """Test per-route histograms and status counters"""
+    ok = sample('http_request_duration_seconds_count', endpoint='login', method='GET', status='200')
+    missing = sample('http_request_duration_seconds_count', endpoint='unmatched', method='GET', status='404')
+
+    client.get('/login')
+    client.get('/login')
+    client.get('/no-such-page')
+
+    assert sample('http_request_duration_seconds_count', endpoint='login', method='GET', status='200') == ok + 2
+    assert sample('http_request_duration_seconds_count', endpoint='unmatched', method='GET', status='404') == missing + 1
+    assert sample('http_requests_in_progress') == 0
+
+def test_template_pool_and_cache_metrics(client, app):
+    """Test template render time, pool gauges and cache lookups"""
+    with app.app_context():
+        db.session.add(User(username='user', email='user@example.com',
+                            password_hash=generate_password_hash('password123')))
+        db.session.commit()
+    renders = sample('template_render_seconds_count', template='login.html')
+    checkouts = sample('db_pool_events_total', event='checkout')
+    hits = sample('cache_lookups_total', cache='render', result='hit')
+    misses = sample('cache_lookups_total', cache='render', result='miss')
+
+    client.get('/login')
+    client.post('/login', data={'username': 'user', 'password': 'password123'})
+    client.get('/')
+    client.get('/')
+
+    assert sample('template_render_seconds_count', template='login.html') == renders + 1
+    assert sample('db_pool_events_total', event='checkout') > checkouts
+    assert sample('cache_lookups_total', cache='render', result='miss') == misses + 1
+    assert sample('cache_lookups_total', cache='render', result='hit') == hits + 1
+
+def test_metrics_endpoint(client, app):
+    """Test the text exposition and the optional bearer token"""
+    client.get('/login')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    assert b'http_request_duration_seconds_bucket{endpoint="login"' in response.data
+
+    app.config['METRICS_TOKEN'] = 'secret'
+    assert client.get('/metrics').status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+
+def test_metrics_closed_to_other_hosts_without_token(client, app):
+    """Test that without a token only direct local scrapes are answered, unless METRICS_PUBLIC is set"""
+    remote = {'REMOTE_ADDR': '203.0.113.7'}
+    assert client.get('/metrics', environ_base=remote).status_code == 403
+    assert client.get('/metrics', headers={'X-Forwarded-For': '203.0.113.7'}).status_code == 403
+    assert client.get('/metrics', environ_base={'REMOTE_ADDR': '::1'}).status_code == 200
+
+    app.config['METRICS_PUBLIC'] = True
+    assert client.get('/metrics', environ_base=remote).status_code == 200
+
+def test_workers_aggregate_through_shared_directory(tmp_path):
+    """Test that samples written by separate processes are summed in one scrape"""
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    record = ("from metrics import REQUEST_LATENCY, IN_PROGRESS\n"
+              "REQUEST_LATENCY.labels('view_project', 'GET', '200').observe(0.01)\n"
+              "IN_PROGRESS.inc()\n")
+    for _ in range(2):
+        subprocess.run([sys.executable, '-c', record], env=env, check=True)
+
+    scrape = subprocess.run([sys.executable, '-c', 'from metrics import render_metrics\n'
+                             'print(render_metrics().decode())'],
+                            env=env, check=True, capture_output=True, text=True).stdout
+    assert 'http_request_duration_seconds_count{endpoint="view_project",method="GET",status="200"} 2.0' in scrape
@@ -0,0 +1,114 @@
+import pytest
+import migrate
+from models import db
+
+@pytest.fixture
+def empty_db(app):
+    # conftest builds the schema with create_all(); start these tests from nothing
+    db.drop_all()
+    db.session.execute(db.text('DROP TABLE IF EXISTS schema_migrations'))
+    db.session.commit()
+    yield db.engine
+
+def schema(engine):
+    # Read sqlite_master directly: the connection outlives each test's tables, and
+    # cached PRAGMA index_list statements can go stale across drop/create cycles
+    with engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            "SELECT type, tbl_name, name, sql FROM sqlite_master "
+            "WHERE name != 'schema_migrations' AND tbl_name NOT LIKE 'search_index_%'").all()
+    tables = {tbl_name: [] for type_, tbl_name, name, sql in rows if type_ == 'table'}
+    for type_, tbl_name, name, sql in rows:
+        if type_ == 'index' and sql:
+            tables[tbl_name].append((name, sql[sql.index('('):]))
+    return {table: sorted(indexes) for table, indexes in tables.items()}
+
+def test_upgrade_matches_models(app, empty_db):
+    """Test that migrating an empty database gives the schema create_all() builds"""
+    applied = migrate.upgrade(empty_db)
+    assert [m.version for m in applied] == [m.version for m in migrate.discover()]
+    migrated = schema(empty_db)
+
+    db.drop_all()
+    db.create_all()
+    assert migrated == schema(empty_db)
+
+def test_access_path_indexes(app, empty_db):
+    """Test that the composite indexes exist after upgrading"""
+    migrate.upgrade(empty_db)
+    indexes = schema(empty_db)
+    assert ('ix_tasks_project_id_parent_id', '(project_id, parent_id)') in indexes['tasks']
+    assert ('ix_tasks_assigned_to_id_due_date', '(assigned_to_id, due_date)') in indexes['tasks']
+    assert ('ix_feedback_task_id_feedback_date', '(task_id, feedback_date)') in indexes['feedback']
+    assert ('ix_submissions_task_id_submission_date', '(task_id, submission_date)') in indexes['submissions']
+    assert ('ix_project_users_user_id_project_id', '(user_id, project_id)') in indexes['project_users']
+    assert ('ix_tasks_due_date', '(due_date)') in indexes['tasks']
+    assert ('ix_outbox_status_next_attempt_at', '(status, next_attempt_at)') in indexes['outbox']
+    assert ('ix_jobs_status_run_after', '(status, run_after)') in indexes['jobs']
+
+def test_downgrade_is_reversible(app, empty_db):
+    """Test stepping down and back up, and reverting everything"""
+    migrate.upgrade(empty_db)
+    head = migrate.current_version(empty_db)
+    full = schema(empty_db)
+
+    reverted = migrate.downgrade(empty_db, head - 1)
+    assert [m.version for m in reverted] == [head]
+    assert migrate.current_version(empty_db) == head - 1
+    assert 'jobs' not in schema(empty_db)
+
+    migrate.upgrade(empty_db)
+    assert schema(empty_db) == full
+
+    migrate.downgrade(empty_db, 0)
+    assert migrate.current_version(empty_db) == 0
+    assert schema(empty_db) == {}
+
+def test_upgrade_to_target_and_unknown_version(app, empty_db):
+    """Test partial upgrades and rejection of versions that do not exist"""
+    assert [m.version for m in migrate.upgrade(empty_db, 1)] == [1]
+    assert 'ix_projects_due_date' not in dict(schema(empty_db)['projects'])
+    assert migrate.upgrade(empty_db, 1) == []
+
+    with pytest.raises(migrate.MigrationError):
+        migrate.upgrade(empty_db, 999)
+
+def test_existing_database_can_be_stamped(app):
+    """Test adopting a database made by create_all() and upgrading it without errors"""
+    migrate.stamp(db.engine, 1)
+    assert migrate.current_version(db.engine) == 1
+    migrate.upgrade(db.engine)
+    assert migrate.current_version(db.engine) == migrate.discover()[-1].version
+
+def test_db_cli(app, runner, empty_db):
+    """Test the flask db commands"""
+    result = runner.invoke(args=['db', 'upgrade'])
+    assert 'Applied 0004 access_path_indexes' in result.output
+
+    result = runner.invoke(args=['db', 'history'])
+    assert '* 0001 initial_schema' in result.output
+
+    result = runner.invoke(args=['db', 'downgrade'])
+    assert 'Reverted 0006 jobs' in result.output
+    assert runner.invoke(args=['db', 'current']).output.strip() == '5'
+
+    result = runner.invoke(args=['db', 'upgrade', '--to', '42'])
+    assert result.exit_code != 0
+    assert 'Unknown migration version 42' in result.output
+
+def test_failed_migration_leaves_no_schema_change(app, empty_db, monkeypatch):
+    """Test that DDL run before a migration fails is rolled back with it, search index included"""
+    migrate.upgrade(empty_db, 2)
+    search_migration = next(m for m in migrate.discover() if m.version == 3).module
+    create = search_migration.upgrade
+
+    def upgrade_then_fail(connection):
+        create(connection)
+        raise RuntimeError('interrupted')
+
+    monkeypatch.setattr(search_migration, 'upgrade', upgrade_then_fail)
+    before = schema(empty_db)
+    with pytest.raises(RuntimeError):
+        migrate.upgrade(empty_db, 3)
+    assert migrate.current_version(empty_db) == 2
+    assert schema(empty_db) == before
@@ -0,0 +1,242 @@
+import socketserver
+import threading
+import time
+from datetime import date, datetime, timedelta
+from email import message_from_bytes
+import pytest
+from werkzeug.security import generate_password_hash
+from app import create_app
+from config import TestingConfig
+from models import OutboxMessage, Project, Task, User, db
+from outbox import outbox, utcnow
+
+class SMTPStub(socketserver.StreamRequestHandler):
+    """Just enough of an SMTP server for smtplib: accepts mail, refuses server.refused addresses."""
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 stub')
+        while line := self.rfile.readline():
+            command = line.decode().strip()
+            verb = command[:4].upper()
+            if verb == 'RCPT':
+                address = command.split(':', 1)[1].strip(' <>')
+                self.reply('550 no such user' if address in self.server.refused else '250 OK')
+            elif verb == 'DATA':
+                self.reply('354 go ahead')
+                data = b''.join(iter(lambda: self.rfile.readline(), b'.\r\n'))
+                self.server.messages.append(message_from_bytes(data))
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 bye')
+                return
+            else:
+                self.reply('250 OK')
+
+@pytest.fixture
+def smtp():
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPStub)
+    server.daemon_threads = True
+    server.messages = []
+    server.refused = set()
+    server.connections = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def mail_config(smtp, **settings):
+    class MailConfig(TestingConfig):
+        MAIL_SERVER = '127.0.0.1'
+        MAIL_PORT = smtp.server_address[1]
+        MAIL_SENDER = 'projects@example.com'
+        MAIL_BATCH_SIZE = 3
+        MAIL_RETRY_BACKOFF = 30
+
+    for key, value in settings.items():
+        setattr(MailConfig, key, value)
+    return MailConfig
+
+@pytest.fixture
+def mail_app(smtp):
+    app = create_app(mail_config(smtp))
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def add_tasks(due_dates):
+    owner = User(username='owner', email='owner@example.com', password_hash='x')
+    other = User(username='other', email='other@example.com', password_hash='x')
+    project = Project(title='Launch', owner=owner)
+    db.session.add_all([owner, other, project])
+    db.session.flush()
+    for i, (due, assignee, completed) in enumerate(due_dates):
+        db.session.add(Task(title=f'Task {i}', project=project, due_date=due, is_completed=completed,
+                            assigned_to=owner if assignee == 'owner' else other if assignee else None,
+                            created_by=owner))
+    db.session.commit()
+
+def test_messages_are_sent_in_batches(mail_app, smtp):
+    """Test that due messages go out over one connection per batch and are marked sent"""
+    for i in range(5):
+        outbox.enqueue(f'user{i}@example.com', f'Hello {i}', 'Body')
+    db.session.commit()
+
+    first = outbox.deliver()
+    assert first.to_dict() == {'sent': 3, 'retried': 0, 'failed': 0}
+    assert smtp.connections == 1
+    assert outbox.deliver_all().sent == 2
+    assert smtp.connections == 2
+    assert [m['Subject'] for m in smtp.messages] == [f'Hello {i}' for i in range(5)]
+    assert smtp.messages[0]['From'] == 'projects@example.com'
+    assert db.session.query(OutboxMessage).filter_by(status='sent').count() == 5
+    assert not outbox.deliver()
+
+def test_failures_are_retried_with_backoff(mail_app, smtp):
+    """Test that an unreachable server reschedules, and a refused recipient fails at once"""
+    outbox.enqueue('someone@example.com', 'Retry me', 'Body')
+    outbox.enqueue('nobody@example.com', 'Refused', 'Body')
+    db.session.commit()
+    smtp.refused.add('nobody@example.com')
+    outbox.port = 1  # nothing listens here
+
+    report = outbox.deliver()
+    assert report.to_dict() == {'sent': 0, 'retried': 2, 'failed': 0}
+    message = db.session.query(OutboxMessage).filter_by(subject='Retry me').one()
+    assert message.attempts == 1 and message.status == 'pending' and message.claimed_by is None
+    assert message.next_attempt_at > utcnow() + timedelta(seconds=25)
+    assert not outbox.deliver()
+
+    db.session.query(OutboxMessage).update({'next_attempt_at': datetime(2000, 1, 1)})
+    db.session.commit()
+    outbox.port = smtp.server_address[1]
+    assert outbox.deliver().to_dict() == {'sent': 1, 'retried': 0, 'failed': 1}
+    refused = db.session.query(OutboxMessage).filter_by(subject='Refused').one()
+    assert refused.status == 'failed' and '550' in refused.last_error
+
+def test_gives_up_after_max_attempts(mail_app):
+    """Test that a message stops being retried after MAIL_MAX_ATTEMPTS"""
+    outbox.port = 1
+    outbox.enqueue('someone@example.com', 'Never', 'Body')
+    db.session.commit()
+    for _ in range(outbox.max_attempts):
+        db.session.query(OutboxMessage).update({'next_attempt_at': datetime(2000, 1, 1)})
+        db.session.commit()
+        report = outbox.deliver()
+    assert report.failed == 1
+    assert db.session.query(OutboxMessage).one().status == 'failed'
+
+def test_claimed_messages_are_not_sent_twice(mail_app, smtp):
+    """Test that a batch leased by one sender is skipped by another until the lease ends"""
+    outbox.enqueue('someone@example.com', 'Once', 'Body')
+    db.session.commit()
+    now = utcnow()
+    assert len(outbox._claim(now)) == 1
+    assert outbox._claim(now) == []
+    assert len(outbox._claim(now + timedelta(seconds=outbox.lease + 1))) == 1
+
+def test_sweep_queues_reminders_once_and_sends_a_digest(mail_app, smtp):
+    """Test the due-date sweep, its deduplication and one digest per assignee"""
+    today = date(2026, 3, 9)
+    tomorrow = datetime(2026, 3, 10, 17, 0)
+    add_tasks([
+        (tomorrow, 'owner', False),
+        (tomorrow.replace(hour=9), 'owner', False),
+        (tomorrow, 'other', False),
+        (tomorrow, 'owner', True),              # completed
+        (tomorrow, None, False),                # nobody to remind
+        (datetime(2026, 3, 11, 9), 'owner', False),  # due the day after
+    ])
+
+    assert outbox.sweep(today) == 3
+    assert outbox.sweep(today) == 0
+
+    assert outbox.deliver().sent == 3
+    digests = {m['To']: m for m in smtp.messages}
+    assert set(digests) == {'owner@example.com', 'other@example.com'}
+    assert digests['owner@example.com']['Subject'] == '2 tasks due soon'
+    body = digests['owner@example.com'].get_payload()
+    assert 'Task 0 (Launch), due 2026-03-10' in body and 'Task 1' in body and 'Task 5' not in body
+    assert digests['other@example.com']['Subject'] == '1 task due soon'
+
+def test_quick_add_user_queues_an_invite(mail_app, smtp):
+    """Test that creating a user queues their credentials, delivered without the password kept"""
+    db.session.add(User(username='admin', email='admin@example.com',
+                        password_hash=generate_password_hash('password123'), is_admin=True, role='admin'))
+    db.session.commit()
+    client = mail_app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'password123'})
+    client.post('/admin/users/quick-add', data={'email': 'new@example.com', 'password': 'welcome1'})
+
+    assert smtp.messages == []
+    message = db.session.query(OutboxMessage).one()
+    assert message.kind == 'invite' and 'welcome1' in message.body
+
+    outbox.deliver()
+    assert smtp.messages[0]['To'] == 'new@example.com'
+    assert 'Password: welcome1' in smtp.messages[0].get_payload()
+    db.session.refresh(message)
+    assert message.body == ''
+
+def test_undeliverable_invites_drop_the_password(mail_app, smtp):
+    """Test that invites given up on, whether refused or out of attempts, keep no password"""
+    smtp.refused.add('refused@example.com')
+    outbox.enqueue('refused@example.com', 'Your account', 'Password: welcome1', kind='invite')
+    db.session.commit()
+    outbox.deliver()
+
+    outbox.port = 1
+    outbox.enqueue('unreachable@example.com', 'Your account', 'Password: welcome2', kind='invite')
+    db.session.commit()
+    for _ in range(outbox.max_attempts):
+        db.session.query(OutboxMessage).update({'next_attempt_at': datetime(2000, 1, 1)})
+        db.session.commit()
+        outbox.deliver()
+
+    messages = db.session.query(OutboxMessage).all()
+    assert [(m.status, m.body) for m in messages] == [('failed', ''), ('failed', '')]
+
+def test_mail_disabled_without_server(client, app):
+    """Test that nothing is queued when MAIL_SERVER is unset"""
+    db.session.add(User(username='admin', email='admin@example.com',
+                        password_hash=generate_password_hash('password123'), is_admin=True, role='admin'))
+    db.session.commit()
+    client.post('/login', data={'username': 'admin', 'password': 'password123'})
+    client.post('/admin/users/quick-add', data={'email': 'new@example.com'})
+    assert User.query.filter_by(email='new@example.com').one()
+    assert db.session.query(OutboxMessage).count() == 0
+
+def test_background_sender(smtp, tmp_path):
+    """Test that the sender thread, started by the first request, sweeps and delivers"""
+    app = create_app(mail_config(smtp, SQLALCHEMY_DATABASE_URI=f'sqlite:///{tmp_path / "mail.db"}',
+                                 MAIL_SEND_INTERVAL=0.05))
+    with app.app_context():
+        db.create_all()
+        add_tasks([(datetime.combine(date.today() + timedelta(days=1), datetime.min.time()), 'owner', False)])
+        outbox.enqueue('someone@example.com', 'Queued', 'Body')
+        db.session.commit()
+
+    app.test_client().get('/login')
+    try:
+        deadline = time.monotonic() + 5
+        while len(smtp.messages) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        outbox.stop(timeout=5)
+    assert sorted(m['Subject'] for m in smtp.messages) == ['1 task due soon', 'Queued']
+
+def test_mail_commands(mail_app, smtp):
+    """Test flask mail sweep and flask mail send"""
+    runner = mail_app.test_cli_runner()
+    add_tasks([(datetime(2026, 3, 10, 12), 'owner', False)])
+    result = runner.invoke(args=['mail', 'sweep', '--date', '2026-03-09'])
+    assert 'Queued 1 reminders.' in result.output
+    result = runner.invoke(args=['mail', 'send'])
+    assert 'Sent 1, retrying 0, failed 0.' in result.output
+    assert len(smtp.messages) == 1
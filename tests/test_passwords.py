@@ -0,0 +1,97 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from models import User, db
+from passwords import PasswordHasher, password_hasher
+
+@pytest.fixture
+def pbkdf2_policy():
+    """Switch the app-wide policy to a cheap pbkdf2 cost for one test"""
+    previous = password_hasher.method
+    password_hasher.method = 'pbkdf2:sha256:1000'
+    yield password_hasher
+    password_hasher.method = previous
+
+def test_hash_and_verify():
+    """Test hashing under a policy and verifying the result"""
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000')
+    password_hash = hasher.hash('secret')
+
+    assert password_hash.startswith('pbkdf2:sha256:1000$')
+    assert hasher.verify(password_hash, 'secret')
+    assert not hasher.verify(password_hash, 'wrong')
+
+def test_needs_rehash():
+    """Test that hashes from another method or cost are flagged"""
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000')
+
+    assert not hasher.needs_rehash(generate_password_hash('x', method='pbkdf2:sha256:1000'))
+    assert hasher.needs_rehash(generate_password_hash('x', method='pbkdf2:sha256:2000'))
+    assert hasher.needs_rehash(generate_password_hash('x', method='scrypt'))
+
+def test_verify_in_worker_pool():
+    """Test verification through the bounded thread pool"""
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=2)
+    password_hash = hasher.hash('secret')
+
+    assert hasher.verify(password_hash, 'secret')
+    assert not hasher.verify(password_hash, 'wrong')
+
+def test_verify_times_out_when_pool_is_busy():
+    """Test that waiting longer than the timeout for a hashing thread raises TimeoutError"""
+    hasher = PasswordHasher(method='pbkdf2:sha256:1000', workers=1, timeout=0.001)
+    slow_hash = generate_password_hash('secret', method='pbkdf2:sha256:300000')
+
+    with pytest.raises(TimeoutError):
+        hasher.verify(slow_hash, 'secret')
+
+def test_login_upgrades_outdated_hash(client, app, pbkdf2_policy):
+    """Test that logging in rewrites a hash made under an older policy"""
+    with app.app_context():
+        user = User(username='user', email='user@example.com',
+                    password_hash=generate_password_hash('password123', method='pbkdf2:sha256:500'))
+        db.session.add(user)
+        db.session.commit()
+
+        response = client.post('/login', data={'username': 'user', 'password': 'password123'})
+        assert response.status_code == 302
+
+        user = db.session.get(User, user.id)
+        assert user.password_hash.startswith('pbkdf2:sha256:1000$')
+        assert password_hasher.verify(user.password_hash, 'password123')
+
+def test_login_when_hashing_times_out(client, app, monkeypatch):
+    """Test that a verification timeout asks the user to retry instead of failing with a 500"""
+    def busy(password_hash, password):
+        raise TimeoutError
+
+    with app.app_context():
+        db.session.add(User(username='user', email='user@example.com',
+                            password_hash=generate_password_hash('password123')))
+        db.session.commit()
+    monkeypatch.setattr(password_hasher, 'verify', busy)
+
+    response = client.post('/login', data={'username': 'user', 'password': 'password123'})
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+    assert b'try again in a few seconds' in response.data
+
+def test_change_password_when_hashing_times_out(client, app, monkeypatch):
+    """Test that a password change during a login burst asks the user to retry and changes nothing"""
+    with app.app_context():
+        db.session.add(User(username='user', email='user@example.com',
+                            password_hash=generate_password_hash('password123')))
+        db.session.commit()
+    client.post('/login', data={'username': 'user', 'password': 'password123'})
+
+    def busy(password_hash, password):
+        raise TimeoutError
+    monkeypatch.setattr(password_hasher, 'verify', busy)
+
+    response = client.post('/profile/user/change-password', data={
+        'current_password': 'password123', 'new_password': 'new-secret', 'confirm_password': 'new-secret'})
+    assert response.status_code == 302 and response.location.endswith('/profile/user')
+    with client.session_transaction() as session:
+        assert 'try again' in session['_flashes'][-1][1]
+    monkeypatch.undo()
+    with app.app_context():
+        assert password_hasher.verify(User.query.one().password_hash, 'password123')
@@ -0,0 +1,87 @@
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from models import User, Project, Task, db
+from permissions import can_act_on_project, is_project_member
+
+@pytest.fixture
+def owner():
+    return User(username='owner', email='owner@example.com',
+                password_hash=generate_password_hash('password123'))
+
+@pytest.fixture
+def member():
+    return User(username='member', email='member@example.com',
+                password_hash=generate_password_hash('password123'))
+
+@pytest.fixture
+def outsider():
+    return User(username='outsider', email='outsider@example.com',
+                password_hash=generate_password_hash('password123'))
+
+@pytest.fixture
+def project(owner, member):
+    project = Project(title='Shared', owner=owner)
+    project.members.append(member)
+    return project
+
+def test_membership_checks(app, owner, member, outsider, project):
+    """Test owner, member and outsider decisions"""
+    with app.app_context():
+        db.session.add_all([owner, member, outsider, project])
+        db.session.commit()
+
+        with app.test_request_context():
+            assert can_act_on_project(owner, project)
+            assert can_act_on_project(member, project)
+            assert not can_act_on_project(outsider, project)
+
+def test_membership_is_memoized_per_request(app, owner, member, outsider, project):
+    """Test that repeated checks in one request issue a single query until membership changes"""
+    with app.app_context():
+        db.session.add_all([owner, member, outsider, project])
+        db.session.commit()
+        member_id, project_id = member.id, project.id
+
+        statements = []
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            with app.test_request_context():
+                for _ in range(5):
+                    assert is_project_member(member_id, project_id)
+                assert len(statements) == 1
+
+                # Changing the project's members drops what was memoized for it
+                assert not is_project_member(outsider.id, project_id)
+                project.members.append(outsider)
+                assert is_project_member(outsider.id, project_id)
+                project.members.remove(member)
+                assert not is_project_member(member_id, project_id)
+                db.session.rollback()
+                statements.clear()
+
+            with app.test_request_context():
+                app.preprocess_request()
+                assert is_project_member(member_id, project_id)
+                assert len(statements) == 1
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+def test_member_can_toggle_task(client, app, owner, member, outsider, project):
+    """Test that routes use the membership check"""
+    with app.app_context():
+        task = Task(title='Task', project=project, created_by=owner)
+        db.session.add_all([owner, member, outsider, project, task])
+        db.session.commit()
+
+        client.post('/login', data={'username': 'member', 'password': 'password123'})
+        response = client.post(f'/api/tasks/{task.id}/toggle')
+        assert response.status_code == 200
+
+        client.get('/logout')
+        client.post('/login', data={'username': 'outsider', 'password': 'password123'})
+        response = client.post(f'/api/tasks/{task.id}/toggle')
+        assert response.status_code == 403
@@ -0,0 +1,116 @@
+import cProfile
+import pytest
+from werkzeug.security import generate_password_hash
+from app import create_app
+from config import TestingConfig
+from models import User, db
+from profiling import ProfileStore
+
+@pytest.fixture
+def profiled_app(tmp_path):
+    class ProfilingConfig(TestingConfig):
+        PROFILE_DIR = str(tmp_path / 'profiles')
+        PROFILE_SAMPLE_EVERY = 2
+        PROFILE_SAMPLE_ENDPOINTS = ['index']
+
+    app = create_app(ProfilingConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='admin', email='admin@example.com',
+                            password_hash=generate_password_hash('password123'),
+                            is_admin=True, role='admin'))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+def make_token(app, username='admin'):
+    return app.extensions['profiling.tokens'].dumps(username)
+
+def test_store_keeps_newest_reports(tmp_path):
+    """Test that the store drops the oldest reports beyond its size"""
+    store = ProfileStore(str(tmp_path), keep=3)
+    stems = []
+    for i in range(5):
+        stems.append(store.stem(f'GET/projects/{i}'))
+        store.save(stems[-1], cProfile.Profile(), 'summary')
+
+    assert store.stems() == stems[:1:-1]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(s + ext for s in stems[2:] for ext in ('.prof', '.txt'))
+    assert store.is_report(stems[-1] + '.txt')
+    assert not store.is_report(stems[0] + '.txt')
+    assert not store.is_report('../config.py')
+
+def test_signed_token_profiles_request(profiled_app):
+    """Test that a request with a valid token is profiled and others are not"""
+    client = profiled_app.test_client()
+    store = profiled_app.extensions['profiling'].store
+
+    assert 'X-Profile-Report' not in client.get('/login').headers
+    assert 'X-Profile-Report' not in client.get('/login?_profile=forged').headers
+    assert store.stems() == []
+
+    response = client.get('/login', headers={'X-Profile-Token': make_token(profiled_app)})
+    stem = response.headers['X-Profile-Report']
+    assert store.stems() == [stem]
+
+    with open(f'{store.directory}/{stem}.txt') as f:
+        summary = f.read()
+    assert 'request: GET /login' in summary
+    assert 'token issued to admin' in summary
+    assert 'cumulative' in summary
+    assert 'Peak traced memory' in summary
+
+    response = client.get(f'/login?_profile={make_token(profiled_app)}')
+    assert response.headers['X-Profile-Report'] != stem
+
+def test_token_needs_a_current_admin(profiled_app):
+    """Test that a token stops working once its holder is no longer an admin"""
+    client = profiled_app.test_client()
+    token = make_token(profiled_app)
+    assert 'X-Profile-Report' in client.get('/login', headers={'X-Profile-Token': token}).headers
+
+    admin = User.query.filter_by(username='admin').one()
+    admin.is_admin = False
+    db.session.commit()
+    assert 'X-Profile-Report' not in client.get('/login', headers={'X-Profile-Token': token}).headers
+    unknown = make_token(profiled_app, 'nobody')
+    assert 'X-Profile-Report' not in client.get('/login', headers={'X-Profile-Token': unknown}).headers
+
+def test_sampled_endpoints(profiled_app):
+    """Test that one request in PROFILE_SAMPLE_EVERY to a sampled endpoint is profiled"""
+    client = profiled_app.test_client()
+    store = profiled_app.extensions['profiling'].store
+
+    for _ in range(4):
+        assert client.get('/').status_code == 200
+        client.get('/login')
+    assert len(store.stems()) == 2
+    assert all(stem.endswith('-index') for stem in store.stems())
+
+def test_admin_lists_and_downloads_reports(profiled_app):
+    """Test the admin profiles page and report downloads"""
+    client = profiled_app.test_client()
+    assert client.get('/admin/profiles').status_code == 302  # login required
+
+    stem = client.get('/login', headers={'X-Profile-Token': make_token(profiled_app)}).headers['X-Profile-Report']
+    client.post('/login', data={'username': 'admin', 'password': 'password123'})
+
+    page = client.get('/admin/profiles')
+    assert page.status_code == 200
+    assert stem.encode() in page.data
+
+    download = client.get(f'/admin/profiles/{stem}.prof')
+    assert download.status_code == 200
+    assert 'attachment' in download.headers['Content-Disposition']
+    assert client.get(f'/admin/profiles/{stem}.txt').data.startswith(b'request: GET /login')
+    assert client.get('/admin/profiles/missing.txt').status_code == 404
+
+    with profiled_app.app_context():
+        db.session.add(User(username='user', email='user@example.com',
+                            password_hash=generate_password_hash('password123')))
+        db.session.commit()
+    client.get('/logout')
+    client.post('/login', data={'username': 'user', 'password': 'password123'})
+    assert client.get('/admin/profiles').status_code == 403
+    assert client.get(f'/admin/profiles/{stem}.prof').status_code == 403
@@ -0,0 +1,245 @@
+import re
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from models import User, Project, Task, db
+from datetime import datetime
+from queries import decode_cursor, parse_project_filters, project_page, project_summaries, task_tree
+
+@pytest.fixture
+def test_admin_user():
+    user = User(
+        username='admin',
+        email='admin@example.com',
+        password_hash=generate_password_hash('password123'),
+        is_admin=True,
+        role='admin'
+    )
+    return user
+
+@pytest.fixture
+def test_regular_user():
+    user = User(
+        username='user',
+        email='user@example.com',
+        password_hash=generate_password_hash('password123'),
+        is_admin=False,
+        role='user'
+    )
+    return user
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements executed inside the block"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+def add_projects(owner, count, tasks_per_project=3):
+    for i in range(count):
+        project = Project(title=f'Project {i}', description='Description', owner=owner)
+        db.session.add(project)
+        for j in range(tasks_per_project):
+            db.session.add(Task(
+                title=f'Task {j}',
+                project=project,
+                created_by=owner,
+                status='completed' if j == 0 else 'open',
+                assigned_to=owner if j == 1 else None
+            ))
+    db.session.commit()
+
+def test_project_summaries_counts(test_admin_user, app):
+    """Test that summaries carry the per-project task counts"""
+    with app.app_context():
+        db.session.add(test_admin_user)
+        add_projects(test_admin_user, 2)
+        empty = Project(title='Empty', owner=test_admin_user)
+        db.session.add(empty)
+        db.session.commit()
+
+        summaries = {s.project.title: s for s in project_summaries()}
+        assert summaries['Project 0'].open_count == 2
+        assert summaries['Project 0'].assigned_count == 1
+        assert summaries['Project 0'].completed_count == 1
+        assert summaries['Project 0'].total_count == 3
+        assert summaries['Empty'].total_count == 0
+
+def test_projects_page_query_count_is_flat(client, test_admin_user, app):
+    """Test that /projects runs the same number of queries for 2 or 20 projects"""
+    with app.app_context():
+        db.session.add(test_admin_user)
+        db.session.commit()
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+
+        add_projects(test_admin_user, 2)
+
+        with count_queries() as few:
+            response = client.get('/projects')
+        assert response.status_code == 200
+
+        add_projects(test_admin_user, 18)
+        with count_queries() as many:
+            response = client.get('/projects')
+        assert response.status_code == 200
+        assert b'Project 17' in response.data
+
+        assert len(many) == len(few)
+
+def add_task_tree(project, owner, roots, children_per_root=2):
+    for i in range(roots):
+        parent = Task(title=f'Root {i}', project=project, created_by=owner, assigned_to=owner)
+        db.session.add(parent)
+        for j in range(children_per_root):
+            db.session.add(Task(title=f'Child {i}.{j}', project=project, created_by=owner,
+                                parent=parent, assigned_to=owner))
+    db.session.commit()
+
+def test_task_tree_structure(test_admin_user, app):
+    """Test that the tree nests subtasks under their parents"""
+    with app.app_context():
+        project = Project(title='Tree', owner=test_admin_user)
+        db.session.add(project)
+        add_task_tree(project, test_admin_user, 3)
+
+        roots = task_tree(project.id)
+        assert [node.task.title for node in roots] == ['Root 0', 'Root 1', 'Root 2']
+        assert [child.task.title for child in roots[1].children] == ['Child 1.0', 'Child 1.1']
+        assert roots[0].children[0].children == []
+
+def test_view_project_query_count_is_flat(client, test_admin_user, app):
+    """Test that view_project runs the same number of queries for small and large trees"""
+    with app.app_context():
+        db.session.add(test_admin_user)
+        db.session.commit()
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+
+        project = Project(title='Tree', owner=test_admin_user)
+        db.session.add(project)
+        add_task_tree(project, test_admin_user, 2)
+
+        with count_queries() as few:
+            response = client.get(f'/projects/{project.id}')
+        assert response.status_code == 200
+
+        add_task_tree(project, test_admin_user, 30)
+        with count_queries() as many:
+            response = client.get(f'/projects/{project.id}')
+        assert response.status_code == 200
+        assert b'Child 29.1' in response.data
+
+        assert len(many) == len(few)
+
+def test_project_page_walks_all_projects(test_admin_user, app):
+    """Test that following next_cursor visits every project exactly once, newest first"""
+    with app.app_context():
+        db.session.add(test_admin_user)
+        add_projects(test_admin_user, 7, tasks_per_project=0)
+
+        seen = []
+        summaries, cursor = project_page(limit=3)
+        seen.extend(s.project.id for s in summaries)
+        while cursor:
+            summaries, cursor = project_page(cursor=cursor, limit=3)
+            seen.extend(s.project.id for s in summaries)
+
+        expected = [p.id for p in Project.query.order_by(Project.created_at.desc(), Project.id.desc())]
+        assert seen == expected
+
+def test_project_page_filters(test_admin_user, test_regular_user, app):
+    """Test status, priority, owner and due date filters"""
+    with app.app_context():
+        db.session.add_all([
+            Project(title='Active High', owner=test_admin_user, status='active', priority='high',
+                    due_date=datetime(2025, 3, 1)),
+            Project(title='Archived Low', owner=test_admin_user, status='archived', priority='low',
+                    due_date=datetime(2025, 6, 1)),
+            Project(title='User Project', owner=test_regular_user, status='active', priority='low'),
+        ])
+        db.session.commit()
+
+        def titles(filters):
+            return {s.project.title for s in project_page(filters)[0]}
+
+        assert titles({'status': 'active'}) == {'Active High', 'User Project'}
+        assert titles({'priority': 'low'}) == {'Archived Low', 'User Project'}
+        assert titles({'owner': 'user'}) == {'User Project'}
+        assert titles({'due_after': datetime(2025, 4, 1)}) == {'Archived Low'}
+        assert titles({'due_before': datetime(2025, 4, 1)}) == {'Active High'}
+
+def test_project_page_includes_projects_without_created_at(test_admin_user, app):
+    """Test that projects whose created_at is NULL are paged after the others instead of failing"""
+    with app.app_context():
+        db.session.add(test_admin_user)
+        add_projects(test_admin_user, 3, tasks_per_project=0)
+        db.session.execute(db.insert(Project).values(
+            [{'title': f'Imported {i}', 'owner_id': test_admin_user.id, 'created_at': None} for i in range(3)]))
+        db.session.commit()
+
+        seen = []
+        cursor = None
+        while True:
+            summaries, cursor = project_page(cursor=cursor, limit=2)
+            seen.extend(s.project.title for s in summaries)
+            if not cursor:
+                break
+        assert len(seen) == len(set(seen)) == 6
+        assert seen[3:] == ['Imported 2', 'Imported 1', 'Imported 0']
+
+def test_parse_project_filters_validates_choices():
+    """Test that unknown statuses and priorities are rejected"""
+    assert parse_project_filters({'priority': 'high'}) == {'priority': 'high'}
+    with pytest.raises(ValueError, match='Invalid priority'):
+        parse_project_filters({'priority': 'urgent'})
+    with pytest.raises(ValueError, match='Invalid status'):
+        parse_project_filters({'status': 'lost'})
+
+def test_decode_cursor_rejects_garbage():
+    """Test that malformed cursors raise ValueError"""
+    with pytest.raises(ValueError):
+        decode_cursor('not-a-cursor')
+
+def test_projects_page_endpoint(client, test_admin_user, app):
+    """Test the JSON fragment endpoint used by Load More"""
+    with app.app_context():
+        app.config['PROJECTS_PER_PAGE'] = 2
+        db.session.add(test_admin_user)
+        add_projects(test_admin_user, 3, tasks_per_project=0)
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+
+        response = client.get('/projects')
+        assert b'loadMoreProjects' in response.data
+
+        _, cursor = project_page(limit=2)
+        response = client.get(f'/projects/page?cursor={cursor}')
+        assert response.status_code == 200
+        data = response.get_json()
+        assert 'Project 0' in data['html']
+        assert data['next_cursor'] is None
+
+        response = client.get('/projects/page?cursor=garbage')
+        assert response.status_code == 400
+
+        response = client.get('/projects/page?status=bogus')
+        assert response.status_code == 400
+
+def test_projects_filter_form_offers_valid_choices(client, test_admin_user, app, monkeypatch):
+    """Test that the filter form lists exactly the statuses and priorities the filters accept"""
+    with app.app_context():
+        db.session.add(test_admin_user)
+        db.session.commit()
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+        monkeypatch.setattr(Project, 'VALID_PRIORITIES', ['low', 'medium', 'high', 'urgent'])
+
+        html = client.get('/projects').get_data(as_text=True)
+        options = re.findall(r'<option value="(\w+)"', html)
+        assert options == Project.VALID_STATUSES + Project.VALID_PRIORITIES
+        assert client.get('/projects?priority=urgent').status_code == 200
@@ -0,0 +1,123 @@
+import logging
+import sqlite3
+import pytest
+from werkzeug.security import generate_password_hash
+from app import create_app
+from config import TestingConfig
+from models import User, Project, Task, db
+from query_stats import RepeatedQueryError, explain, statement_shape
+
+@pytest.fixture
+def test_admin_user():
+    return User(username='admin', email='admin@example.com',
+                password_hash=generate_password_hash('password123'),
+                is_admin=True, role='admin')
+
+@pytest.fixture
+def test_regular_user():
+    return User(username='user', email='user@example.com',
+                password_hash=generate_password_hash('password123'))
+
+def login(client, username):
+    client.post('/login', data={'username': username, 'password': 'password123'})
+
+def test_statement_shape():
+    """Test that ids, IN-list lengths and paramstyles do not change a query's shape"""
+    assert statement_shape('SELECT * FROM tasks WHERE id IN (?, ?, ?)') == \
+        statement_shape('SELECT * FROM tasks WHERE id IN (?)')
+    assert statement_shape('SELECT * FROM tasks WHERE id = %(id_1)s LIMIT 10') == \
+        'SELECT * FROM tasks WHERE id = ? LIMIT N'
+    assert statement_shape('SELECT a\n   FROM  t') == 'SELECT a FROM t'
+
+def test_repeated_queries_raise_in_tests(app, client, test_admin_user):
+    """Test that an N+1 loop in a view fails the request under TestingConfig"""
+    @app.route('/test/n-plus-one')
+    def n_plus_one():
+        for user_id in range(1, 13):
+            db.session.get(User, user_id)
+            db.session.expunge_all()
+        return 'ok'
+
+    with pytest.raises(RepeatedQueryError, match='12x SELECT'):
+        client.get('/test/n-plus-one')
+
+def test_repeated_queries_log_outside_tests(caplog):
+    """Test that the same loop only logs a warning when raising is off"""
+    class LoggingConfig(TestingConfig):
+        SQL_RAISE_ON_REPEAT = False
+
+    app = create_app(LoggingConfig)
+
+    @app.route('/test/n-plus-one')
+    def n_plus_one():
+        for user_id in range(1, 13):
+            db.session.get(User, user_id)
+        return 'ok'
+
+    with app.app_context():
+        db.create_all()
+        with caplog.at_level(logging.WARNING, logger='query_stats'):
+            assert app.test_client().get('/test/n-plus-one').status_code == 200
+        db.drop_all()
+    assert 'Possible N+1 in GET /test/n-plus-one' in caplog.text
+
+def test_profile_loads_projects_with_tasks(app, client, test_regular_user):
+    """Test that the profile page no longer loads each task's project separately"""
+    with app.app_context():
+        db.session.add(test_regular_user)
+        for i in range(15):
+            project = Project(title=f'Project {i}', owner=test_regular_user)
+            db.session.add(Task(title=f'Task {i}', project=project,
+                                created_by=test_regular_user, assigned_to=test_regular_user))
+        db.session.commit()
+        login(client, 'user')
+        client.get('/profile/user')  # consume the login flash
+
+        response = client.get('/profile/user')
+        assert response.status_code == 200
+        assert b'Project 14' in response.data
+
+def test_server_timing_only_for_admins(app, client, test_admin_user, test_regular_user):
+    """Test the Server-Timing header"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_regular_user])
+        db.session.commit()
+
+        login(client, 'user')
+        assert 'Server-Timing' not in client.get('/projects').headers
+        client.get('/logout')
+
+        login(client, 'admin')
+        timing = client.get('/projects').headers['Server-Timing']
+        assert timing.startswith('db;dur=')
+        assert 'queries"' in timing and 'app;dur=' in timing
+
+def test_slow_query_log_includes_plan(caplog):
+    """Test that slow queries are logged with their EXPLAIN output"""
+    class SlowConfig(TestingConfig):
+        SQL_SLOW_QUERY_MS = 0.000001
+
+    app = create_app(SlowConfig)
+    with app.app_context():
+        db.create_all()
+        with caplog.at_level(logging.WARNING, logger='slow_queries'):
+            with app.test_request_context('/projects'):
+                db.session.execute(db.select(Task).where(Task.project_id == 1)).all()
+        db.drop_all()
+
+    record = next(r for r in caplog.records if 'FROM tasks' in r.getMessage())
+    message = record.getMessage()
+    assert 'in GET /projects' in message
+    assert 'ix_tasks_project_id_parent_id' in message
+
+def test_failed_explain_keeps_the_transaction():
+    """Test that a failing EXPLAIN is rolled back to its savepoint, leaving the caller's work intact"""
+    # SQLite understands the savepoint statements used for PostgreSQL
+    connection = sqlite3.connect(':memory:')
+    connection.execute('CREATE TABLE t (a INTEGER)')
+    connection.execute('BEGIN')
+    connection.execute('INSERT INTO t VALUES (1)')
+    plan = explain(connection.cursor(), 'SELECT * FROM missing', (), 'postgresql')
+    assert plan.startswith('EXPLAIN failed')
+    assert connection.in_transaction
+    assert connection.execute('SELECT count(*) FROM t').fetchone() == (1,)
@@ -0,0 +1,87 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from models import User, Project, Task, db
+from render_cache import render_cache
+
+@pytest.fixture
+def test_admin_user():
+    return User(username='admin', email='admin@example.com',
+                password_hash=generate_password_hash('password123'),
+                is_admin=True, role='admin')
+
+@pytest.fixture
+def test_regular_user():
+    return User(username='user', email='user@example.com',
+                password_hash=generate_password_hash('password123'))
+
+@pytest.fixture
+def test_project(test_admin_user):
+    return Project(title='Cached Project', description='Description', owner=test_admin_user)
+
+def test_index_is_cached(client, app):
+    """Test that the static index body renders once"""
+    with app.app_context():
+        client.get('/')
+        client.get('/')
+        assert render_cache.stats()['hits'] == 1
+        assert render_cache.stats()['size'] == 1
+
+def test_project_card_is_reused(client, app, test_admin_user, test_project):
+    """Test that unchanged project cards are served from the cache"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project])
+        db.session.commit()
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+
+        client.get('/projects')
+        hits = render_cache.stats()['hits']
+        response = client.get('/projects')
+        assert render_cache.stats()['hits'] == hits + 1
+        assert b'Cached Project' in response.data
+
+def test_task_change_invalidates_card(client, app, test_admin_user, test_project):
+    """Test that adding a task evicts the card and the new counts are shown"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project])
+        db.session.commit()
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+
+        response = client.get('/projects')
+        assert b'0 open' in response.data
+        assert render_cache.get(('project-card', test_project.id)) is not None
+
+        db.session.add(Task(title='New', project=test_project, created_by=test_admin_user))
+        db.session.commit()
+        assert render_cache.get(('project-card', test_project.id)) is None
+
+        response = client.get('/projects')
+        assert b'1 open' in response.data
+
+def test_membership_change_invalidates_card(client, app, test_admin_user, test_regular_user, test_project):
+    """Test that project_users changes evict the card"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_regular_user, test_project])
+        db.session.commit()
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+        client.get('/projects')
+        assert render_cache.get(('project-card', test_project.id)) is not None
+
+        test_project.members.append(test_regular_user)
+        db.session.commit()
+        assert render_cache.get(('project-card', test_project.id)) is None
+
+def test_admin_button_is_not_cached(client, app, test_admin_user, test_regular_user, test_project):
+    """Test that per-user parts of /projects stay correct with a warm cache"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_regular_user, test_project])
+        db.session.commit()
+
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+        response = client.get('/projects')
+        assert b'New Project' in response.data
+        client.get('/logout')
+
+        client.post('/login', data={'username': 'user', 'password': 'password123'})
+        response = client.get('/projects')
+        assert b'Cached Project' in response.data
+        assert b'New Project' not in response.data
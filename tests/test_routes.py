@@ -1,6 +1,7 @@
 import pytest
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timezone
+from jobs import job_runner
 from models import User, Project, Task, db
 
 @pytest.fixture
@@ -825,8 +826,9 @@ def test_user_deletion_scenarios(client, test_admin_user, test_regular_user, tes
 
         # Test deleting user with assigned tasks
         response = client.delete('/admin/users/user/delete')
-        assert response.status_code == 200
+        assert response.status_code == 202
         assert response.get_json()['success'] == True
+        assert job_runner.run_pending() == 1
 
         # Verify task reassignment
         updated_task = db.session.get(Task, test_task.id)
@@ -1105,8 +1107,9 @@ def test_delete_user(client, test_admin_user, test_regular_user, app):
         })
 
         response = client.delete(f'/admin/users/{test_regular_user.username}/delete')
-        assert response.status_code == 200
+        assert response.status_code == 202
         assert response.get_json()['success'] == True
+        assert job_runner.run_pending() == 1
 
         # Verify user was deleted
         user = User.query.filter_by(username='user').first()
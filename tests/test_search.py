@@ -0,0 +1,135 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from models import User, Project, Task, Feedback, Submission, db
+from search import rebuild_search_index, search
+
+@pytest.fixture
+def test_admin_user():
+    return User(username='admin', email='admin@example.com',
+                password_hash=generate_password_hash('password123'),
+                is_admin=True, role='admin')
+
+@pytest.fixture
+def test_regular_user():
+    return User(username='user', email='user@example.com',
+                password_hash=generate_password_hash('password123'))
+
+@pytest.fixture
+def test_project(test_admin_user):
+    return Project(title='Robotics Club', description='Build a line following robot',
+                   owner=test_admin_user, features=['Telemetry dashboard'])
+
+@pytest.fixture
+def test_task(test_project, test_admin_user):
+    return Task(title='Wire the motors', description='Use the <b>H-bridge</b> driver',
+                notes='Check the soldering', project=test_project, created_by=test_admin_user)
+
+def kinds(results):
+    return sorted((r.kind, r.title) for r in results)
+
+def test_index_follows_model_changes(app, test_admin_user, test_project, test_task):
+    """Test that inserts, updates and deletes keep the index in sync"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project, test_task])
+        db.session.commit()
+
+        assert kinds(search('robot', test_admin_user)) == [('project', 'Robotics Club')]
+        assert kinds(search('telemetry', test_admin_user)) == [('project', 'Robotics Club')]
+        assert kinds(search('solder', test_admin_user)) == [('task', 'Wire the motors')]
+
+        test_task.title = 'Wire the servos'
+        db.session.commit()
+        assert search('motors', test_admin_user) == []
+        assert kinds(search('servos', test_admin_user)) == [('task', 'Wire the servos')]
+
+        db.session.add(Feedback(task=test_task, feedback_text='Great soldering work',
+                                feedback_by=test_admin_user))
+        db.session.add(Submission(task=test_task, submission_text='Photos of the soldering'))
+        db.session.commit()
+        assert kinds(search('soldering', test_admin_user)) == [
+            ('feedback', None), ('submission', None), ('task', 'Wire the servos')]
+
+        db.session.delete(test_project)
+        db.session.commit()
+        assert search('soldering', test_admin_user) == []
+
+def test_rollback_leaves_index_untouched(app, test_admin_user, test_project):
+    """Test that index writes roll back with the data"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project])
+        db.session.commit()
+
+        test_project.title = 'Astronomy'
+        db.session.flush()
+        db.session.rollback()
+        assert search('astronomy', test_admin_user) == []
+        assert len(search('robotics', test_admin_user)) == 1
+
+def test_results_are_permission_filtered(app, test_admin_user, test_regular_user, test_project, test_task):
+    """Test that tasks of other people's projects stay hidden, but projects do not"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_regular_user, test_project, test_task])
+        db.session.commit()
+
+        assert search('motors', test_regular_user) == []
+        assert len(search('robotics', test_regular_user)) == 1
+
+        test_task.assigned_to = test_regular_user
+        db.session.commit()
+        assert len(search('motors', test_regular_user)) == 1
+
+def test_query_syntax_is_not_interpreted(app, test_admin_user, test_project, test_task):
+    """Test that FTS operators in user input are treated as plain words"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project, test_task])
+        db.session.commit()
+
+        assert search('motors" OR "x', test_admin_user) == []
+        assert search('*', test_admin_user) == []
+        assert len(search('NEAR(motors', test_admin_user)) == 0
+
+def test_snippet_is_escaped(app, test_admin_user, test_project, test_task):
+    """Test that stored HTML is escaped while matches are highlighted"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project, test_task])
+        db.session.commit()
+
+        snippet = search('bridge', test_admin_user)[0].highlighted
+        assert '&lt;b&gt;' in snippet
+        assert '<mark>bridge</mark>' in snippet
+
+def test_rebuild_search_index(app, test_admin_user, test_project, test_task):
+    """Test rebuilding from rows written without ORM events"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project, test_task])
+        db.session.commit()
+        db.session.execute(db.text("DELETE FROM search_index"))
+        db.session.commit()
+        assert search('robotics', test_admin_user) == []
+
+        rebuild_search_index()
+        assert len(search('robotics', test_admin_user)) == 1
+        assert len(search('telemetry', test_admin_user)) == 1
+        assert len(search('soldering', test_admin_user)) == 1
+
+def test_search_routes(client, app, test_admin_user, test_project, test_task):
+    """Test the HTML and JSON search endpoints"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, test_project, test_task])
+        db.session.commit()
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+
+        response = client.get('/search?q=motors')
+        assert response.status_code == 200
+        assert b'Wire the motors' in response.data
+
+        data = client.get('/api/search?q=robot').get_json()
+        assert data['results'][0]['kind'] == 'project'
+        assert data['results'][0]['id'] == test_project.id
+
+        # Unusable limits fall back to the default or are clamped to 1..100
+        db.session.add(Project(title='Robot arm', owner=test_admin_user))
+        db.session.commit()
+        assert len(client.get('/api/search?q=robot&limit=x').get_json()['results']) == 2
+        assert len(client.get('/api/search?q=robot&limit=-1').get_json()['results']) == 1
+        assert client.get('/api/search?q=robot&limit=0').status_code == 200
@@ -0,0 +1,99 @@
+import random
+import pytest
+from sqlalchemy import create_engine, func, select
+from werkzeug.security import check_password_hash, generate_password_hash
+from models import Feedback, Project, Submission, Task, User, db, project_users
+from search import search
+from seed import Seeder, split, weights
+
+def test_split_is_exact_and_proportional():
+    """Test that parts add up to the total and follow the weights"""
+    assert split(10, [1, 1, 1]) in ([4, 3, 3], [3, 4, 3], [3, 3, 4])
+    assert split(100, [3, 1]) == [75, 25]
+    assert sum(split(1000003, [0.3, 5.2, 1.7, 0.01])) == 1000003
+
+def test_pareto_weights_are_skewed():
+    """Test that the pareto distribution gives a few items most of the weight"""
+    values = sorted(weights(1000, 'pareto', random.Random(1)), reverse=True)
+    assert sum(values[:200]) > 0.6 * sum(values)
+    assert weights(3, 'uniform', random.Random(1)) == [1.0, 1.0, 1.0]
+
+def test_seeder_generates_requested_rows(app):
+    """Test row counts, tree depth and references of a small dataset"""
+    with app.app_context():
+        report = Seeder(users=20, projects=10, tasks=500, max_depth=2, batch_size=64).run(
+            db.session.connection(), 'hash')
+        db.session.commit()
+
+        assert report.rows['users'] == 20 and report.rows['tasks'] == 500
+        assert report.rows['feedback'] == 100 and report.rows['submissions'] == 100
+        assert db.session.scalar(select(func.count()).select_from(Task)) == 500
+        assert db.session.scalar(select(func.count()).select_from(project_users)) == report.rows['project_users']
+
+        parents = dict(db.session.execute(select(Task.id, Task.parent_id)).all())
+        projects = dict(db.session.execute(select(Task.id, Task.project_id)).all())
+        for task_id, parent_id in parents.items():
+            depth = 0
+            while parent_id is not None:
+                assert projects[parent_id] == projects[task_id]
+                depth += 1
+                parent_id = parents[parent_id]
+            assert depth <= 2
+        assert any(parent is not None for parent in parents.values())
+
+def test_same_seed_same_data():
+    """Test that a fixed seed reproduces the same rows"""
+    def generate(seed):
+        engine = create_engine('sqlite://')
+        db.metadata.create_all(engine)
+        with engine.begin() as connection:
+            Seeder(users=5, projects=3, tasks=100, seed=seed).run(connection, 'hash')
+            return connection.execute(select(Task.id, Task.project_id, Task.parent_id, Task.assigned_to_id,
+                                             Task.status, Task.priority).order_by(Task.id)).all()
+
+    assert generate(7) == generate(7)
+    assert generate(7) != generate(8)
+
+def test_seeding_appends_after_existing_rows(app):
+    """Test that a second run continues after the existing ids"""
+    with app.app_context():
+        seeder = Seeder(users=5, projects=3, tasks=100)
+        for _ in range(2):
+            seeder.run(db.session.connection(), 'hash')
+            db.session.commit()
+
+        assert db.session.scalar(select(func.count()).select_from(User)) == 10
+        assert db.session.scalar(select(func.max(Project.id))) == 6
+        assert db.session.scalar(select(func.count()).select_from(Task)) == 200
+        assert db.session.scalar(select(func.min(Task.project_id)).where(Task.id > 100)) > 3
+
+def test_invalid_settings():
+    """Test that impossible sizes and unknown distributions are rejected"""
+    with pytest.raises(ValueError):
+        Seeder(users=0)
+    with pytest.raises(ValueError, match='Distribution'):
+        Seeder(project_distribution='normal')
+
+def test_seed_command(app, runner):
+    """Test the flask seed command, including the search index rebuild"""
+    result = runner.invoke(args=['seed', '--users', '10', '--projects', '4', '--tasks', '50',
+                                 '--password', 'secret1', '--project-distribution', 'uniform'])
+    assert result.exit_code == 0, result.output
+    assert 'tasks' in result.output and 'Done.' in result.output
+
+    with app.app_context():
+        assert db.session.scalar(select(func.count()).select_from(Task)) == 50
+        assert db.session.scalar(select(func.count()).select_from(Feedback)) == 10
+        assert db.session.scalar(select(func.count()).select_from(Submission)) == 10
+        user = db.session.get(User, 1)
+        assert check_password_hash(user.password_hash, 'secret1')
+
+        admin = User(username='admin', email='admin@example.com',
+                     password_hash=generate_password_hash('x'), is_admin=True, role='admin')
+        db.session.add(admin)
+        db.session.commit()
+        assert any(result.kind == 'task' for result in search('Task', admin))
+
+    result = runner.invoke(args=['seed', '--users', '0'])
+    assert result.exit_code != 0
+    assert 'at least one user' in result.output
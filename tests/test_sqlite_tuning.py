@@ -0,0 +1,106 @@
+import sqlite3
+import threading
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from config import TestingConfig
+from models import db
+from sqlite_tuning import LockRetry, is_lock_error, pragmas, tune_engine
+
+@pytest.fixture
+def file_config(tmp_path):
+    class FileConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "app.db"}'
+    return FileConfig
+
+def test_pragmas_applied_on_connect(file_config):
+    """Test WAL, busy_timeout, synchronous, mmap and cache size on a file database"""
+    app = create_app(file_config)
+    with app.app_context():
+        with db.engine.connect() as connection:
+            def pragma(name):
+                return connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+            assert pragma('journal_mode') == 'wal'
+            assert pragma('busy_timeout') == 5000
+            assert pragma('synchronous') == 1  # NORMAL
+            assert pragma('cache_size') == -20000
+            assert pragma('mmap_size') == 256 * 1024 * 1024
+
+def test_pragmas_reject_unknown_modes():
+    """Test that config values are validated before reaching SQL"""
+    config = {key: getattr(TestingConfig, key) for key in dir(TestingConfig) if key.startswith('SQLITE_')}
+    config['SQLITE_JOURNAL_MODE'] = 'wal; DROP TABLE users'
+    with pytest.raises(ValueError):
+        pragmas(config)
+
+def test_lock_retry_backs_off_then_gives_up():
+    """Test that lock errors are retried with growing delays and other errors are not"""
+    delays = []
+    retry = LockRetry(retries=3, backoff=0.1, sleep=delays.append)
+    attempts = []
+
+    def locked():
+        attempts.append(1)
+        raise sqlite3.OperationalError('database is locked')
+
+    with pytest.raises(sqlite3.OperationalError):
+        retry.run(locked)
+    assert len(attempts) == 4
+    assert len(delays) == 3
+    assert 0.05 <= delays[0] <= 0.1
+    assert 0.2 <= delays[2] <= 0.4
+
+    def broken():
+        attempts.append(1)
+        raise sqlite3.OperationalError('no such table: tasks')
+
+    attempts.clear()
+    with pytest.raises(sqlite3.OperationalError):
+        retry.run(broken)
+    assert len(attempts) == 1
+
+def test_is_lock_error():
+    """Test recognising busy and locked errors"""
+    assert is_lock_error(sqlite3.OperationalError('database is locked'))
+    assert not is_lock_error(sqlite3.OperationalError('disk I/O error'))
+
+def test_write_waits_out_another_writer(tmp_path):
+    """Test that a write blocked by another process's transaction succeeds through retries"""
+    path = tmp_path / 'locked.db'
+    config = {key: getattr(TestingConfig, key) for key in dir(TestingConfig) if key.startswith('SQLITE_')}
+    # No busy wait, so only the retries can get the write through
+    config.update(SQLITE_BUSY_TIMEOUT_MS=0, SQLITE_WRITE_RETRIES=8, SQLITE_RETRY_BACKOFF=0.02)
+    engine = create_engine(f'sqlite:///{path}')
+    retry = tune_engine(engine, config)
+    with engine.begin() as connection:
+        connection.exec_driver_sql('CREATE TABLE t (x INTEGER)')
+
+    blocker = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+    blocker.execute('BEGIN IMMEDIATE')
+    release = threading.Timer(0.1, blocker.execute, args=('COMMIT',))
+    release.start()
+    try:
+        with engine.begin() as connection:
+            connection.execute(text('INSERT INTO t VALUES (1)'))
+    finally:
+        release.join()
+        blocker.close()
+
+    assert retry.retried > 0
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql('SELECT count(*) FROM t').scalar() == 1
+
+    # Without retries the same conflict surfaces as an error
+    config['SQLITE_WRITE_RETRIES'] = 0
+    strict = create_engine(f'sqlite:///{path}')
+    tune_engine(strict, config)
+    blocker = sqlite3.connect(path, isolation_level=None)
+    blocker.execute('BEGIN IMMEDIATE')
+    try:
+        with pytest.raises(OperationalError):
+            with strict.begin() as connection:
+                connection.execute(text('INSERT INTO t VALUES (2)'))
+    finally:
+        blocker.execute('ROLLBACK')
+        blocker.close()
@@ -0,0 +1,83 @@
+import json
+import pytest
+from werkzeug.security import generate_password_hash
+from app import create_app
+from config import TestingConfig
+from models import User, db
+from traffic_capture import read_capture, sanitize, sanitize_path
+
+@pytest.fixture
+def capture_path(tmp_path):
+    return tmp_path / 'capture.jsonl'
+
+@pytest.fixture
+def captured_app(capture_path):
+    class CaptureConfig(TestingConfig):
+        TRAFFIC_CAPTURE_PATH = str(capture_path)
+
+    app = create_app(CaptureConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(username='admin', email='admin@example.com',
+                            password_hash=generate_password_hash('password123'),
+                            is_admin=True, role='admin'))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+
+def lines(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+def test_capture_is_off_by_default(client, app, tmp_path):
+    """Test that nothing is recorded unless TRAFFIC_CAPTURE_PATH is set"""
+    assert app.config['TRAFFIC_CAPTURE_PATH'] is None
+    client.get('/login')
+    assert not list(tmp_path.iterdir())
+
+def test_sanitize_drops_secrets_text_and_emails():
+    """Test that passwords and tokens go, free text keeps its length and emails are hashed"""
+    cleaned = sanitize({'username': 'bob', 'password': 'hunter2', 'new_password': 'x', 'csrf_token': 'abc',
+                        'notes': 'private notes', 'email': 'Bob@Example.com', 'ids': [1, 2], 'q': 'a b@c'})
+    assert cleaned == {'username': 'bob', 'notes': 'x' * 13, 'email': cleaned['email'],
+                       'ids': [1, 2], 'q': 'a b@c'}
+    assert cleaned['email'].endswith('@example.invalid')
+    assert sanitize({'email': 'bob@example.com'})['email'] == cleaned['email']
+
+def test_requests_are_recorded_sanitized(captured_app, capture_path):
+    """Test that each request becomes one line with route, user, status and duration"""
+    client = captured_app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'password123'})
+    client.get('/projects?status=active')
+    client.post('/admin/users/admin/edit', json={'email': 'new@example.com', 'first_name': 'Ada'})
+    client.get('/metrics')
+    client.get('/static/missing.css')
+
+    records = lines(capture_path)
+    assert [(r['m'], r['e']) for r in records] == [
+        ('POST', 'login'), ('GET', 'projects'), ('POST', 'edit_user')]
+    login, projects, edit = records
+    assert login['f'] == {'username': ['admin']} and login['s'] == 302
+    assert projects['u'] == 1 and projects['s'] == 200 and projects['q'] == {'status': ['active']}
+    assert projects['p'] == '/projects' and projects['d'] >= 0
+    assert edit['j']['first_name'] == 'xxx' and edit['j']['email'].endswith('@example.invalid')
+    assert 'password123' not in capture_path.read_text()
+
+def test_emails_in_paths_are_hashed(captured_app, capture_path):
+    """Test that usernames that are email addresses do not reach the trace through the URL"""
+    client = captured_app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'password123'})
+    client.get('/profile/alice@example.com')
+
+    record = lines(capture_path)[-1]
+    assert record['e'] == 'user_profile'
+    assert record['p'] == sanitize_path('/profile/alice@example.com')
+    assert record['p'].startswith('/profile/') and record['p'].endswith('@example.invalid')
+    assert 'alice' not in capture_path.read_text()
+
+def test_read_capture_orders_by_time(tmp_path):
+    """Test that records appended out of order by several workers are read back in time order"""
+    path = tmp_path / 'capture.jsonl'
+    path.write_text('{"t": 3, "e": "c"}\n{"t": 1, "e": "a"}\n\n{"t": 2, "e": "b"}\n')
+    assert [record['e'] for record in read_capture(path)] == ['a', 'b', 'c']
@@ -0,0 +1,130 @@
+import io
+import pytest
+from werkzeug.security import check_password_hash, generate_password_hash
+from jobs import job_runner
+from models import Job, User, db
+from passwords import PasswordHasher, password_hasher
+from user_import import UserImporter
+
+CSV = """email,username,password,first_name,last_name,role
+ann@example.com,ann,secret1,Ann,Lee,user
+bob@example.com,,,Bob,,admin
+not-an-email,,,,,
+ann@example.com,ann2,,,,
+cat@example.com,existing,,,,
+existing@example.com,dan,,,,
+eve@example.com,eve,,,,teacher
+"""
+
+@pytest.fixture
+def cheap_hasher():
+    return PasswordHasher(method='pbkdf2:sha256:1000')
+
+@pytest.fixture
+def cheap_policy():
+    previous = password_hasher.method
+    password_hasher.method = 'pbkdf2:sha256:1000'
+    yield
+    password_hasher.method = previous
+
+@pytest.fixture
+def existing_user():
+    return User(username='existing', email='existing@example.com',
+                password_hash=generate_password_hash('password123'))
+
+@pytest.fixture
+def test_admin_user():
+    return User(username='admin', email='admin@example.com',
+                password_hash=generate_password_hash('password123'),
+                is_admin=True, role='admin')
+
+def test_import_users_report(app, cheap_hasher, existing_user):
+    """Test created rows and the per-row error report"""
+    with app.app_context():
+        db.session.add(existing_user)
+        db.session.commit()
+
+        report = UserImporter(cheap_hasher, batch_size=2).run(io.StringIO(CSV))
+
+        assert report.created == 2
+        assert {e['line']: e['error'] for e in report.errors} == {
+            4: 'Invalid email format',
+            5: 'Duplicate email in file',
+            6: 'Username already exists',
+            7: 'Email already exists',
+            8: 'Invalid role. Must be one of: user, admin',
+        }
+
+        ann = User.query.filter_by(username='ann').first()
+        assert ann.first_name == 'Ann'
+        assert check_password_hash(ann.password_hash, 'secret1')
+        assert ann.created_at is not None
+
+        bob = User.query.filter_by(email='bob@example.com').first()
+        assert bob.username == 'bob@example.com'
+        assert bob.is_admin
+        assert check_password_hash(bob.password_hash, 'prepkc123')
+
+def test_import_users_requires_email_column(app, cheap_hasher):
+    """Test that a file without an email column is rejected"""
+    with app.app_context():
+        report = UserImporter(cheap_hasher).run(io.StringIO('username\nann\n'))
+        assert report.created == 0
+        assert report.errors == [{'line': 1, 'error': 'Missing required column: email'}]
+
+def test_import_users_process_pool(app, cheap_hasher):
+    """Test hashing through the process pool"""
+    with app.app_context():
+        rows = ''.join(f'user{i}@example.com\n' for i in range(20))
+        report = UserImporter(cheap_hasher, batch_size=8, hash_workers=2).run(io.StringIO('email\n' + rows))
+        assert report.created == 20
+        assert User.query.count() == 20
+
+def test_import_users_route(client, app, test_admin_user, cheap_policy, tmp_path, monkeypatch):
+    """Test the admin upload endpoint, which imports in a background job"""
+    monkeypatch.setattr(job_runner, 'files_dir', str(tmp_path))
+    with app.app_context():
+        db.session.add(test_admin_user)
+        db.session.commit()
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+
+        response = client.post('/admin/users/import', data={
+            'file': (io.BytesIO(CSV.encode()), 'users.csv'), 'password': 'welcome9'
+        }, content_type='multipart/form-data')
+        assert response.status_code == 202
+        assert response.get_json()['success'] == True
+        queued = db.session.get(Job, response.get_json()['job_id'])
+        assert 'welcome9' not in str(queued.params)
+        assert job_runner.run_pending() == 1
+        assert check_password_hash(User.query.filter_by(username='bob@example.com').one().password_hash, 'welcome9')
+        assert list(tmp_path.iterdir()) == []
+
+        job = client.get(response.headers['Location']).get_json()['job']
+        assert job['status'] == 'succeeded'
+        assert job['result']['created'] == 4
+        assert len(job['result']['errors']) == 3
+
+        response = client.post('/admin/users/import', data={})
+        assert response.status_code == 400
+
+def test_import_users_route_requires_admin(client, app, existing_user):
+    """Test that regular users cannot import"""
+    with app.app_context():
+        db.session.add(existing_user)
+        db.session.commit()
+        client.post('/login', data={'username': 'existing', 'password': 'password123'})
+
+        response = client.post('/admin/users/import', data={
+            'file': (io.BytesIO(CSV.encode()), 'users.csv')
+        }, content_type='multipart/form-data')
+        assert response.status_code == 403
+
+def test_import_users_command(runner, app, tmp_path, cheap_policy):
+    """Test the flask import-users command"""
+    with app.app_context():
+        csv_file = tmp_path / 'users.csv'
+        csv_file.write_text('email,username\nann@example.com,ann\nbad,\n')
+
+        result = runner.invoke(args=['import-users', str(csv_file), '--workers', '0'])
+        assert 'Created 1 users, skipped 1 rows.' in result.output
+        assert User.query.filter_by(username='ann').first() is not None
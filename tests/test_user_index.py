@@ -0,0 +1,137 @@
+import pytest
+from werkzeug.security import generate_password_hash
+from models import User, db
+from user_index import UserIndex, user_index
+
+def make_user(username, email=None, first_name=None, last_name=None, **kwargs):
+    return User(username=username, email=email or f'{username}@example.com',
+                first_name=first_name, last_name=last_name,
+                password_hash=generate_password_hash('password123'), **kwargs)
+
+@pytest.fixture
+def test_admin_user():
+    return make_user('admin', is_admin=True, role='admin')
+
+def usernames(results):
+    return [result['username'] for result in results]
+
+def test_prefix_search_over_all_fields():
+    """Test that usernames, emails and names all match by prefix"""
+    index = UserIndex()
+    index.load([
+        {'id': 1, 'username': 'alice', 'email': 'a.smith@example.com', 'first_name': 'Alice', 'last_name': 'Smith'},
+        {'id': 2, 'username': 'bob', 'email': 'bob@example.com', 'first_name': 'Robert', 'last_name': 'Allen'},
+        {'id': 3, 'username': 'carol', 'email': 'carol@example.com', 'first_name': None, 'last_name': None},
+    ])
+
+    assert usernames(index.search('al')) == ['alice', 'bob']
+    assert usernames(index.search('ROB')) == ['bob']
+    assert usernames(index.search('alice smi')) == ['alice']
+    assert usernames(index.search('carol@')) == ['carol']
+    assert index.search('carol@', emails=False) == []
+    assert index.search('') == []
+    assert index.search('zed') == []
+
+def test_limit_and_exclude():
+    """Test top-k truncation and excluded ids"""
+    index = UserIndex()
+    index.load([{'id': i, 'username': f'user{i:02d}', 'email': f'user{i:02d}@example.com',
+                 'first_name': None, 'last_name': None} for i in range(30)])
+
+    assert usernames(index.search('user', limit=3)) == ['user00', 'user01', 'user02']
+    assert usernames(index.search('user', limit=2, exclude={0})) == ['user01', 'user02']
+
+def test_incremental_upsert_and_remove():
+    """Test that updates replace stale keys"""
+    index = UserIndex()
+    index.load([])
+    index.upsert({'id': 1, 'username': 'dave', 'email': 'dave@example.com', 'first_name': None, 'last_name': None})
+    assert usernames(index.search('da')) == ['dave']
+
+    index.upsert({'id': 1, 'username': 'eve', 'email': 'eve@example.com', 'first_name': None, 'last_name': None})
+    assert index.search('da') == []
+    assert usernames(index.search('ev')) == ['eve']
+
+    index.remove(1)
+    assert index.search('ev') == []
+    assert len(index) == 0
+
+def test_reload_after_refresh_interval(app, test_admin_user):
+    """Test that a stale index reloads from the database"""
+    now = [0]
+    index = UserIndex(refresh=10, timer=lambda: now[0])
+    with app.app_context():
+        db.session.add(test_admin_user)
+        db.session.commit()
+        assert usernames(index.search('adm')) == ['admin']
+
+        # Written behind the index's back, as another worker would
+        db.session.execute(User.__table__.insert().values(
+            username='adrian', email='adrian@example.com', password_hash='x'))
+        db.session.commit()
+        assert usernames(index.search('ad')) == ['admin']
+
+        now[0] = 10
+        assert usernames(index.search('ad')) == ['admin', 'adrian']
+
+def test_index_follows_committed_changes(app, test_admin_user):
+    """Test that commits update the index and rollbacks do not"""
+    with app.app_context():
+        db.session.add(test_admin_user)
+        db.session.commit()
+        assert usernames(user_index.search('a')) == ['admin']
+
+        db.session.add(make_user('frank'))
+        db.session.flush()
+        db.session.rollback()
+        assert user_index.search('fr') == []
+
+        user = make_user('grace', first_name='Grace', last_name='Hopper')
+        db.session.add(user)
+        db.session.commit()
+        assert usernames(user_index.search('hop')) == ['grace']
+
+        user.username = 'ghopper'
+        db.session.commit()
+        assert usernames(user_index.search('gh')) == ['ghopper']
+        assert usernames(user_index.search('grace@')) == ['ghopper']
+
+        db.session.delete(user)
+        db.session.commit()
+        assert user_index.search('hop') == []
+
+def test_search_users_route(client, app, test_admin_user):
+    """Test the typeahead endpoint and that emails are only shown to admins"""
+    with app.app_context():
+        db.session.add_all([test_admin_user, make_user('henry', first_name='Henry')])
+        db.session.commit()
+
+        client.post('/login', data={'username': 'henry', 'password': 'password123'})
+        data = client.get('/api/users/search?q=he').get_json()
+        assert data['users'] == [{'id': 2, 'username': 'henry', 'first_name': 'Henry', 'last_name': None}]
+        assert client.get('/api/users/search?q=he&limit=x').status_code == 400
+        # Emails cannot be probed by prefix without admin rights
+        assert client.get('/api/users/search?q=admin@').get_json()['users'] == []
+        assert client.get('/api/users/search?q=adm').get_json()['users'][0]['username'] == 'admin'
+        client.get('/logout')
+
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+        data = client.get('/api/users/search?q=henry@').get_json()
+        assert data['users'][0]['email'] == 'henry@example.com'
+
+def test_bulk_import_resets_index(client, app, test_admin_user, tmp_path, monkeypatch):
+    """Test that users created by the CSV importer become searchable"""
+    from io import BytesIO
+    from jobs import job_runner
+    monkeypatch.setattr(job_runner, 'files_dir', str(tmp_path))
+    with app.app_context():
+        db.session.add(test_admin_user)
+        db.session.commit()
+        client.post('/login', data={'username': 'admin', 'password': 'password123'})
+        assert user_index.search('ivan') == []
+
+        csv_data = b'username,email,password\nivan,ivan@example.com,secret123\n'
+        client.post('/admin/users/import', data={'file': (BytesIO(csv_data), 'users.csv')},
+                    content_type='multipart/form-data')
+        job_runner.run_pending()
+        assert usernames(user_index.search('ivan')) == ['ivan']
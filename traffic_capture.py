@@ -0,0 +1,120 @@
+# traffic_capture.py
+
+import hashlib
+import json
+import os
+import time
+from flask import g, request
+from flask_login import current_user
+
+# Never recorded: the application's own endpoints for operators, not user traffic
+EXCLUDED_ENDPOINTS = ('static', 'metrics')
+# Keys dropped from query strings and bodies wherever they appear
+SECRET_KEYS = ('password', 'token', 'secret', '_profile')
+# Free-text fields; only their length is kept
+TEXT_KEYS = ('title', 'description', 'notes', 'feedback', 'feedback_text', 'submission_text',
+             'first_name', 'last_name')
+MAX_BODY_BYTES = 64 * 1024
+
+
+def _redact_email(value):
+    digest = hashlib.sha256(value.lower().encode()).hexdigest()[:12]
+    return f'{digest}@example.invalid'
+
+
+def sanitize(value, key=''):
+    """Copy of a query, form or JSON value with secrets, free text and emails removed.
+
+    Ids, statuses, filters and search terms are kept so the request can be
+    replayed; free text is replaced with filler of the same length, and
+    emails with a stable hash so uniqueness checks behave the same.
+    """
+    if isinstance(value, dict):
+        return {k: sanitize(v, k) for k, v in value.items()
+                if not any(secret in k.lower() for secret in SECRET_KEYS)}
+    if isinstance(value, list):
+        return [sanitize(item, key) for item in value]
+    if isinstance(value, str):
+        if key in TEXT_KEYS:
+            return 'x' * len(value)
+        if '@' in value and ' ' not in value:
+            return _redact_email(value)
+    return value
+
+
+def sanitize_path(path):
+    """`path` with email-like segments, e.g. usernames in /profile/<username>, hashed."""
+    return '/'.join(sanitize(segment) for segment in path.split('/'))
+
+
+class TrafficLog:
+    """Append-only JSON lines file shared by all worker processes.
+
+    Each record is one os.write on a descriptor opened with O_APPEND, so lines
+    from concurrent workers never interleave. The descriptor is opened lazily
+    in each process, after gunicorn has forked.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._pid = None
+
+    def write(self, record):
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        line = json.dumps(record, separators=(',', ':'), default=str) + '\n'
+        os.write(self._fd, line.encode())
+
+
+def read_capture(path):
+    """Records of a capture file in arrival order."""
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda record: record['t'])
+
+
+def capture_record(response, started):
+    """The sanitized trace of the current request."""
+    record = {
+        't': round(time.time(), 4),
+        'm': request.method,
+        'e': request.endpoint,
+        'p': sanitize_path(request.path),
+        'u': int(current_user.get_id()) if current_user.is_authenticated else None,
+        's': response.status_code,
+        'd': round((time.perf_counter() - started) * 1000, 2),
+    }
+    if request.args:
+        record['q'] = sanitize(request.args.to_dict(flat=False))
+    if request.method != 'GET' and (request.content_length or 0) <= MAX_BODY_BYTES:
+        if request.is_json:
+            record['j'] = sanitize(request.get_json(silent=True))
+        elif request.form:
+            record['f'] = sanitize(request.form.to_dict(flat=False))
+        if request.files:
+            record['files'] = len(request.files)
+    return record
+
+
+def init_traffic_capture(app):
+    """Record every request to TRAFFIC_CAPTURE_PATH; off unless that is set."""
+    path = app.config['TRAFFIC_CAPTURE_PATH']
+    if not path:
+        return
+    log = TrafficLog(path)
+
+    @app.before_request
+    def _start_capture():
+        g.capture_started = time.perf_counter()
+
+    @app.after_request
+    def _capture(response):
+        started = g.pop('capture_started', None)
+        if started is not None and request.endpoint not in EXCLUDED_ENDPOINTS:
+            try:
+                log.write(capture_record(response, started))
+            except OSError:
+                app.logger.exception('Could not write to the traffic capture log')
+        return response
@@ -0,0 +1,165 @@
+# user_import.py
+
+import csv
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import insert, select
+from werkzeug.security import generate_password_hash
+from models import db, User
+from user_index import user_index
+
+VALID_ROLES = ('user', 'admin')
+
+
+class ImportReport:
+    """Outcome of an import: how many users were created and why other rows were skipped."""
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def add_error(self, line, error):
+        self.errors.append({'line': line, 'error': error})
+
+    def to_dict(self):
+        return {'created': self.created, 'errors': self.errors}
+
+
+def _hash_password(args):
+    # Module-level so it can be pickled into the process pool
+    password, method, salt_length = args
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+
+def _parse_row(row, default_password):
+    """Turn a CSV row into User column values. Raises ValueError for bad rows."""
+    email = (row.get('email') or '').strip()
+    if not email or '@' not in email:
+        raise ValueError('Invalid email format')
+
+    role = (row.get('role') or 'user').strip().lower()
+    if role not in VALID_ROLES:
+        raise ValueError(f'Invalid role. Must be one of: {", ".join(VALID_ROLES)}')
+
+    return {
+        # As with quick add, the email doubles as the username unless one is given
+        'username': (row.get('username') or '').strip() or email,
+        'email': email,
+        'password': row.get('password') or default_password,
+        'first_name': (row.get('first_name') or '').strip() or None,
+        'last_name': (row.get('last_name') or '').strip() or None,
+        'role': role,
+        'is_admin': role == 'admin',
+    }
+
+
+class UserImporter:
+    """Streams users from a CSV file into the database in batches.
+
+    Each batch checks username/email uniqueness with two set-based queries,
+    hashes its passwords (in a process pool when hash_workers > 1) and is
+    inserted with a single executemany.
+    """
+
+    def __init__(self, hasher, batch_size=1000, hash_workers=0, default_password='prepkc123',
+                 default_password_hash=None):
+        self.hasher = hasher
+        self.batch_size = batch_size
+        self.hash_workers = hash_workers
+        # A precomputed hash for rows without a password replaces default_password,
+        # so callers such as background jobs never have to keep the plain password
+        self.default_password_hash = default_password_hash
+        self.default_password = None if default_password_hash else default_password
+
+    def run(self, stream, progress=None):
+        """Import users from a text stream of CSV rows and return an ImportReport.
+
+        `progress(report, line)`, when given, is called after each batch is committed.
+        """
+        report = ImportReport()
+        seen_usernames = set()
+        seen_emails = set()
+        batch = []
+
+        pool = ProcessPoolExecutor(max_workers=self.hash_workers) if self.hash_workers > 1 else None
+        try:
+            reader = csv.DictReader(stream)
+            if not reader.fieldnames or 'email' not in reader.fieldnames:
+                report.add_error(1, 'Missing required column: email')
+                return report
+
+            for line, row in enumerate(reader, start=2):
+                try:
+                    record = _parse_row(row, self.default_password)
+                except ValueError as e:
+                    report.add_error(line, str(e))
+                    continue
+
+                # Duplicates within the file itself
+                if record['username'] in seen_usernames:
+                    report.add_error(line, 'Duplicate username in file')
+                    continue
+                if record['email'] in seen_emails:
+                    report.add_error(line, 'Duplicate email in file')
+                    continue
+                seen_usernames.add(record['username'])
+                seen_emails.add(record['email'])
+
+                batch.append((line, record))
+                if len(batch) >= self.batch_size:
+                    self._flush(batch, report, pool)
+                    batch = []
+                    if progress:
+                        progress(report, line)
+
+            if batch:
+                self._flush(batch, report, pool)
+                if progress:
+                    progress(report, line)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        return report
+
+    def _flush(self, batch, report, pool):
+        usernames = [record['username'] for _, record in batch]
+        emails = [record['email'] for _, record in batch]
+        taken_usernames = set(db.session.scalars(select(User.username).where(User.username.in_(usernames))))
+        taken_emails = set(db.session.scalars(select(User.email).where(User.email.in_(emails))))
+
+        accepted = []
+        for line, record in batch:
+            if record['username'] in taken_usernames:
+                report.add_error(line, 'Username already exists')
+            elif record['email'] in taken_emails:
+                report.add_error(line, 'Email already exists')
+            else:
+                accepted.append((line, record))
+
+        if not accepted:
+            return
+
+        passwords = [record.pop('password') for _, record in accepted]
+        jobs = [(password, self.hasher.method, self.hasher.salt_length) for password in passwords if password]
+        if pool is not None and jobs:
+            hashes = pool.map(_hash_password, jobs, chunksize=max(1, len(jobs) // (self.hash_workers * 4)))
+        else:
+            hashes = map(_hash_password, jobs)
+        hashes = iter(hashes)
+        rows = []
+        for (_, record), password in zip(accepted, passwords):
+            record['password_hash'] = next(hashes) if password else self.default_password_hash
+            rows.append(record)
+
+        try:
+            db.session.execute(insert(User), rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            for line, _ in accepted:
+                report.add_error(line, f'Insert failed: {e}')
+            return
+
+        # Bulk inserts skip mapper events, so let the typeahead index reload itself
+        user_index.clear()
+        report.created += len(rows)
@@ -0,0 +1,169 @@
+# user_index.py
+
+import threading
+import time
+from bisect import bisect_left, insort
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+from models import db, User
+
+SEARCH_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+
+class UserIndex:
+    """Sorted (key, user_id) pairs for prefix lookups over usernames, emails and names.
+
+    A prefix query is a bisect to the first key >= prefix followed by a short
+    scan, so lookups cost O(log n + k) instead of a table scan. Each worker
+    process keeps its own copy: changes committed in this process are applied
+    incrementally, and the whole index is reloaded after `refresh` seconds to
+    pick up changes made by other workers.
+    """
+
+    def __init__(self, refresh=300, timer=time.monotonic):
+        self.refresh = refresh
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._keys = []
+        self._users = {}
+        self._loaded_at = None
+
+    def configure(self, refresh):
+        with self._lock:
+            self.refresh = refresh
+
+    def clear(self):
+        with self._lock:
+            self._keys = []
+            self._users = {}
+            self._loaded_at = None
+
+    @staticmethod
+    def _entry(user):
+        return {
+            'id': user['id'] if isinstance(user, dict) else user.id,
+            **{field: (user[field] if isinstance(user, dict) else getattr(user, field))
+               for field in SEARCH_FIELDS},
+        }
+
+    @staticmethod
+    def _keys_for(entry, emails=True):
+        keys = {entry[field].lower() for field in SEARCH_FIELDS
+                if entry[field] and (emails or field != 'email')}
+        if entry['first_name'] and entry['last_name']:
+            keys.add(f"{entry['first_name']} {entry['last_name']}".lower())
+        return keys
+
+    def _stale(self):
+        return self._loaded_at is None or (
+            self.refresh is not None and self._timer() - self._loaded_at >= self.refresh)
+
+    def load(self, rows):
+        """Replace the index with `rows` (mappings with id and SEARCH_FIELDS)."""
+        users = {}
+        keys = []
+        for row in rows:
+            entry = self._entry(row)
+            users[entry['id']] = entry
+            keys.extend((key, entry['id']) for key in self._keys_for(entry))
+        keys.sort()
+        with self._lock:
+            self._users = users
+            self._keys = keys
+            self._loaded_at = self._timer()
+
+    def _ensure_loaded(self):
+        if self._stale():
+            rows = db.session.execute(select(User.id, *(getattr(User, f) for f in SEARCH_FIELDS)))
+            self.load(row._asdict() for row in rows)
+
+    def _remove_locked(self, user_id):
+        entry = self._users.pop(user_id, None)
+        if entry is None:
+            return
+        for key in self._keys_for(entry):
+            position = bisect_left(self._keys, (key, user_id))
+            if position < len(self._keys) and self._keys[position] == (key, user_id):
+                del self._keys[position]
+
+    def upsert(self, user):
+        entry = self._entry(user)
+        with self._lock:
+            self._remove_locked(entry['id'])
+            self._users[entry['id']] = entry
+            for key in self._keys_for(entry):
+                insort(self._keys, (key, entry['id']))
+
+    def remove(self, user_id):
+        with self._lock:
+            self._remove_locked(user_id)
+
+    def search(self, prefix, limit=10, exclude=(), emails=True):
+        """Return up to `limit` user dicts with a field starting with `prefix`, in key order.
+
+        With emails=False only usernames and names are matched, so the results
+        cannot be used to probe for email addresses.
+        """
+        prefix = (prefix or '').strip().lower()
+        if not prefix or limit <= 0:
+            return []
+        self._ensure_loaded()
+
+        results = []
+        seen = set(exclude)
+        with self._lock:
+            position = bisect_left(self._keys, (prefix,))
+            while position < len(self._keys) and len(results) < limit:
+                key, user_id = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                position += 1
+                if user_id in seen:
+                    continue
+                entry = self._users[user_id]
+                if not emails and key not in self._keys_for(entry, emails=False):
+                    continue
+                seen.add(user_id)
+                results.append(dict(entry))
+        return results
+
+    def __len__(self):
+        return len(self._users)
+
+
+user_index = UserIndex()
+
+
+def init_user_index(app):
+    user_index.configure(refresh=app.config['USER_SEARCH_REFRESH'])
+
+
+# Changes are collected per session during flush and applied only once the
+# transaction commits, so a rolled-back insert never shows up in the picker
+def _pending(session):
+    return session.info.setdefault('user_index_pending', {})
+
+
+@event.listens_for(User, 'after_insert')
+@event.listens_for(User, 'after_update')
+def _user_saved(mapper, connection, target):
+    _pending(object_session(target))[target.id] = UserIndex._entry(target)
+
+
+@event.listens_for(User, 'after_delete')
+def _user_deleted(mapper, connection, target):
+    _pending(object_session(target))[target.id] = None
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_pending(session):
+    for user_id, entry in session.info.pop('user_index_pending', {}).items():
+        if entry is None:
+            user_index.remove(user_id)
+        else:
+            user_index.upsert(entry)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_pending(session, previous_transaction):
+    session.info.pop('user_index_pending', None)
@@ -0,0 +1,79 @@
+# user_jobs.py
+
+import os
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+from identity import invalidate_user
+from jobs import job_runner
+from models import Task, User, db, project_users
+from passwords import password_hasher
+from permissions import forget_project_membership
+from user_import import UserImporter
+
+# Tasks updated per transaction when detaching a user from their tasks
+REASSIGN_BATCH_SIZE = 1000
+
+
+def _reassign(column, user_id, value):
+    """Yield after each batch of tasks whose `column` moved from `user_id` to `value`."""
+    while True:
+        ids = db.session.scalars(select(Task.id).where(column == user_id).limit(REASSIGN_BATCH_SIZE)).all()
+        if not ids:
+            return
+        db.session.execute(update(Task).where(Task.id.in_(ids)).values({column: value}))
+        yield len(ids)
+
+
+@job_runner.task('delete_user')
+def delete_user(context, user_id, reassign_to):
+    """Remove a user from their projects, unassign their tasks, hand over the tasks they created and delete them."""
+    user = db.session.get(User, user_id)
+    if user is None:
+        return {'deleted': False}
+    username = user.username
+
+    total = db.session.scalar(select(func.count()).select_from(Task).where(
+        (Task.assigned_to_id == user_id) | (Task.created_by_id == user_id)))
+    db.session.execute(delete(project_users).where(project_users.c.user_id == user_id))
+    forget_project_membership(user_id=user_id)
+    context.progress(0, total, 'Removed from projects')
+
+    done = 0
+    for count in _reassign(Task.assigned_to_id, user_id, None):
+        done += count
+        context.progress(done, total, 'Unassigning tasks')
+    for count in _reassign(Task.created_by_id, user_id, reassign_to):
+        done += count
+        context.progress(done, total, 'Reassigning created tasks')
+
+    db.session.delete(db.session.get(User, user_id))
+    db.session.commit()
+    invalidate_user(user_id)
+    return {'deleted': True, 'username': username}
+
+
+def remove_upload(path, **params):
+    """Delete an import's upload; it holds user details, so it must not outlive the job."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@job_runner.task('import_users', cleanup=remove_upload)
+def import_users(context, path, default_password_hash):
+    """Import users from an uploaded CSV file, then remove the file."""
+    try:
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            # Lines, not rows: quoted fields may span lines, so this is an upper bound
+            total = max(sum(1 for _ in f) - 1, 0)
+            f.seek(0)
+            importer = UserImporter(password_hasher,
+                                    batch_size=current_app.config['USER_IMPORT_BATCH_SIZE'],
+                                    hash_workers=current_app.config['USER_IMPORT_HASH_WORKERS'],
+                                    default_password_hash=default_password_hash)
+            report = importer.run(f, progress=lambda report, line: context.progress(
+                min(line - 1, total), total, f'Created {report.created} users'))
+    finally:
+        remove_upload(path)
+    return report.to_dict()
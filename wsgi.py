@@ -0,0 +1,7 @@
+# wsgi.py
+#
+# Entry point for WSGI servers, e.g. `gunicorn wsgi:app`
+
+from app import create_app
+
+app = create_app()